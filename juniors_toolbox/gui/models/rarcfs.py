@@ -9,12 +9,14 @@ from logging import root
 import os
 from pathlib import Path, PurePath
 import shutil
+import struct
 import time
 from typing import Any, Optional, overload
 
 from numpy import source
 from juniors_toolbox.gui.images import get_icon
 from juniors_toolbox.utils.yaz0 import (
+    Yaz0Decoder,
     decompress_yaz0,
     compress_yaz0,
     is_yaz0_compressed,
@@ -24,6 +26,7 @@ from juniors_toolbox.utils.rarc import (
     FileConflictAction,
     ResourceArchive,
 )
+from juniors_toolbox.utils.rarcmanifest import ArchiveManifest, ArchiveManifestCache
 from PySide6.QtCore import (
     QAbstractItemModel,
     QByteArray,
@@ -263,11 +266,15 @@ class JSystemFSModel(QAbstractItemModel):
         rootPath: Path | None,
         readOnly: bool = True,
         parent: Optional[QObject] = None,
+        manifestCache: ArchiveManifestCache | None = None,
     ) -> None:
         super().__init__(parent)
         self._rootPath: Path | None = None  # Initial state
         self._rootPathExists: bool = False
         self._archives: dict[PurePath, ResourceArchive] = {}
+        # Archives listed from a cached manifest, loaded on first access
+        self._archiveManifests: dict[PurePath, ArchiveManifest] = {}
+        self._manifestCache = manifestCache
 
         self._readOnly = readOnly
 
@@ -287,6 +294,13 @@ class JSystemFSModel(QAbstractItemModel):
         self._skipRecache = False
         self._skipArchiveUpdate = False
 
+        self._pendingArchiveSaves: set[PurePath] = set()
+        # Archives being written by a save thread, saved again once it finishes
+        self._savingArchives: set[PurePath] = set()
+        self._archiveSaveTimer = QTimer(self)
+        self._archiveSaveTimer.setSingleShot(True)
+        self._archiveSaveTimer.timeout.connect(self._save_pending_archives)
+
         self.rootPath = rootPath
         self._initialize_icons()
         self.reset_cache()
@@ -408,23 +422,21 @@ class JSystemFSModel(QAbstractItemModel):
 
             if os.path.isfile(indexPath):
                 if indexPath.suffix == ".szs":
+                    manifest = self._archiveManifests.get(indexPath)
+                    if manifest is not None:
+                        return manifest.get_root_file_count() > 0
                     try:
-                        archive = self._archives[indexPath]
+                        archive = self._get_archive(indexPath)
                         return archive.rootInfo.fileCount > 0
                     except KeyError:
                         with indexPath.open("rb") as f:
                             if not is_yaz0_compressed(f.read(4)):
                                 return False
 
-                        with indexPath.open("rb") as f:
-                            decompressed = decompress_yaz0(f)
-
-                        if ResourceArchive.is_data_archive(decompressed):
-                            archive = ResourceArchive.from_bytes(decompressed)
-                            self._archives[indexPath] = archive
-                            return archive.rootInfo.fileCount > 0
-
-                        return False
+                        rootFileCount = self._get_szs_root_file_count(indexPath)
+                        if rootFileCount is None:
+                            return False
+                        return rootFileCount > 0
 
                 if indexPath.suffix == ".arc":
                     with indexPath.open("rb") as f:
@@ -443,7 +455,8 @@ class JSystemFSModel(QAbstractItemModel):
             if handleInfo.archive is None:  # Not cached yet
                 parent = index.parent()
                 while parent.isValid():
-                    if self.get_path(parent) in self._archives:
+                    parentPath = self.get_path(parent)
+                    if parentPath in self._archives or parentPath in self._archiveManifests:
                         return True
                     parent = parent.parent()
                 return False
@@ -578,7 +591,7 @@ class JSystemFSModel(QAbstractItemModel):
             )
             sourceArchivePath = self.get_path(sourceArchiveIndex)
             if sourceArchiveIndex.isValid():
-                sourceArchive = self._archives[sourceArchivePath]
+                sourceArchive = self._get_archive(sourceArchivePath)
 
             # Check if the destination is part of an archive
             destArchive: Optional[ResourceArchive] = None
@@ -587,7 +600,7 @@ class JSystemFSModel(QAbstractItemModel):
             )
             destArchivePath = self.get_path(destArchiveIndex)
             if destArchiveIndex.isValid():
-                destArchive = self._archives[destArchivePath]
+                destArchive = self._get_archive(destArchivePath)
 
         with QWriteLocker(self._fsLock):
             for i, childHandle in enumerate(destParentInfo.children):
@@ -822,7 +835,7 @@ class JSystemFSModel(QAbstractItemModel):
         archiveIndex = self.get_parent_archive(index)
         if archiveIndex.isValid():
             archivePath = self.get_path(archiveIndex)
-            archive = self._archives[archivePath]
+            archive = self._get_archive(archivePath)
 
             virtualPath = thisPath.relative_to(archivePath)
             handle = archive.get_handle(virtualPath)
@@ -907,12 +920,13 @@ class JSystemFSModel(QAbstractItemModel):
                 return False
 
             archivePath = self.get_path(archiveIndex)
-            archive = self._archives[archivePath]
+            archive = self._get_archive(archivePath)
 
             if not archive.path_exists(path):
                 return False
 
-        archive.remove_path(path)
+        with QWriteLocker(self._fsLock):
+            archive.remove_path(path)
         return True
 
     def import_paths(
@@ -1022,7 +1036,7 @@ class JSystemFSModel(QAbstractItemModel):
                 return QModelIndex()
 
             if self.is_archive(parent):
-                archive = self._archives[parentPath]
+                archive = self._get_archive(parentPath)
                 fileHandle = archive.new_file(name, initialData)
                 if fileHandle is None:
                     return QModelIndex()
@@ -1033,7 +1047,7 @@ class JSystemFSModel(QAbstractItemModel):
                     return QModelIndex()
 
                 archivePath = self.get_path(archiveIndex)
-                archive = self._archives[archivePath]
+                archive = self._get_archive(archivePath)
 
                 virtualPath = parentPath.relative_to(archivePath)
                 parentHandle = archive.get_handle(virtualPath)
@@ -1076,7 +1090,7 @@ class JSystemFSModel(QAbstractItemModel):
         if archiveIndex.isValid():
             archivePath = self.get_path(archiveIndex)
             with QWriteLocker(self._fsLock):
-                archive = self._archives[archivePath]
+                archive = self._get_archive(archivePath)
 
                 virtualPath = parentPath.relative_to(archivePath)
                 parentHandle = archive.get_handle(virtualPath)
@@ -1177,10 +1191,11 @@ class JSystemFSModel(QAbstractItemModel):
             return False
 
         archivePath = self.get_path(archiveIndex)
-        archive = self._archives[archivePath]
+        archive = self._get_archive(archivePath)
 
         self.beginRemoveRows(parentIndex, index.row(), index.row())
-        pathRemoved = archive.remove_path(path)
+        with QWriteLocker(self._fsLock):
+            pathRemoved = archive.remove_path(path)
         self.endRemoveRows()
 
         return pathRemoved
@@ -1502,47 +1517,56 @@ class JSystemFSModel(QAbstractItemModel):
 
         thisArchiveIndex = archiveIndex
         thisArchivePath = self.get_path(thisArchiveIndex)
-        thisArchive = self._archives[thisArchivePath]
+        with QWriteLocker(self._fsLock):
+            self._get_archive(thisArchivePath).mark_dirty()
 
+        # Nested archives were opened from their parent's handle, so they are
+        # serialized into it when the topmost archive is saved
         while True:
             parentArchiveIndex = self.get_parent_archive(thisArchiveIndex)
             if not parentArchiveIndex.isValid():
                 break
 
-            parentArchivePath = self.get_path(parentArchiveIndex)
-            parentArchive = self._archives[parentArchivePath]
+            thisArchiveIndex = parentArchiveIndex
+            thisArchivePath = self.get_path(parentArchiveIndex)
 
-            virtualThisPath = thisArchivePath.relative_to(parentArchivePath)
-            thisArchiveHandle = parentArchive.get_handle(virtualThisPath)
-            if thisArchiveHandle is None or not thisArchiveHandle.is_file():
-                print("Archive doesn't have a file handle owned by another archive")
-                continue
+        # At this point we have the topmost archive which is guaranteed to be physical
+        # Edits in quick succession are coalesced into a single write
+        self._pendingArchiveSaves.add(thisArchivePath)
+        self._archiveSaveTimer.start(100)  # Reset timer
 
-            thisArchiveHandle.data = BytesIO(thisArchive.to_bytes())
+    @Slot()
+    def _save_pending_archives(self) -> None:
+        pendingPaths = self._pendingArchiveSaves
+        self._pendingArchiveSaves = set()
+
+        for archivePath in pendingPaths:
+            if archivePath in self._savingArchives:
+                # Only one save may write a file at a time, try again after this one
+                self._pendingArchiveSaves.add(archivePath)
+                continue
 
-            parentHandle: ResourceHandle | None
-            if len(virtualThisPath.parts) == 1:
-                parentHandle = parentArchive
-            else:
-                parentHandle = parentArchive.get_handle(virtualThisPath)
-                if parentHandle is None:
-                    raise RuntimeError(
-                        "Failed to track the parent handle during FS update"
-                    )
+            archive = self._archives.get(archivePath)
+            if archive is None or not archive.is_dirty():
+                continue
 
-            thisArchiveIndex = parentArchiveIndex
-            thisArchivePath = parentArchivePath
-            thisArchive = parentArchive
+            # Simple function to run on thread
+            def _update_f(archive: ResourceArchive = archive, path: PurePath = archivePath) -> None:
+                try:
+                    # Saving rebuilds the archive's tables and patch baseline in place,
+                    # so it must exclude both edits and readers walking the archive
+                    with QWriteLocker(self._fsLock):
+                        archive.save_to(path, incremental=True)
+                finally:
+                    self._savingArchives.discard(path)
 
-        # Simple function to run on thread
-        def _update_f() -> None:
-            with open(thisArchivePath, "wb") as f:
-                f.write(thisArchive.to_bytes())
+            # By writing the topmost archive to the file, we update the FS and recache
+            self._savingArchives.add(archivePath)
+            t = threading.Thread(target=_update_f)
+            t.start()
 
-        # At this point we have the topmost archive which is guaranteed to be physical
-        # By writing the topmost archive to the file, we update the FS and recache
-        t = threading.Thread(target=_update_f)
-        t.start()
+        if self._pendingArchiveSaves:
+            self._archiveSaveTimer.start(100)
 
     def _sort_and_update_indexes(self, infoToSort: _HandleInfo) -> bool:
         # Update each persistent index
@@ -1582,6 +1606,13 @@ class JSystemFSModel(QAbstractItemModel):
             self.cache_index(index)
         self.layoutChanged.emit()
 
+    def _is_archive_unsaved(self, path: PurePath, archive: ResourceArchive) -> bool:
+        return (
+            archive.is_dirty()
+            or path in self._pendingArchiveSaves
+            or path in self._savingArchives
+        )
+
     def cache_index(self, index: QModelIndex | QPersistentModelIndex) -> None:
         if not self.canFetchMore(index):
             return
@@ -1597,6 +1628,24 @@ class JSystemFSModel(QAbstractItemModel):
         # We always assume the index exists on the real filesystem because
         # virtual filesystem indexes (archive handles) get a complete
         # recursive caching rather than a lazy approach
+        with QWriteLocker(self._fsLock):
+            archive = self._archives.get(basePath)
+            if archive is not None and self._is_archive_unsaved(basePath, archive):
+                # The file on disk lags behind the loaded archive, so list it from memory
+                self._archiveManifests.pop(basePath, None)
+                self._cache_manifest(index, basePath, ArchiveManifest.from_archive(archive))
+                return
+
+        if self._manifestCache is not None and basePath.suffix in {".szs", ".arc"}:
+            manifest = self._manifestCache.get(Path(basePath))
+            if manifest is not None:
+                # List the archive without opening it
+                with QWriteLocker(self._fsLock):
+                    self._archives.pop(basePath, None)
+                    self._archiveManifests[basePath] = manifest
+                    self._cache_manifest(index, basePath, manifest)
+                return
+
         if basePath.suffix == ".szs":
             # Decompress SZS
             with basePath.open("rb") as f:
@@ -1696,19 +1745,13 @@ class JSystemFSModel(QAbstractItemModel):
                     else:
                         # Check if it's an archive, if so, treat as archive and cache the archive to self._archives. Otherwise treat as file
                         if is_yaz0:
-                            with open(subPath, "rb") as rs:
-                                decompressed = decompress_yaz0(rs)
-                            with open(subPath.with_suffix(".arc1"), "wb") as rs:
-                                rs.write(decompressed.read())
-                                decompressed.seek(0)
-                            if ResourceArchive.is_data_archive(decompressed):
+                            rootFileCount = self._get_szs_root_file_count(subPath)
+                            if rootFileCount is not None:
                                 # Treat as archive
-                                archive = ResourceArchive.from_bytes(decompressed)
-                                self._archives[subPath] = archive
                                 childInfo = self._create_archive_handle(
                                     subPath,
                                     0,
-                                    archive.rootInfo.fileCount > 0,
+                                    rootFileCount > 0,
                                     handleInfo,
                                     archiveIndex,
                                 )
@@ -1752,121 +1795,30 @@ class JSystemFSModel(QAbstractItemModel):
 
         self._sort_and_update_indexes(handleInfo)
 
+    def _get_szs_root_file_count(self, path: Path) -> int | None:
+        """
+        Decodes just enough of a Yaz0 compressed archive to read the
+        root directory's file count, or returns None if it isn't an archive
+        """
+        try:
+            with open(path, "rb") as f:
+                decoder = Yaz0Decoder(f)
+                header = BytesIO(decoder.decode(0x40))
+                if not ResourceArchive.is_data_archive(header):
+                    return None
+
+                directoryTableOffset = ResourceArchive.get_directory_table_offset(header)
+                header = BytesIO(decoder.decode(directoryTableOffset + 0x10))
+                return ResourceArchive.get_root_file_count(header)
+        except (OSError, ValueError, IndexError, AssertionError, struct.error):
+            # Truncated or malformed data, treat it as a plain file
+            return None
+
     def _cache_archive(
         self,
         index: QModelIndex | QPersistentModelIndex,
         decompressed_data: BytesIO | None = None,
     ) -> None:
-        def _recursive_cache(
-            handle: ResourceArchive | ResourceHandle,
-            archivePath: PurePath,
-            subHandleInfo: "JSystemFSModel._HandleInfo",
-        ) -> None:
-            subHandleMap: dict[str, JSystemFSModel._HandleInfo] = {
-                info.path.name: info for info in subHandleInfo.children
-            }
-            subHandleInfo.children.clear()
-            subHandleInfo.size = 0
-
-            if isinstance(handle, ResourceArchive):
-                for i, p in enumerate(handle.get_handles()):
-                    if p.get_name() in subHandleMap:
-                        childHandleInfo = subHandleMap[p.get_name()]
-                    elif p.is_file():
-                        if p.get_extension() == ".arc":
-                            childHandleInfo = self._create_archive_handle(
-                                archivePath / p.get_path(),
-                                p.get_size(),
-                                False,
-                                subHandleInfo,
-                                QModelIndex(),
-                            )
-                            childHandleInfo = JSystemFSModel._HandleInfo(
-                                row=subHandleInfo.size,
-                                path=archivePath / p.get_path(),
-                                parent=subHandleInfo,
-                                children=[],
-                                fsKind=fsKind,
-                                size=p.get_size(),
-                            )
-                        else:
-                            fsKind = JSystemFSModel._FsKind.FILE
-
-                        childHandleInfo = JSystemFSModel._HandleInfo(
-                            row=subHandleInfo.size,
-                            path=archivePath / p.get_path(),
-                            parent=subHandleInfo,
-                            children=[],
-                            fsKind=fsKind,
-                            size=p.get_size(),
-                        )
-                    else:
-                        childHandleInfo = self._create_directory_handle(
-                            archivePath / p.get_path(),
-                            False,
-                            subHandleInfo,
-                            QModelIndex(),
-                        )
-                        childHandleInfo.size = p.get_size()
-                        subHandleInfo.hasSubDir = True
-
-                    subHandleInfo.children.append(childHandleInfo)
-                    _recursive_cache(p, archivePath, childHandleInfo)
-                    subHandleInfo.size = i
-
-                subHandleInfo.loaded = True
-                self._sort_and_update_indexes(subHandleInfo)
-                return
-
-            if handle.is_file():
-                subHandleInfo.loaded = True
-                return
-            
-            for i, p in enumerate(handle.get_handles()):
-                if p.get_name() in subHandleMap:
-                    childHandleInfo = subHandleMap[p.get_name()]
-                elif p.is_file():
-                    if p.get_extension() == ".arc":
-                        childHandleInfo = self._create_archive_handle(
-                            archivePath / p.get_path(),
-                            p.get_size(),
-                            False,
-                            subHandleInfo,
-                            QModelIndex(),
-                        )
-                        childHandleInfo = JSystemFSModel._HandleInfo(
-                            row=subHandleInfo.size,
-                            path=archivePath / p.get_path(),
-                            parent=subHandleInfo,
-                            children=[],
-                            fsKind=fsKind,
-                            size=p.get_size(),
-                        )
-                    else:
-                        fsKind = JSystemFSModel._FsKind.FILE
-
-                    childHandleInfo = JSystemFSModel._HandleInfo(
-                        row=subHandleInfo.size,
-                        path=archivePath / p.get_path(),
-                        parent=subHandleInfo,
-                        children=[],
-                        fsKind=fsKind,
-                        size=p.get_size(),
-                    )
-                else:
-                    childHandleInfo = self._create_directory_handle(
-                        archivePath / p.get_path(), False, subHandleInfo, QModelIndex()
-                    )
-                    childHandleInfo.size = p.get_size()
-                    subHandleInfo.hasSubDir = True
-
-                subHandleInfo.children.append(childHandleInfo)
-                _recursive_cache(p, archivePath, childHandleInfo)
-                subHandleInfo.size = i
-
-            subHandleInfo.loaded = True
-            self._sort_and_update_indexes(subHandleInfo)
-
         if not index.isValid():
             return
 
@@ -1878,7 +1830,7 @@ class JSystemFSModel(QAbstractItemModel):
         if self.is_child_of_archive(index):
             parentArchiveIndex = self.get_parent_archive(index)
             parentArchivePath = self.get_path(parentArchiveIndex)
-            parentArchive = self._archives[parentArchivePath]
+            parentArchive = self._get_archive(parentArchivePath)
 
             if not basePath.is_relative_to(parentArchivePath):
                 return
@@ -1888,28 +1840,119 @@ class JSystemFSModel(QAbstractItemModel):
             if handle is None:
                 return
 
-            archive = ResourceArchive.from_bytes(BytesIO(handle.get_data()))
+            archive = handle.open_archive()
         else:
             if decompressed_data is not None:
-                archive = ResourceArchive.from_bytes(decompressed_data)
+                archive = ResourceArchive.from_bytes(decompressed_data, lazy=True)
             else:
-                with open(basePath, "rb") as f:
-                    archive = ResourceArchive.from_bytes(f)
+                archive = ResourceArchive.from_file(basePath, lazy=False)
 
         if archive is None:
             return
 
+        manifest = ArchiveManifest.from_archive(archive)
+        if self._manifestCache is not None and not self.is_child_of_archive(index):
+            self._manifestCache.put(Path(basePath), manifest)
+
         with QWriteLocker(self._fsLock):
-            handleInfo: JSystemFSModel._HandleInfo = index.internalPointer()
             self._archives[basePath] = archive
-            _recursive_cache(archive, basePath, handleInfo)
+            self._archiveManifests.pop(basePath, None)
+            self._cache_manifest(index, basePath, manifest)
+
+    def _cache_manifest(
+        self,
+        index: QModelIndex | QPersistentModelIndex,
+        archivePath: PurePath,
+        manifest: ArchiveManifest,
+    ) -> None:
+        handleInfo: JSystemFSModel._HandleInfo = index.internalPointer()
+
+        # Reuse the existing infos so persistent indexes survive a recache
+        oldInfos: dict[PurePath, JSystemFSModel._HandleInfo] = {}
+        toVisit = list(handleInfo.children)
+        while toVisit:
+            info = toVisit.pop()
+            oldInfos[info.path] = info
+            toVisit.extend(info.children)
+
+        dirInfos: dict[PurePath, JSystemFSModel._HandleInfo] = {
+            archivePath: handleInfo
+        }
+        for info in dirInfos.values():
+            info.children.clear()
+            info.size = 0
+
+        for entry in manifest.entries:
+            path = archivePath / entry.get_path()
+            parentInfo = dirInfos[path.parent]
+
+            childInfo = oldInfos.get(path)
+            if childInfo is None:
+                if entry.is_directory():
+                    childInfo = self._create_directory_handle(
+                        path, False, parentInfo, None
+                    )
+                elif entry.get_path().suffix == ".arc":
+                    childInfo = self._create_archive_handle(
+                        path, entry.size, False, parentInfo, None
+                    )
+                else:
+                    childInfo = self._create_file_handle(
+                        path, entry.size, parentInfo, None
+                    )
+            else:
+                childInfo.children.clear()
+                childInfo.parent = parentInfo
+
+            if entry.is_directory():
+                childInfo.size = 0
+                childInfo.loaded = True
+                dirInfos[path] = childInfo
+                parentInfo.hasSubDir = True
+            else:
+                childInfo.size = entry.size
+
+            childInfo.row = parentInfo.size
+            parentInfo.children.append(childInfo)
+            parentInfo.size += 1
+
+        handleInfo.loaded = True
+        for info in dirInfos.values():
+            self._sort_and_update_indexes(info)
+
+    def _get_archive(self, path: PurePath) -> ResourceArchive:
+        """
+        Returns the archive cached at `path`, loading it if
+        it was only listed from a manifest so far
+        """
+        archive = self._archives.get(path)
+        if archive is not None:
+            return archive
+
+        if path not in self._archiveManifests:
+            raise KeyError(path)
+
+        with Path(path).open("rb") as f:
+            is_yaz0 = is_yaz0_compressed(f.read(4))
+        if is_yaz0:
+            with Path(path).open("rb") as f:
+                archive = ResourceArchive.from_bytes(decompress_yaz0(f), lazy=True)
+        else:
+            archive = ResourceArchive.from_file(path, lazy=False)
+
+        if archive is None:
+            raise KeyError(path)
+
+        self._archives[path] = archive
+        del self._archiveManifests[path]
+        return archive
 
     def _create_file_handle(
         self,
         path: PurePath,
         dsize: int,
         parentInfo: JSystemFSModel._HandleInfo,
-        parentArchive: QModelIndex,
+        parentArchive: QModelIndex | None,
     ) -> JSystemFSModel._HandleInfo:
         return JSystemFSModel._HandleInfo(
             row=parentInfo.size,
@@ -1929,7 +1972,7 @@ class JSystemFSModel(QAbstractItemModel):
         dsize: int,
         hasSubDir: bool,
         parentInfo: JSystemFSModel._HandleInfo,
-        parentArchive: QModelIndex,
+        parentArchive: QModelIndex | None,
     ) -> JSystemFSModel._HandleInfo:
         return JSystemFSModel._HandleInfo(
             row=parentInfo.size,
@@ -1948,7 +1991,7 @@ class JSystemFSModel(QAbstractItemModel):
         path: PurePath,
         hasSubDir: bool,
         parentInfo: JSystemFSModel._HandleInfo,
-        parentArchive: QModelIndex,
+        parentArchive: QModelIndex | None,
     ) -> JSystemFSModel._HandleInfo:
         return JSystemFSModel._HandleInfo(
             row=parentInfo.size,
@@ -2072,7 +2115,7 @@ class JSystemFSModel(QAbstractItemModel):
         # Source exists in filesystem
         if destArchiveIndex.isValid():  # Destination exists in an archive
             destArchivePath = self.get_path(destArchiveIndex)
-            destArchive = self._archives[destArchivePath]
+            destArchive = self._get_archive(destArchivePath)
             virtualDestPath = destFolder.relative_to(destArchivePath)
             destHandle = destArchive.get_handle(virtualDestPath)
             if destHandle:  # Destination move exists
@@ -2108,10 +2151,11 @@ class JSystemFSModel(QAbstractItemModel):
             if destParentHandle is None:
                 destParentHandle = destArchive
 
-            if not destParentHandle.add_handle(
-                sourceHandle, action=FileConflictAction.REPLACE
-            ):
-                return False
+            with QWriteLocker(self._fsLock):
+                if not destParentHandle.add_handle(
+                    sourceHandle, action=FileConflictAction.REPLACE
+                ):
+                    return False
 
             if not cutSource:
                 return True
@@ -2227,7 +2271,7 @@ class JSystemFSModel(QAbstractItemModel):
 
         with QReadLocker(self._fsLock):
             destArchivePath = self.get_path(destArchiveIndex)
-            destArchive = self._archives[destArchivePath]
+            destArchive = self._get_archive(destArchivePath)
 
         virtualPath = destPath.relative_to(destArchivePath)
         destHandle = destArchive.get_handle(virtualPath)
@@ -2259,8 +2303,9 @@ class JSystemFSModel(QAbstractItemModel):
             fileData = QByteArray()
             inputStream >> fileData
 
-            destParentHandle.remove_path(destPath.name)
-            destParentHandle.new_file(destPath.name, fileData.data())
+            with QWriteLocker(self._fsLock):
+                destParentHandle.remove_path(destPath.name)
+                destParentHandle.new_file(destPath.name, fileData.data())
 
             successful = True
 
@@ -2282,8 +2327,9 @@ class JSystemFSModel(QAbstractItemModel):
             fileData = QByteArray()
             inputStream >> fileData
 
-            destParentHandle.remove_path(thisName)
-            destParentHandle.new_file(thisName, fileData.data())
+            with QWriteLocker(self._fsLock):
+                destParentHandle.remove_path(thisName)
+                destParentHandle.new_file(thisName, fileData.data())
 
             successful = True
 
@@ -2342,7 +2388,7 @@ class JSystemFSModel(QAbstractItemModel):
                 return False
 
             srcArchivePath = self.get_path(srcArchiveIndex)
-            srcArchive = self._archives[srcArchivePath]
+            srcArchive = self._get_archive(srcArchivePath)
 
             virtualPath = srcPath.relative_to(srcArchivePath)
             srcHandle = srcArchive.get_handle(virtualPath)
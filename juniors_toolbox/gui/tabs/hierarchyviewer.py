@@ -675,6 +675,7 @@ class NameRefHierarchyWidget(A_DockingInterface):
         from juniors_toolbox.gui.tabs.propertyviewer import SelectedPropertiesWidget
 
         obj.key.set_ref(key)
+        obj.invalidate_data()
         objExplicitName = obj.get_explicit_name()
 
         propertiesTab = TabWidgetManager.get_tab(SelectedPropertiesWidget)
@@ -31,11 +31,12 @@ from juniors_toolbox.utils.j3d.anim.btp import BTP
 from juniors_toolbox.utils.j3d.anim.bva import BVA
 from juniors_toolbox.utils.j3d.bmd import BMD
 from juniors_toolbox.utils.prm import PrmFile
+from juniors_toolbox.utils.rarcmanifest import ArchiveManifestCache
 from juniors_toolbox.utils.types import RGB8, RGB32, RGBA8, Vec3f
 from PySide6.QtCore import (QAbstractItemModel, QDataStream, QEvent, QIODevice, QByteArray, QThread, QRunnable,
                             QLine, QMimeData, QModelIndex, QObject, QPoint,
                             QSize, Qt, QThread, QTimer, QUrl, Signal, QItemSelectionModel, QPersistentModelIndex,
-                            SignalInstance, Slot)
+                            QStandardPaths, SignalInstance, Slot)
 from PySide6.QtGui import (QAction, QColor, QCursor, QDrag, QDragEnterEvent, QClipboard,
                            QDragLeaveEvent, QDragMoveEvent, QDropEvent, QIcon,
                            QImage, QKeyEvent, QMouseEvent, QPaintDevice, QContextMenuEvent,
@@ -920,8 +921,11 @@ class ProjectViewerWidget(A_DockingInterface):
         self._focusedPath = PurePath()
 
         self.fsModelThread = QThread(self)
+        manifestCache = ArchiveManifestCache(
+            Path(QStandardPaths.writableLocation(QStandardPaths.CacheLocation)) / "rarc_manifests"
+        )
         self.fsModel = JSystemFSModel(
-            Path("__default__"), False, self
+            Path("__default__"), False, self, manifestCache
         )
         # self.fsModel.moveToThread(self.fsModelThread)
 
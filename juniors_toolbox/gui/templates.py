@@ -2,9 +2,10 @@ import json
 from pathlib import Path
 from typing import Iterable, Optional
 
-from PySide6.QtCore import QObject
+from PySide6.QtCore import QObject, QStandardPaths
 from juniors_toolbox.utils import VariadicArgs, VariadicKwargs
 from juniors_toolbox.objects.template import Template
+from juniors_toolbox.objects.templatecache import TemplateCache
 
 
 class ToolboxTemplates(QObject):
@@ -24,7 +25,11 @@ class ToolboxTemplates(QObject):
         self.__singleton_ready = True
 
         self.__templatePath = Path("Templates")
-        self.__templates: dict[str, Template] = {}
+        # Templates are loaded from the cache the first time they are asked for
+        self.__templates: dict[str, Optional[Template]] = {}
+        self.__cache = TemplateCache(
+            Path(QStandardPaths.writableLocation(QStandardPaths.CacheLocation)) / "templates.bin"
+        )
         self.reload()
 
     @staticmethod
@@ -40,13 +45,23 @@ class ToolboxTemplates(QObject):
         self.__templates.pop(template.get_name())
 
     def get_template(self, objname: str) -> Optional[Template]:
-        if objname in self.__templates:
-            return self.__templates[objname]
-        return None
+        if objname not in self.__templates:
+            return None
+
+        template = self.__templates[objname]
+        if template is None:
+            template = self.__cache.get_template(objname)
+            if template is None:
+                self.__templates.pop(objname)
+                return None
+            self.__templates[objname] = template
+        return template
 
     def iter_templates(self) -> Iterable[Template]:
-        for template in self.__templates.values():
-            yield template
+        for name in list(self.__templates):
+            template = self.get_template(name)
+            if template is not None:
+                yield template
 
     def reload(self):
         from juniors_toolbox.gui.tabs import TabWidgetManager
@@ -55,20 +70,20 @@ class ToolboxTemplates(QObject):
         console = TabWidgetManager.get_tab(ConsoleLogWidget)
 
         self.__templates.clear()
-        for templateFile in self.__templatePath.iterdir():
-            template = Template(templateFile.stem)
-            successful = template.load(self.__templatePath)
-            if not successful:
-                console.error(
-                    f"Error loading template {template.get_name()}"
-                )
-                continue
-            self.__templates[template.get_name()] = template
-
-            console.info(
-                f"Successfully loaded \"{template.get_name()}\""
+        cached = self.__cache.load(self.__templatePath)
+        for name in self.__cache.get_invalid_names():
+            console.error(
+                f"Error loading template {name}"
             )
 
+        names = self.__cache.get_names()
+        self.__templates = dict.fromkeys(names)
+
+        console.info(
+            f"Successfully loaded {len(names)} templates" +
+            (" from cache" if cached else "")
+        )
+
     def load(self, template: Template):
         template.load(self.__templatePath)
 
@@ -5,7 +5,8 @@ import json
 from pathlib import Path
 from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, TextIO, Tuple, Union
 
-from juniors_toolbox.objects.value import A_Member, MemberComment, MemberEnum, MemberStruct, MemberValue, QualifiedName, ValueType
+from juniors_toolbox.objects.template import Template, TemplateLayout
+from juniors_toolbox.objects.value import A_Member, MemberComment, MemberEnum, MemberStruct, MemberValue, QualifiedName, ValueType, clone_members, members_match
 from juniors_toolbox.utils.types import RGB32, RGB8, RGBA8, Transform, Vec3f
 from juniors_toolbox.utils import A_Serializable, VariadicArgs, VariadicKwargs, jdrama
 from juniors_toolbox.utils.iohelper import read_string, read_uint16, read_uint32, write_string, write_uint16, write_uint32
@@ -56,12 +57,45 @@ class A_SceneObject(jdrama.NameRef, ABC):
         Create a new object
         """
         super().__init__(nameref)
-        self.key = jdrama.NameRef("(null)")
         self._members: list[A_Member] = []
         self._parent: Optional[GroupObject] = None
+        self._template: Optional[Template] = None
+
+        # Serialized member and total sizes, dropped by `invalidate_data`.
+        # Member data itself isn't kept, values like transforms can be edited in place
+        self._memberSize: Optional[int] = None
+        self._dataSize: Optional[int] = None
 
+        self.key = jdrama.NameRef("(null)")
         self.init_members(subkind)
 
+    @property
+    def key(self) -> jdrama.NameRef:
+        return self._key
+
+    @key.setter
+    def key(self, key: jdrama.NameRef):
+        self._key = key
+        self.invalidate_data()
+
+    def set_ref(self, nameref: str) -> None:
+        super().set_ref(nameref)
+        self.invalidate_data()
+
+    def invalidate_data(self):
+        """
+        Drop the cached sizes of this object and of the groups holding it
+
+        Must be called whenever the name, key or members of this object change
+        outside of the `A_Member` and `A_SceneObject` setters
+        """
+        self._memberSize = None
+        self._dataSize = None
+        parent = self._parent
+        while parent is not None and parent._dataSize is not None:
+            parent._dataSize = None
+            parent = parent._parent
+
     def get_explicit_name(self) -> str:
         """
         Return the described name of this object
@@ -86,14 +120,38 @@ class A_SceneObject(jdrama.NameRef, ABC):
         write_uint32(data, self.get_data_size())
         data.write(super().to_bytes())
         data.write(self.key.to_bytes())
-        data.write(self.get_member_data().getvalue())
+        data.write(self._get_member_bytes())
         return data.getvalue()
 
     def get_simple_data_size(self) -> int:
         """
         Get the size of the data of this object
         """
-        return 12 + len(self.get_ref()) + len(self.key) + len(self.get_member_data().getbuffer())
+        if self._memberSize is None:
+            self._memberSize = len(self._get_member_bytes())
+        return 12 + len(self.get_ref()) + len(self.key) + self._memberSize
+
+    def save(self, stream: BinaryIO) -> None:
+        """
+        Write this object and its children depth-first to `stream`
+
+        Each length is patched in once the object's children are written,
+        so nothing is serialized into an intermediate buffer. `stream`
+        must be seekable.
+        """
+        start = stream.tell()
+        write_uint32(stream, 0)
+        stream.write(super().to_bytes())
+        stream.write(self.key.to_bytes())
+        stream.write(self._get_member_bytes())
+        for obj in self.iter_grouped_children():
+            obj.save(stream)
+
+        end = stream.tell()
+        stream.seek(start)
+        write_uint32(stream, end - start)
+        stream.seek(end)
+        self._dataSize = end - start
 
     def get_offset_of(self, name: QualifiedName, relative: bool = True) -> int:
         """
@@ -204,12 +262,35 @@ class A_SceneObject(jdrama.NameRef, ABC):
         """
         Get the raw data of this object's values
         """
+        return BytesIO(self._get_member_bytes())
+
+    def _get_member_bytes(self) -> bytes:
+        members = self._members
+        if self.get_ref() == "MapObjBase" and self.key.get_ref() != "AirportPole":
+            members = [
+                member for member in members if member.get_formatted_name() != "PoleLength"
+            ]
+
         data = BytesIO()
-        for member in self.get_members(includeArrays=False):
-            if member.get_formatted_name() == "PoleLength" and self.get_ref() == "MapObjBase" and self.key.get_ref() != "AirportPole":
-                continue
-            member.save(data)
-        return data
+        layout = self.get_member_layout(members)
+        if layout is not None:
+            layout.save(members, data)
+        else:
+            for member in members:
+                member.save(data)
+        return data.getvalue()
+
+    def get_member_layout(self, members: Optional[list[A_Member]] = None) -> Optional[TemplateLayout]:
+        """
+        Get the compiled binary layout of this object's members, or of `members` if given
+
+        Returns None if this object has no template
+        """
+        if self._template is None:
+            return None
+        if members is None:
+            members = self._members
+        return self._template.get_layout(members)
 
     def has_member(self, name: QualifiedName) -> bool:
         """
@@ -226,19 +307,29 @@ class A_SceneObject(jdrama.NameRef, ABC):
         """
         Initialize the members of this object from the json template data
 
+        The members built for each subkind are kept by the template, so later
+        objects of the same kind are cloned from them instead
+
         `subKind`: Subset of this obj used for unique Wizard entries
 
         Returns True if successful
         """
         from juniors_toolbox.gui.templates import ToolboxTemplates
-        from juniors_toolbox.objects.template import Template
 
         self._members = []
+        self._template = None
 
         templateManager = ToolboxTemplates.get_instance()
         template = templateManager.get_template(self.get_ref())
         if template is None:
             return False
+        self._template = template
+
+        prototype = template.get_prototype(subkind)
+        if prototype is not None:
+            self._members = clone_members(prototype)
+            self._claim_members()
+            return True
 
         wizardInfo = template.get_wizard(subkind)
         if wizardInfo is None:
@@ -315,8 +406,18 @@ class A_SceneObject(jdrama.NameRef, ABC):
             self._members.append(_init_struct_member(
                 name, template, info, wizardInfo))
 
+        prototype = clone_members(self._members)
+        assert members_match(prototype, self._members), \
+            f"Prototype of `{self.get_ref()}` ({subkind}) doesn't match its template"
+        template.set_prototype(subkind, prototype)
+        self._claim_members()
         return True
 
+    def _claim_members(self):
+        for member in self._members:
+            member._owner = self
+        self.invalidate_data()
+
     def create_member(
         self, *,
         index: int,
@@ -352,6 +453,8 @@ class A_SceneObject(jdrama.NameRef, ABC):
                         self._members.insert(index, member)
                     else:
                         self._members.append(member)
+                    member._owner = self
+                    self.invalidate_data()
                     return member
             else:
                 if not parentMember.has_child(memberName):
@@ -364,6 +467,8 @@ class A_SceneObject(jdrama.NameRef, ABC):
             member._name = f"{memberName}{i}"
 
         self._members.append(member)
+        member._owner = self
+        self.invalidate_data()
         return member
 
     @abstractmethod
@@ -459,13 +564,17 @@ class MapObject(A_SceneObject):
         thisObj = cls(objName.get_ref())
         thisObj.key = objKey
 
-        for member in thisObj.get_members(includeArrays=False):
-            if member._type == ValueType.COMMENT:
-                continue
-            fileOffset = data.tell()
-            if fileOffset >= objEndPos:
-                break
-            member.load(data, objEndPos)
+        layout = thisObj.get_member_layout()
+        if layout is not None:
+            layout.load(thisObj._members, data, objEndPos)
+        else:
+            for member in thisObj.get_members(includeArrays=False):
+                if member._type == ValueType.COMMENT:
+                    continue
+                fileOffset = data.tell()
+                if fileOffset >= objEndPos:
+                    break
+                member.load(data, objEndPos)
 
         thisObj._parent = None
         return thisObj
@@ -653,11 +762,7 @@ class GroupObject(A_SceneObject):
         Converts this object to raw bytes
         """
         data = BytesIO()
-        data.write(self.get_simple_data())
-
-        for obj in self._grouped:
-            data.write(obj.to_bytes())
-
+        self.save(data)
         return data.getvalue()
 
     def copy(self, *, deep: bool = False) -> "GroupObject":
@@ -694,9 +799,12 @@ class GroupObject(A_SceneObject):
         """
         Gets the length of this object in bytes
         """
+        if self._dataSize is not None:
+            return self._dataSize
         length = self.get_simple_data_size()
         for obj in self._grouped:
             length += obj.get_data_size()
+        self._dataSize = length
         return length
 
     def add_to_group(self, obj: "A_SceneObject", /):
@@ -708,6 +816,7 @@ class GroupObject(A_SceneObject):
         self._grouped.append(obj)
         obj._parent = self
         self.set_member(QualifiedName("Grouped"), len(self._grouped))
+        self.invalidate_data()
 
     def remove_from_group(self, obj: "A_SceneObject", /):
         """
@@ -717,6 +826,7 @@ class GroupObject(A_SceneObject):
             self._grouped.remove(obj)
             obj._parent = None
             self.set_member(QualifiedName("Grouped"), len(self._grouped))
+            self.invalidate_data()
         except ValueError:
             pass
 
@@ -1,18 +1,214 @@
 
 import json
 from pathlib import Path
-from typing import Any, Iterable, Iterator, Optional, Tuple, Type, TypeAlias
+from struct import Struct
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Iterable, Iterator, Optional, Sequence, Tuple, Type, TypeAlias
 
 from PySide6.QtCore import QObject
 from juniors_toolbox.utils import VariadicArgs, VariadicKwargs
 from juniors_toolbox.utils.filesystem import resource_path
 
+if TYPE_CHECKING:
+    from juniors_toolbox.objects.value import A_Member
+
 
 TemplateEnumType: TypeAlias = dict[str, Any]
 TemplateStructType: TypeAlias = dict[str, Any]
 TemplateMemberType: TypeAlias = dict[str, Any]
 TemplateWizardType: TypeAlias = dict[str, Any]
 
+_STRING_LENGTH = Struct(">H")
+# Number of values each `TEMPLATE_TYPE_STRUCT_TABLE` format unpacks to
+_RUN_FIELD_COUNTS: dict[str, int] = {}
+
+
+class _ValueRun():
+    """
+    Consecutive single fixed size values, read and written as one `Struct`
+    """
+
+    def __init__(self, fmt: str, slots: list[tuple[int, int, Optional[Callable[[tuple], Any]], Optional[Callable[[Any], Iterable]]]]):
+        self.struct = Struct(">" + fmt)
+        # (member index, field count, decoder, encoder)
+        self.slots = slots
+
+    def load(self, members: Sequence["A_Member"], stream: BinaryIO, endPos: int) -> None:
+        if stream.tell() + self.struct.size > endPos:
+            # The object ends inside this run, so read value by value for the truncated members
+            for index, _, _, _ in self.slots:
+                members[index].load(stream, endPos)
+            return
+
+        values = self.struct.unpack(stream.read(self.struct.size))
+        i = 0
+        for index, count, decode, _ in self.slots:
+            if decode is None:
+                members[index]._value = values[i]
+            else:
+                members[index]._value = decode(values[i:i+count])
+            i += count
+
+    def save(self, members: Sequence["A_Member"], stream: BinaryIO) -> None:
+        values: list[Any] = []
+        for index, _, _, encode in self.slots:
+            if encode is None:
+                values.append(members[index]._value)
+            else:
+                values.extend(encode(members[index]._value))
+        stream.write(self.struct.pack(*values))
+
+
+class _StringStep():
+    """
+    A single length prefixed string
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+
+    def load(self, members: Sequence["A_Member"], stream: BinaryIO, endPos: int) -> None:
+        member = members[self.index]
+        pos = stream.tell()
+        if pos >= endPos:
+            return
+
+        strlen = _STRING_LENGTH.unpack(stream.read(2))[0]
+        if strlen == 0:
+            member._value = ""
+            return
+
+        raw = stream.read(strlen)
+        if strlen > 1 and len(raw) == strlen and b"\x00" not in raw:
+            member._value = raw.decode("shift-jis")
+        else:
+            # Terminated early or truncated, let the member handle it
+            stream.seek(pos)
+            member.load(stream, endPos)
+
+    def save(self, members: Sequence["A_Member"], stream: BinaryIO) -> None:
+        raw = members[self.index]._value.encode("shift-jis")
+        stream.write(_STRING_LENGTH.pack(len(raw)) + raw)
+
+
+class _StructStep():
+    """
+    A struct member, each element laid out by the struct's own layout
+    """
+
+    def __init__(self, index: int, layout: "TemplateLayout"):
+        self.index = index
+        self.layout = layout
+
+    def load(self, members: Sequence["A_Member"], stream: BinaryIO, endPos: int) -> None:
+        member = members[self.index]
+        for i in range(member.get_array_size()):
+            if stream.tell() >= endPos:
+                break
+            self.layout.load(list(member[i].get_children(includeArrays=False)), stream, endPos)
+
+    def save(self, members: Sequence["A_Member"], stream: BinaryIO) -> None:
+        member = members[self.index]
+        for i in range(member.get_array_size()):
+            if i > len(member._arrayInstances):
+                break
+            self.layout.save(list(member[i].get_children(includeArrays=False)), stream)
+
+
+class _MemberStep():
+    """
+    Any other member, read and written by the member itself
+    """
+
+    def __init__(self, index: int, skipLoad: bool = False):
+        self.index = index
+        self.skipLoad = skipLoad
+
+    def load(self, members: Sequence["A_Member"], stream: BinaryIO, endPos: int) -> None:
+        if not self.skipLoad:
+            members[self.index].load(stream, endPos)
+
+    def save(self, members: Sequence["A_Member"], stream: BinaryIO) -> None:
+        members[self.index].save(stream)
+
+
+class TemplateLayout():
+    """
+    Binary layout plan of a list of members
+
+    Runs of single fixed size values are read and written through one
+    precompiled `Struct`, while strings, structs and arrays sit between
+    the runs and are handled one at a time.
+    """
+
+    def __init__(self, steps: list[_ValueRun | _StringStep | _StructStep | _MemberStep]):
+        self._steps = steps
+
+    @classmethod
+    def compile(cls, members: Sequence["A_Member"], isObject: bool = False) -> "TemplateLayout":
+        """
+        Compile the layout of `members`
+
+        `isObject`: If true, these are the members of an object, whose comments are never loaded
+        """
+        from juniors_toolbox.objects.value import (TEMPLATE_TYPE_STRUCT_TABLE,
+                                                   MemberEnum, MemberStruct,
+                                                   MemberValue, ValueType)
+
+        steps: list[_ValueRun | _StringStep | _StructStep | _MemberStep] = []
+        runFormat = ""
+        runSlots: list[tuple[int, int, Optional[Callable[[tuple], Any]], Optional[Callable[[Any], Iterable]]]] = []
+
+        def _end_run():
+            nonlocal runFormat, runSlots
+            if runSlots:
+                steps.append(_ValueRun(runFormat, runSlots))
+            runFormat = ""
+            runSlots = []
+
+        for i, member in enumerate(members):
+            isSingleValue = (
+                type(member) in (MemberValue, MemberEnum) and
+                isinstance(member._arraySize, int) and
+                member.get_array_size() == 1
+            )
+            if isSingleValue and member._type in TEMPLATE_TYPE_STRUCT_TABLE:
+                fmt, decode, encode = TEMPLATE_TYPE_STRUCT_TABLE[member._type]
+                count = _RUN_FIELD_COUNTS.get(fmt)
+                if count is None:
+                    fmtStruct = Struct(">" + fmt)
+                    count = len(fmtStruct.unpack(bytes(fmtStruct.size)))
+                    _RUN_FIELD_COUNTS[fmt] = count
+                runFormat += fmt
+                runSlots.append((i, count, decode, encode))
+                continue
+
+            _end_run()
+            if isSingleValue and member._type in {ValueType.STR, ValueType.STRING}:
+                steps.append(_StringStep(i))
+            elif type(member) is MemberStruct:
+                steps.append(_StructStep(i, cls.compile(list(member.get_children(includeArrays=False)))))
+            else:
+                steps.append(_MemberStep(i, isObject and member._type == ValueType.COMMENT))
+        _end_run()
+
+        return cls(steps)
+
+    def load(self, members: Sequence["A_Member"], stream: BinaryIO, endPos: int) -> None:
+        """
+        Read `members` from `stream`, stopping at `endPos`
+        """
+        for step in self._steps:
+            if stream.tell() >= endPos:
+                break
+            step.load(members, stream, endPos)
+
+    def save(self, members: Sequence["A_Member"], stream: BinaryIO) -> None:
+        """
+        Write `members` to `stream`
+        """
+        for step in self._steps:
+            step.save(members, stream)
+
 
 class Template():
     def __init__(self, objName: str):
@@ -22,6 +218,8 @@ class Template():
         self._structs: dict[str, TemplateStructType] = {}
         self._members: dict[str, TemplateMemberType] = {}
         self._wizards: dict[str, TemplateWizardType] = {}
+        self._layouts: dict[tuple, TemplateLayout] = {}
+        self._prototypes: dict[str, list["A_Member"]] = {}
 
     def get_name(self) -> str:
         return self._objName
@@ -42,6 +240,7 @@ class Template():
 
     def set_enum(self, name: str, info: TemplateEnumType):
         self._enums[name] = info
+        self._prototypes.clear()
 
     def iter_enums(self) -> Iterator[Tuple[str, TemplateEnumType]]:
         for _enum in self._enums.items():
@@ -54,6 +253,8 @@ class Template():
 
     def set_struct(self, name: str, info: TemplateStructType):
         self._structs[name] = info
+        self._layouts.clear()
+        self._prototypes.clear()
 
     def iter_structs(self) -> Iterator[Tuple[str, TemplateStructType]]:
         for _struct in self._structs.items():
@@ -66,6 +267,8 @@ class Template():
 
     def set_member(self, name: str, info: TemplateMemberType):
         self._members[name] = info
+        self._layouts.clear()
+        self._prototypes.clear()
 
     def iter_members(self) -> Iterator[Tuple[str, TemplateMemberType]]:
         for _member in self._members.items():
@@ -78,11 +281,37 @@ class Template():
 
     def set_wizard(self, name: str, info: TemplateWizardType):
         self._wizards[name] = info
+        self._prototypes.clear()
 
     def iter_wizards(self) -> Iterator[Tuple[str, TemplateWizardType]]:
         for _wizard in self._wizards.items():
             yield _wizard
 
+    def get_prototype(self, subkind: str) -> Optional[list["A_Member"]]:
+        """
+        Get the members built from this template for `subkind`, which are to be cloned and never modified
+        """
+        return self._prototypes.get(subkind)
+
+    def set_prototype(self, subkind: str, members: list["A_Member"]):
+        self._prototypes[subkind] = members
+
+    def get_layout(self, members: Sequence["A_Member"]) -> TemplateLayout:
+        """
+        Get the binary layout of an object's members, compiling it the first time
+        members of this shape are seen
+        """
+        key = tuple(
+            (type(member), member._name, member._type,
+             member._arraySize if isinstance(member._arraySize, int) else None)
+            for member in members
+        )
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = TemplateLayout.compile(members, isObject=True)
+            self._layouts[key] = layout
+        return layout
+
     def load(self, _dir: Path, /) -> bool:
         filePath = _dir / (self._objName + ".json")
         if not filePath.exists():
@@ -98,6 +327,13 @@ class Template():
         except Exception:
             return False
 
+        self.load_data(templateData)
+        return True
+
+    def load_data(self, templateData: dict[str, dict[str, Any]], /):
+        """
+        Load this template from its parsed json data, which is consumed
+        """
         longname, objdata = templateData.popitem()
         self.set_long_name(longname)
 
@@ -120,8 +356,6 @@ class Template():
         for name, _wizard in wizardInfo.items():
             self.set_wizard(name, _wizard)
 
-        return True
-
     def save(self, _dir: Path, /):
         _enumInfo = self._enums.copy()
         for name, _enum in _enumInfo.items():
@@ -0,0 +1,190 @@
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from struct import Struct
+from typing import Any, Optional
+
+from juniors_toolbox.objects.template import Template
+
+_HEADER = Struct(">4sH20sI")
+
+
+class TemplateCache:
+    """
+    Every template of a folder, parsed once and kept in one binary file
+
+    The file starts with an index of the templates, which is all that is
+    read up front. Each template is then unpickled the first time it is
+    asked for. The cache is keyed by the folder's file names, sizes and
+    mtimes, and rebuilds itself when any of them change.
+
+    The file is mapped while its index is in use, so another cache
+    replacing it on disk can't change the data the index points to.
+    """
+
+    MAGIC = b"JTTC"
+    VERSION = 1
+
+    def __init__(self, cachePath: Path):
+        self.cachePath = cachePath
+        self._index: dict[str, tuple[int, int]] = {}
+        self._invalid: list[str] = []
+        self._dataOffset = 0
+        self._map: Optional[mmap.mmap] = None
+        self._templateFolder: Optional[Path] = None
+        # Templates of a cache that couldn't be written, kept in memory instead
+        self._blobs: dict[str, bytes] = {}
+
+    def load(self, templateFolder: Path) -> bool:
+        """
+        Read the index of the cache for `templateFolder`, rebuilding the cache if it is stale
+
+        Returns True if the existing cache was used
+        """
+        self._templateFolder = templateFolder
+        key = self._get_key(templateFolder)
+        if self._read_index(key):
+            return True
+        self._build(templateFolder, key)
+        return False
+
+    def get_names(self) -> list[str]:
+        """
+        Get the name of every cached template
+        """
+        return list(self._index) if self._index else list(self._blobs)
+
+    def get_invalid_names(self) -> list[str]:
+        """
+        Get the name of every template that failed to parse
+        """
+        return self._invalid
+
+    def get_template(self, name: str) -> Optional[Template]:
+        """
+        Load the template named `name` from the cache
+        """
+        blob = self._blobs.get(name)
+        if blob is None:
+            if name not in self._index or self._map is None:
+                return None
+            offset, size = self._index[name]
+            start = self._dataOffset + offset
+            blob = self._map[start : start + size]
+
+        template = Template(name)
+        try:
+            templateData = pickle.loads(blob)
+        except Exception:
+            # Damaged cache data, read the template from its json file instead
+            if self._templateFolder is None or not template.load(self._templateFolder):
+                return None
+            return template
+
+        template.load_data(templateData)
+        return template
+
+    def close(self) -> None:
+        """
+        Unmap the cache file, after which only templates kept in memory can be loaded
+        """
+        self._index = {}
+        self._set_map(None)
+
+    def _read_index(self, key: bytes) -> bool:
+        try:
+            with open(self.cachePath, "rb") as f:
+                cacheMap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return False
+
+        try:
+            magic, version, cacheKey, indexSize = _HEADER.unpack(cacheMap[:_HEADER.size])
+            if magic != self.MAGIC or version != self.VERSION or cacheKey != key:
+                cacheMap.close()
+                return False
+            index, invalid = pickle.loads(cacheMap[_HEADER.size : _HEADER.size + indexSize])
+        except Exception:
+            cacheMap.close()
+            return False
+
+        self._index, self._invalid = index, invalid
+        self._dataOffset = _HEADER.size + indexSize
+        self._blobs = {}
+        self._set_map(cacheMap)
+        return True
+
+    def _build(self, templateFolder: Path, key: bytes) -> None:
+        blobs: dict[str, bytes] = {}
+        invalid: list[str] = []
+        for templateFile in sorted(templateFolder.iterdir()):
+            name = templateFile.stem
+            try:
+                with templateFile.open("r", encoding="utf-8") as f:
+                    templateData: dict[str, dict[str, Any]] = json.load(f)
+                blob = pickle.dumps(templateData, pickle.HIGHEST_PROTOCOL)
+                # Parse it once so broken templates are reported up front
+                Template(name).load_data(templateData)
+            except Exception:
+                invalid.append(name)
+                continue
+            blobs[name] = blob
+
+        index: dict[str, tuple[int, int]] = {}
+        offset = 0
+        for name, blob in blobs.items():
+            index[name] = (offset, len(blob))
+            offset += len(blob)
+        indexData = pickle.dumps((index, invalid), pickle.HIGHEST_PROTOCOL)
+
+        self._invalid = invalid
+        self._index = {}
+        self._blobs = blobs
+        self._set_map(None)
+        try:
+            self.cachePath.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmpName = tempfile.mkstemp(dir=self.cachePath.parent, suffix=".tmp")
+        except OSError:
+            return
+
+        cacheMap: Optional[mmap.mmap] = None
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(self.MAGIC, self.VERSION, key, len(indexData)))
+                f.write(indexData)
+                for blob in blobs.values():
+                    f.write(blob)
+                f.flush()
+                # Mapped before it is moved into place, so this is the data the index describes
+                cacheMap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            os.replace(tmpName, self.cachePath)
+        except (OSError, ValueError):
+            if cacheMap is not None:
+                cacheMap.close()
+            os.remove(tmpName)
+            return
+
+        self._index = index
+        self._dataOffset = _HEADER.size + len(indexData)
+        self._blobs = {}
+        self._set_map(cacheMap)
+
+    def _set_map(self, cacheMap: Optional[mmap.mmap]) -> None:
+        if self._map is not None:
+            self._map.close()
+        self._map = cacheMap
+
+    @staticmethod
+    def _get_key(templateFolder: Path) -> bytes:
+        digest = hashlib.sha1(str(templateFolder.resolve()).encode("utf-8"))
+        with os.scandir(templateFolder) as it:
+            entries = sorted(
+                (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in it
+            )
+        for name, size, mtime in entries:
+            digest.update(f"{name}\0{size}\0{mtime}\0".encode("utf-8"))
+        return digest.digest()
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import struct
 from abc import ABC, abstractmethod
+from copy import deepcopy
 from dataclasses import dataclass, field
 from enum import Enum
 from io import BytesIO
-from typing import Any, BinaryIO, Callable, Dict, Iterable, Optional, overload
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, Iterable, Optional, Sequence, TypeVar, overload
 from juniors_toolbox.objects.template import TemplateEnumType
 from juniors_toolbox.utils import A_Clonable
 
@@ -19,7 +21,10 @@ from juniors_toolbox.utils.iohelper import (read_bool, read_double, read_float,
                                             write_string, write_ubyte,
                                             write_uint16, write_uint32,
                                             write_vec3f)
-from juniors_toolbox.utils.types import RGB8, RGB32, RGBA8, Transform, Vec3f
+from juniors_toolbox.utils.types import RGB8, RGB32, RGBA8, Quaternion, Transform, Vec3f
+
+if TYPE_CHECKING:
+    from juniors_toolbox.objects.object import A_SceneObject
 
 
 class QualifiedName():
@@ -176,6 +181,19 @@ def __write_transform(f: BinaryIO, val: Transform):
     write_vec3f(f, val.scale)
 
 
+def __decode_transform(values: tuple) -> Transform:
+    # Rotating a fresh transform only sets its rotation, so build it directly
+    return Transform(
+        Vec3f(*values[0:3]),
+        Quaternion.from_euler(Vec3f(*values[3:6])),
+        Vec3f(*values[6:9])
+    )
+
+
+def __encode_transform(val: Transform) -> tuple:
+    return (*val.translation, *val.rotation.to_euler(), *val.scale)
+
+
 _ENUM_TO_TYPE_TABLE = {
     ValueType.BOOL: bool,
     ValueType.BYTE: int,
@@ -324,6 +342,34 @@ TEMPLATE_TYPE_WRITE_TABLE: dict[ValueType, Callable[[BinaryIO, Any], None]] = {
 }
 
 
+# Struct format, decoder and encoder of each fixed size type, used to read and
+# write consecutive members at once. Without a decoder/encoder the value is
+# stored as-is in a single field
+TEMPLATE_TYPE_STRUCT_TABLE: dict[ValueType, tuple[str, Optional[Callable[[tuple], Any]], Optional[Callable[[Any], Iterable]]]] = {
+    ValueType.BOOL: ("?", None, lambda val: (val is True,)),
+    ValueType.BYTE: ("B", None, None),
+    ValueType.CHAR: ("B", None, None),
+    ValueType.S8: ("b", None, None),
+    ValueType.U8: ("B", None, None),
+    ValueType.SHORT: ("h", None, None),
+    ValueType.S16: ("h", None, None),
+    ValueType.U16: ("H", None, None),
+    ValueType.S32: ("i", None, None),
+    ValueType.INT: ("i", None, None),
+    ValueType.U32: ("I", None, None),
+    ValueType.F32: ("f", None, None),
+    ValueType.FLOAT: ("f", None, None),
+    ValueType.ENUM: ("I", None, None),
+    ValueType.VECTOR3: ("3f", lambda values: Vec3f(*values), tuple),
+    ValueType.TRANSFORM: ("9f", __decode_transform, __encode_transform)
+}
+
+
+_IMMUTABLE_VALUE_TYPES = (int, float, str, bool, type(None))
+
+_MemberT = TypeVar("_MemberT", bound="A_Member")
+
+
 class A_Member(A_Clonable, ABC):
     """
     Class describing a member of a structure
@@ -340,6 +386,8 @@ class A_Member(A_Clonable, ABC):
         self._arrayIdx: int = 0
         self._arrayInstances: dict[int, "A_Member"] = {}
         self._referencedBy: list["A_Member"] = []
+        # Object this member belongs to, only set on top level members
+        self._owner: Optional["A_SceneObject"] = None
 
     @staticmethod
     def get_formatted_template_name(name: str, arrayidx: int) -> str:
@@ -383,6 +431,7 @@ class A_Member(A_Clonable, ABC):
         # TODO: Check if value is can be set
         if not self.is_read_only() or True:
             self._value = value
+            self._mark_changed()
         else:
             print("Tried setting value of read only member")
 
@@ -432,6 +481,15 @@ class A_Member(A_Clonable, ABC):
 
         return True
 
+    def get_owner(self) -> Optional["A_SceneObject"]:
+        """
+        Get the scene object this `Member` belongs to
+        """
+        member = self
+        while member._parent is not None:
+            member = member._parent
+        return member._owner
+
     def get_qualified_name(self) -> QualifiedName:
         """
         Get the full formatted name of this `Member`, as is scoped from its parents
@@ -483,6 +541,7 @@ class A_Member(A_Clonable, ABC):
         self._arraySize = arraySize
         if isinstance(arraySize, MemberValue):
             arraySize._referencedBy.append(self)
+        self._mark_changed()
 
     @abstractmethod
     def is_struct(self) -> bool:
@@ -554,6 +613,32 @@ class A_Member(A_Clonable, ABC):
     @abstractmethod
     def copy(self, *, deep: bool = False) -> "A_Member": ...
 
+    def _clone(self: _MemberT, clones: dict[int, "A_Member"]) -> _MemberT:
+        """
+        Clone the structure and array instances of this member, see `clone_members`
+        """
+        cls = self.__class__
+        _clone = cls.__new__(cls)
+        _clone.__dict__.update(self.__dict__)
+        if not isinstance(self._value, _IMMUTABLE_VALUE_TYPES):
+            _clone._value = deepcopy(self._value)
+        _clone._parent = None
+        _clone._arrayInstances = {}
+        _clone._referencedBy = []
+        _clone._owner = None
+        clones[id(self)] = _clone
+        for index, instance in self._arrayInstances.items():
+            _clone._arrayInstances[index] = instance._clone(clones)
+        return _clone
+
+    def _mark_changed(self):
+        """
+        Drop the cached data of the object this member belongs to
+        """
+        owner = self.get_owner()
+        if owner is not None:
+            owner.invalidate_data()
+
     def __getitem__(self, index: int | slice) -> "A_Member":
         if isinstance(index, slice):
             return NotImplemented
@@ -567,11 +652,13 @@ class A_Member(A_Clonable, ABC):
         if index-1 in self._arrayInstances:
             item = self._arrayInstances[index-1]
             item._parent = self._parent
+            item._owner = self._owner
             item._arrayIdx = index
             return item
 
         _copy = self.copy(deep=True)
         _copy._parent = self._parent
+        _copy._owner = self._owner
         _copy._arrayIdx = index
         self._arrayInstances[index-1] = _copy
         return _copy
@@ -587,11 +674,14 @@ class A_Member(A_Clonable, ABC):
             self._name = item._name
             self._value = item._value
             self._type = item._type
+            self._mark_changed()
             return
 
         self._arrayInstances[index-1] = item
         item._arrayIdx = index
         item._parent = self.get_parent()
+        item._owner = self._owner
+        self._mark_changed()
 
     def __int__(self) -> int:
         return int(self.get_value())
@@ -696,6 +786,7 @@ class MemberEnum(MemberValue):
             self._value |= self._enumInfo[enum]
         else:
             self._value &= self._enumInfo[enum]
+        self._mark_changed()
 
     def copy(self, *, deep: bool = False) -> "MemberEnum":
         _copy: "MemberEnum" = super().copy(deep=deep)
@@ -703,6 +794,11 @@ class MemberEnum(MemberValue):
         _copy._enumFlags = self._enumFlags
         return _copy
 
+    def _clone(self, clones: dict[int, "A_Member"]) -> "MemberEnum":
+        _clone = super()._clone(clones)
+        _clone._enumFlags = self._enumFlags.copy()
+        return _clone
+
     def __update_enum(self):
         for key, value in self._enumInfo["Flags"].items():
             self._enumFlags[key] = (self.get_value() & value) != 0
@@ -735,6 +831,7 @@ class MemberStruct(A_Member):
 
         self._children[fmtName] = member
         member.set_parent(self)
+        self._mark_changed()
         return True
 
     def remove_child(self, item: str | "A_Member") -> None:
@@ -743,6 +840,7 @@ class MemberStruct(A_Member):
         else:
             child = self._children.pop(item.get_formatted_name())
         child._parent = None
+        self._mark_changed()
 
     def get_child(self, name: str) -> Optional["A_Member"]:
         if name in self._children:
@@ -788,6 +886,17 @@ class MemberStruct(A_Member):
                 _copy.add_child(child)
         return _copy
 
+    def _clone(self, clones: dict[int, "A_Member"]) -> "MemberStruct":
+        _clone = super()._clone(clones)
+        _clone._children = {}
+        for name, child in self._children.items():
+            childClone = child._clone(clones)
+            childClone._parent = _clone
+            for instance in childClone._arrayInstances.values():
+                instance._parent = _clone
+            _clone._children[name] = childClone
+        return _clone
+
 
 class MemberComment(MemberValue):
     """
@@ -808,3 +917,58 @@ class MemberComment(MemberValue):
 
     def save(self, stream: BinaryIO) -> None:
         pass
+
+
+def clone_members(members: Iterable[A_Member]) -> list[A_Member]:
+    """
+    Clone a tree of members without going through their templates
+
+    Array sizes bound to other members in the tree are rebound to the
+    clones of those members.
+    """
+    clones: dict[int, A_Member] = {}
+    cloned = [member._clone(clones) for member in members]
+    for _clone in clones.values():
+        arraySize = _clone._arraySize
+        if isinstance(arraySize, MemberValue):
+            sizeClone = clones.get(id(arraySize))
+            if isinstance(sizeClone, MemberValue):
+                arraySize = sizeClone
+            _clone._arraySize = arraySize
+            if not _clone.is_from_array():
+                arraySize._referencedBy.append(_clone)
+    return cloned
+
+
+def _get_member_data(member: A_Member) -> Optional[bytes]:
+    try:
+        return bytes(member)
+    except (struct.error, TypeError, ValueError):
+        # Template defaults can be unserializable until data is loaded over them
+        return None
+
+
+def members_match(members: Sequence[A_Member], others: Sequence[A_Member]) -> bool:
+    """
+    Check that two trees of members serialize identically and hold the same
+    array instances, so they keep serializing identically as array sizes change
+    """
+    if len(members) != len(others):
+        return False
+    for member, other in zip(members, others):
+        if member._name != other._name or _get_member_data(member) != _get_member_data(other):
+            return False
+        if member._arrayInstances.keys() != other._arrayInstances.keys():
+            return False
+        instances = sorted(member._arrayInstances)
+        if not members_match(
+            [member._arrayInstances[i] for i in instances],
+            [other._arrayInstances[i] for i in instances]
+        ):
+            return False
+        if isinstance(member, MemberStruct):
+            if not isinstance(other, MemberStruct):
+                return False
+            if not members_match(list(member._children.values()), list(other._children.values())):
+                return False
+    return True
@@ -1,4 +1,5 @@
 import sys
+from io import BytesIO
 from pathlib import Path
 from typing import BinaryIO, Iterable, List, Optional, TextIO
 
@@ -27,11 +28,19 @@ class ObjectHierarchy(A_Serializable):
             if obj is not None:
                 this._objects.append(obj)
 
+        return this
+
     def to_bytes(self) -> bytes:
-        data = b""
+        data = BytesIO()
+        self.save(data)
+        return data.getvalue()
+
+    def save(self, stream: BinaryIO) -> None:
+        """
+        Write every object in this hierarchy depth-first to `stream`
+        """
         for obj in self._objects:
-            data += obj.to_bytes()
-        return data
+            obj.save(stream)
 
     def iter_objects(self, deep: bool = False) -> Iterable[A_SceneObject]:
         """
@@ -137,10 +146,10 @@ class SMSScene():
         railPath = scene / "map/scene.ral"
 
         with objPath.open("wb") as f:
-            f.write(self._objects.to_bytes())
+            self._objects.save(f)
 
         with tablePath.open("wb") as f:
-            f.write(self._tables.to_bytes())
+            self._tables.save(f)
 
         with railPath.open("wb") as f:
             f.write(self._raildata.to_bytes())
@@ -182,7 +191,7 @@ class SMSScene():
             return False
 
         with objPath.open("wb") as f:
-            f.write(super().to_bytes())
+            self._objects.save(f)
 
         return True
 
@@ -201,8 +210,7 @@ class SMSScene():
             return False
 
         with tablePath.open("wb") as f:
-            for obj in self.iter_tables(deep=True):
-                f.write(obj.to_bytes())
+            self._tables.save(f)
 
         return True
 
@@ -42,6 +42,14 @@ ReadOnlyBuffer: TypeAlias = bytes  # stable
 WriteableBuffer: TypeAlias = bytearray | memoryview | mmap.mmap  # stable
 ReadableBuffer: TypeAlias = ReadOnlyBuffer | WriteableBuffer  # stable
 
+
+class SupportsRead(Protocol):
+    def read(self, __size: int = ...) -> bytes: ...
+
+
+class SupportsWrite(Protocol):
+    def write(self, __data: ReadableBuffer) -> int: ...
+
 VariadicArgs = Any
 VariadicKwargs = Any
 
@@ -3,108 +3,110 @@ from typing import BinaryIO, List, Optional, Union
 
 from chardet import UniversalDetector
 
+from juniors_toolbox.utils import SupportsRead, SupportsWrite
 
-def read_sbyte(f: BinaryIO):
+
+def read_sbyte(f: SupportsRead):
     return struct.unpack("b", f.read(1))[0]
 
 
-def write_sbyte(f: BinaryIO, val: Union[int, list[int]]):
+def write_sbyte(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("b"*len(val)), *val))
         return
     f.write(struct.pack(">b", val))
 
 
-def read_sint16(f: BinaryIO):
+def read_sint16(f: SupportsRead):
     return struct.unpack(">h", f.read(2))[0]
 
 
-def write_sint16(f: BinaryIO, val: Union[int, list[int]]):
+def write_sint16(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("h"*len(val)), *val))
         return
     f.write(struct.pack(">h", val))
 
 
-def read_sint32(f: BinaryIO):
+def read_sint32(f: SupportsRead):
     return struct.unpack(">i", f.read(4))[0]
 
 
-def write_sint32(f: BinaryIO, val: Union[int, list[int]]):
+def write_sint32(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("i"*len(val)), *val))
         return
     f.write(struct.pack(">i", val))
 
 
-def read_ubyte(f: BinaryIO):
+def read_ubyte(f: SupportsRead):
     return struct.unpack("B", f.read(1))[0]
 
 
-def write_ubyte(f: BinaryIO, val: Union[int, list[int]]):
+def write_ubyte(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("B"*len(val)), *val))
         return
     f.write(struct.pack(">B", val))
 
 
-def read_uint16(f: BinaryIO):
+def read_uint16(f: SupportsRead):
     return struct.unpack(">H", f.read(2))[0]
 
 
-def write_uint16(f: BinaryIO, val: Union[int, list[int]]):
+def write_uint16(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("H"*len(val)), *val))
         return
     f.write(struct.pack(">H", val))
 
 
-def read_uint32(f: BinaryIO):
+def read_uint32(f: SupportsRead):
     return struct.unpack(">I", f.read(4))[0]
 
 
-def write_uint32(f: BinaryIO, val: Union[int, list[int]]):
+def write_uint32(f: SupportsWrite, val: Union[int, list[int]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("I"*len(val)), *val))
         return
     f.write(struct.pack(">I", val))
 
 
-def read_float(f: BinaryIO):
+def read_float(f: SupportsRead):
     return struct.unpack(">f", f.read(4))[0]
 
 
-def write_float(f: BinaryIO, val: Union[float, list[float]]):
+def write_float(f: SupportsWrite, val: Union[float, list[float]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("f"*len(val)), *val))
         return
     f.write(struct.pack(">f", val))
 
 
-def read_double(f: BinaryIO):
+def read_double(f: SupportsRead):
     return struct.unpack(">d", f.read(4))[0]
 
 
-def write_double(f: BinaryIO, val: Union[float, list[float]]):
+def write_double(f: SupportsWrite, val: Union[float, list[float]]):
     if isinstance(val, (list, tuple)):
         f.write(struct.pack(">" + ("d"*len(val)), *val))
         return
     f.write(struct.pack(">d", val))
 
 
-def read_vec3f(f: BinaryIO):
+def read_vec3f(f: SupportsRead):
     return struct.unpack(">fff", f.read(12))
 
 
-def write_vec3f(f: BinaryIO, val: (list, tuple)):
+def write_vec3f(f: SupportsWrite, val: (list, tuple)):
     f.write(struct.pack(">fff", *val))
 
 
-def read_bool(f: BinaryIO, vSize: int = 1):
+def read_bool(f: SupportsRead, vSize: int = 1):
     return struct.unpack(">?", f.read(vSize))[0] > 0
 
 
-def write_bool(f: BinaryIO, val: bool, vSize: int = 1):
+def write_bool(f: SupportsWrite, val: bool, vSize: int = 1):
     if val is True:
         f.write(b'\x00'*(vSize-1) + b'\x01')
     else:
@@ -149,6 +151,10 @@ def write_string(f: BinaryIO, val: str, encoding: Optional[str] = None):
 
 
 def get_likely_encoding(data: bytes) -> str:
+    # Every accepted encoding decodes ASCII the same, so skip detection for it
+    if data.isascii():
+        return "ascii"
+
     encoder = UniversalDetector()
     encoder.feed(data)
     encoding = encoder.close()["encoding"]
@@ -3,8 +3,6 @@ import struct
 from collections import OrderedDict
 from typing import BinaryIO
 
-import oead
-
 from juniors_toolbox.utils import VariadicArgs, VariadicKwargs, write_jsystem_padding
 from juniors_toolbox.utils.iohelper import (read_float, read_sbyte, read_sint16, read_ubyte,
                                             read_uint16, read_uint32,
@@ -18,6 +16,7 @@ from juniors_toolbox.utils.j3d.anim.general_animation import (AnimComponent,
                                                               find_sequence, get_bone_transforms,
                                                               make_tangents,
                                                               write_values)
+from juniors_toolbox.utils.yaz0 import decompress_yaz0
 
 
 BCKFILEMAGIC = b"J3D1bck1"
@@ -946,7 +945,8 @@ class SoundEntry:
             header = f.read(4)
 
             if header == b"Yaz0":
-                f = BytesIO(oead.yaz0.decompress(f))
+                f.seek(0)
+                f = decompress_yaz0(f)
 
             f.seek(0x1c)
 
@@ -1,8 +1,8 @@
 import struct
 
-import oead
 from io import BytesIO
 from juniors_toolbox.utils import A_Serializable
+from juniors_toolbox.utils.yaz0 import decompress_yaz0
 
 from juniors_toolbox.utils.iohelper import read_float, read_sint16, read_uint16, read_uint32, write_uint16
 
@@ -550,11 +550,8 @@ def sort_file(filepath):
         print(magic)
 
         if magic.startswith(b"Yaz0"):
-            decomp = BytesIO()
-            oead.yaz0.decompress(f, decomp)
-            # print(decomp)
-            f = decomp
             f.seek(0)
+            f = decompress_yaz0(f)
 
             magic = f.read(8)
             print(magic)
@@ -1,44 +1,48 @@
 from __future__ import annotations
 
 import filecmp
+import hashlib
+import mmap
 import os
 import shutil
 import subprocess
 import tempfile
+import threading
 import time
+import weakref
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from enum import IntEnum
-from io import BytesIO
+from io import BufferedIOBase, BytesIO
 from itertools import chain
 from pathlib import Path, PurePath
-from struct import pack, unpack
-from typing import BinaryIO, Iterator, Optional
+from struct import Struct, pack, unpack
+from typing import BinaryIO, Callable, ClassVar, Iterable, Iterator, Optional, TypeVar
 
 from enum import IntFlag
 from juniors_toolbox.utils import (
     A_Serializable,
     ReadableBuffer,
+    SupportsWrite,
     VariadicArgs,
     VariadicKwargs,
     jdrama,
 )
 from juniors_toolbox.utils.iohelper import (
     align_int,
-    read_bool,
+    decode_raw_string,
+    get_likely_encoding,
     read_sint16,
     read_sint32,
-    read_string,
     read_ubyte,
     read_uint16,
     read_uint32,
-    write_bool,
     write_sint16,
     write_sint32,
-    write_string,
-    write_uint16,
-    write_uint32,
 )
+from juniors_toolbox.utils.yaz0 import compress_yaz0, decompress_yaz0, is_yaz0_compressed
 
 
 def write_pad32(f: BinaryIO):
@@ -46,12 +50,274 @@ def write_pad32(f: BinaryIO):
     f.write(b"\x00" * (next_aligned_pos - f.tell()))
 
 
+# Called as `progress(path, completed, total)` as each file is read or written
+BatchProgressCallback = Callable[[Path, int, int], None]
+
+_T = TypeVar("_T")
+
+
+def _run_file_batch(
+    func: Callable[[Path, _T], None],
+    jobs: list[tuple[Path, _T]],
+    maxWorkers: Optional[int],
+    progress: Optional[BatchProgressCallback],
+) -> None:
+    """
+    Runs `func` for each job across a thread pool, reporting progress from
+    the calling thread. File I/O releases the GIL, so threads overlap it.
+    """
+    if maxWorkers == 1 or len(jobs) <= 1:
+        for i, (path, item) in enumerate(jobs):
+            func(path, item)
+            if progress is not None:
+                progress(path, i + 1, len(jobs))
+        return
+
+    with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = {executor.submit(func, path, item): path for path, item in jobs}
+        for i, future in enumerate(as_completed(futures)):
+            future.result()
+            if progress is not None:
+                progress(futures[future], i + 1, len(jobs))
+
+
+def _export_nodes(
+    targets: list[tuple[Path, InternalNodeEntry]],
+    maxWorkers: Optional[int],
+    progress: Optional[BatchProgressCallback],
+) -> None:
+    """
+    Extracts each node to its target path. The whole directory tree is
+    created first, then the file data is written from a thread pool.
+    """
+    directories: list[Path] = []
+    files: list[tuple[Path, InternalNodeEntry]] = []
+    stack = list(targets)
+    while stack:
+        targetPath, node = stack.pop()
+        if node.is_file():
+            files.append((targetPath, node))
+            continue
+        directories.append(targetPath)
+        for subNode in node.dirInfo.subNodes:
+            if subNode.name not in [".", ".."]:
+                stack.append((targetPath / subNode.name, subNode))
+
+    for directory in directories:
+        directory.mkdir(parents=True, exist_ok=True)
+
+    def _write_file(targetPath: Path, node: InternalNodeEntry) -> None:
+        # One write of the whole payload, straight from a mapped view if lazy
+        with open(targetPath, "wb") as f:
+            f.write(node.get_view())
+
+    _run_file_batch(_write_file, files, maxWorkers, progress)
+
+
+def _read_folder(
+    path: Path,
+    maxWorkers: Optional[int],
+    progress: Optional[BatchProgressCallback],
+) -> tuple[list[tuple[Path, bool]], dict[Path, bytes]]:
+    """
+    Lists everything below `path` as (path, is directory), parents first and
+    each folder's files ahead of its subfolders like Nintendo's packer, and
+    reads the files from a thread pool.
+    """
+    entries: list[tuple[Path, bool]] = []
+    files: list[tuple[Path, None]] = []
+    for dirPath, dirNames, fileNames in os.walk(path):
+        dirNames.sort()
+        basePath = Path(dirPath)
+        for fileName in sorted(fileNames):
+            entries.append((basePath / fileName, False))
+            files.append((basePath / fileName, None))
+        entries.extend((basePath / dirName, True) for dirName in dirNames)
+
+    datas: dict[Path, bytes] = {}
+
+    def _read_file(filePath: Path, _: None) -> None:
+        datas[filePath] = filePath.read_bytes()
+
+    _run_file_batch(_read_file, files, maxWorkers, progress)
+    return entries, datas
+
+
 class FileConflictAction(IntEnum):
     REPLACE = 0
     KEEP = 1
     SKIP = 2
 
 
+class FileIDAllocator:
+    """
+    Tracks which file IDs are in use and hands out the lowest free one.
+
+    The lowest free ID is cached, so allocating IDs one after another costs
+    amortized constant time.
+    """
+
+    MAX_ID = 0xFFFE  # 0xFFFF marks directories
+
+    def __init__(self, fileIDs: Iterable[int] = ()):
+        self._useCounts: dict[int, int] = {}
+        self._lowestFree = 0
+        for fileID in fileIDs:
+            self.add(fileID)
+
+    def add(self, fileID: int) -> None:
+        self._useCounts[fileID] = self._useCounts.get(fileID, 0) + 1
+
+    def remove(self, fileID: int) -> None:
+        count = self._useCounts.get(fileID, 0)
+        if count <= 1:
+            self._useCounts.pop(fileID, None)
+            if fileID < self._lowestFree:
+                self._lowestFree = fileID
+        else:
+            self._useCounts[fileID] = count - 1
+
+    def is_used(self, fileID: int) -> bool:
+        return fileID in self._useCounts
+
+    def get_next_free(self) -> int:
+        while self._lowestFree in self._useCounts:
+            self._lowestFree += 1
+        if self._lowestFree > FileIDAllocator.MAX_ID:
+            raise OverflowError("Archive has run out of file IDs")
+        return self._lowestFree
+
+
+# Binary layouts of the archive tables, each row decoded/encoded in one call
+_HEADER_STRUCT = Struct(">4s7I6IH?5x")
+_DIRECTORY_STRUCT = Struct(">4sIHHI")
+_NODE_STRUCT = Struct(">HHIII4x")
+
+
+def _decode_name(raw: bytes) -> str:
+    # Names are nearly always ASCII, which needs no encoding detection
+    if raw.isascii():
+        return raw.decode("ascii")
+    return decode_raw_string(raw)
+
+
+def _encode_name(name: str) -> bytes:
+    if name.isascii():
+        return name.encode("ascii")
+    return name.encode(get_likely_encoding(name.encode()))
+
+
+class _StringTableReader:
+    """
+    Resolves names from a string table read in one block, decoding each offset once.
+    """
+
+    def __init__(self, strings: bytes):
+        self.strings = strings
+        self._names: dict[int, str] = {}
+
+    def get(self, offset: int) -> str:
+        name = self._names.get(offset)
+        if name is None:
+            end = self.strings.find(b"\x00", offset)
+            name = _decode_name(self.strings[offset : end if end != -1 else None])
+            self._names[offset] = name
+        return name
+
+
+class DecodedPayloadCache:
+    """
+    Bounded LRU cache of decompressed file payloads, shared by all archives.
+
+    Entries are dropped when their file's data is replaced or the file is
+    collected, and the least recently used entries are evicted once
+    `maxSize` bytes are held. Files are only weakly referenced, so caching
+    a payload never keeps its archive (or the archive's memory map) alive.
+    """
+
+    def __init__(self, maxSize: int):
+        self.maxSize = maxSize
+        self._entries: OrderedDict[int, tuple[weakref.ref[InternalNodeEntry], bytes]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Entries of collected files that couldn't be removed right away
+        self._collected: list[tuple[int, weakref.ref[InternalNodeEntry]]] = []
+
+    def get(self, node: InternalNodeEntry) -> bytes | None:
+        with self._lock:
+            self._purge_collected()
+            entry = self._entries.get(id(node))
+            if entry is None or entry[0]() is not node:
+                return None
+            self._entries.move_to_end(id(node))
+            return entry[1]
+
+    def put(self, node: InternalNodeEntry, data: bytes) -> None:
+        with self._lock:
+            self._purge_collected()
+            self._discard(node)
+            if len(data) > self.maxSize:
+                return
+            key = id(node)
+            self._entries[key] = (
+                weakref.ref(node, lambda ref: self._on_collected(key, ref)),
+                data,
+            )
+            self._size += len(data)
+            while self._size > self.maxSize:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def discard(self, node: InternalNodeEntry) -> None:
+        with self._lock:
+            self._discard(node)
+
+    def discard_all(self, nodes: Iterable[InternalNodeEntry]) -> None:
+        with self._lock:
+            for node in nodes:
+                self._discard(node)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._collected.clear()
+            self._size = 0
+
+    def _discard(self, node: InternalNodeEntry) -> None:
+        entry = self._entries.get(id(node))
+        if entry is None:
+            return
+        # A dead reference belongs to a collected file whose id was reused
+        cached = entry[0]()
+        if cached is node or cached is None:
+            del self._entries[id(node)]
+            self._size -= len(entry[1])
+
+    def _remove_collected(self, key: int, ref: weakref.ref[InternalNodeEntry]) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] is ref:
+            del self._entries[key]
+            self._size -= len(entry[1])
+
+    def _purge_collected(self) -> None:
+        while self._collected:
+            self._remove_collected(*self._collected.pop())
+
+    def _on_collected(self, key: int, ref: weakref.ref[InternalNodeEntry]) -> None:
+        # Collection can happen while this thread already holds the lock,
+        # in which case the entry is removed by the next call instead
+        if self._lock.acquire(blocking=False):
+            try:
+                self._remove_collected(key, ref)
+            finally:
+                self._lock.release()
+        else:
+            self._collected.append((key, ref))
+
+
+DECODED_PAYLOAD_CACHE = DecodedPayloadCache(0x4000000)
+
+
 class ResourceAttribute(IntFlag):
     FILE = 0x01
     DIRECTORY = 0x02
@@ -74,44 +340,119 @@ class InternalDirectoryEntry:
     nodeInfo: InternalNodeEntry | None = None
     subNodes: list[InternalNodeEntry] = field(default_factory=list)
 
-    @classmethod
-    def load(cls, archive: BinaryIO, strings_offset: int) -> "InternalDirectoryEntry":
-        _oldPos = archive.tell()
-        magic = read_string(archive, maxlen=4)
+    # Name lookup over subNodes, kept in sync by the node methods below.
+    nodeIndex: dict[str, InternalNodeEntry] = field(
+        default_factory=dict, compare=False, repr=False
+    )
+
+    # Set on an archive's root directory, so changes below can reach it.
+    archive: ResourceArchive | None = field(default=None, compare=False, repr=False)
 
+    # Bumped on every structural change to any directory, so path caches
+    # know when they are stale.
+    generation: ClassVar[int] = 0
+
+    def __post_init__(self):
+        for node in self.subNodes:
+            self.nodeIndex.setdefault(node.name, node)
+
+    @classmethod
+    def from_row(
+        cls, row: tuple[bytes, int, int, int, int], strings: _StringTableReader
+    ) -> "InternalDirectoryEntry":
+        rawMagic, nameOffset, nameHash, fileCount, firstFileOffset = row
         # Repair magic if it's too long or too short
-        if len(magic) != 4:
-            if len(magic) < 4:
-                magic += " " * (4 - len(magic))
-            else:
-                magic = magic[:4]
-        archive.seek(_oldPos + 4, 0)
+        magic = _decode_name(rawMagic.split(b"\x00", 1)[0]).ljust(4)[:4]
+        return cls(
+            magic, nameOffset, nameHash, fileCount, firstFileOffset, strings.get(nameOffset)
+        )
 
-        magic = magic
-        nameOffset = read_uint32(archive)
-        nameHash = read_uint16(archive)
-        fileCount = read_uint16(archive)
-        firstFileOffset = read_uint32(archive)
+    def to_row(self) -> tuple[bytes, int, int, int, int]:
+        return (
+            self.magic.encode("ascii"),
+            self.nameOffset,
+            self.nameHash,
+            self.fileCount,
+            self.firstFileOffset,
+        )
 
-        _oldPos = archive.tell()
-        archive.seek(strings_offset + nameOffset, 0)
-        name = read_string(archive)
-        archive.seek(_oldPos, 0)
+    def save(self, archive: BinaryIO) -> None:
+        archive.write(_DIRECTORY_STRUCT.pack(*self.to_row()))
 
-        self = cls(magic, nameOffset, nameHash, fileCount, firstFileOffset, name)
-        return self
+    def get_node(self, name: str) -> InternalNodeEntry | None:
+        return self.nodeIndex.get(name)
 
-    def save(self, archive: BinaryIO, strings_offset: int) -> None:
-        archive.write(self.magic.encode("ascii"))
-        write_uint32(archive, self.nameOffset)
-        write_uint16(archive, self.nameHash)
-        write_uint16(archive, self.fileCount)
-        write_uint32(archive, self.firstFileOffset)
+    def get_archive(self) -> ResourceArchive | None:
+        dirInfo = self
+        while dirInfo.nodeInfo is not None and dirInfo.nodeInfo.parent is not None:
+            dirInfo = dirInfo.nodeInfo.parent
+        return dirInfo.archive
 
-        _oldPos = archive.tell()
-        archive.seek(strings_offset + self.nameOffset, 0)
-        write_string(archive, self.name)
-        archive.seek(_oldPos, 0)
+    def resolve(self, parts: tuple[str, ...]) -> InternalNodeEntry | None:
+        """
+        Walks `parts` down from this directory, returning the node at the end.
+        """
+        dirInfo: InternalDirectoryEntry | None = self
+        node: InternalNodeEntry | None = None
+        for part in parts:
+            if dirInfo is None:
+                return None
+            node = dirInfo.nodeIndex.get(part)
+            if node is None:
+                return None
+            dirInfo = node.dirInfo
+        return node
+
+    def add_node(self, node: InternalNodeEntry) -> None:
+        self.subNodes.append(node)
+        self.nodeIndex.setdefault(node.name, node)
+        node.parent = self
+        InternalDirectoryEntry.generation += 1
+
+        archive = self.get_archive()
+        if archive is not None:
+            for fileNode in node.iter_files():
+                archive._fileIDs.add(fileNode.fileID)
+            archive.mark_dirty()
+
+    def remove_node(self, node: InternalNodeEntry) -> bool:
+        for i, subNode in enumerate(self.subNodes):
+            if subNode is node:
+                break
+        else:
+            return False
+
+        del self.subNodes[i]
+        self._unindex_node(node)
+        node.parent = None
+        InternalDirectoryEntry.generation += 1
+
+        archive = self.get_archive()
+        if archive is not None:
+            for fileNode in node.iter_files():
+                archive._fileIDs.remove(fileNode.fileID)
+            archive.mark_dirty()
+        return True
+
+    def rename_node(self, node: InternalNodeEntry, name: str) -> None:
+        self._unindex_node(node)
+        node.name = name
+        self.nodeIndex.setdefault(name, node)
+        InternalDirectoryEntry.generation += 1
+
+        archive = self.get_archive()
+        if archive is not None:
+            archive.mark_dirty()
+
+    def _unindex_node(self, node: InternalNodeEntry) -> None:
+        if self.nodeIndex.get(node.name) is not node:
+            return
+        del self.nodeIndex[node.name]
+        # Malformed archives can repeat a name, let the next one take over
+        for subNode in self.subNodes:
+            if subNode is not node and subNode.name == node.name:
+                self.nodeIndex[node.name] = subNode
+                break
 
 
 @dataclass
@@ -131,62 +472,65 @@ class InternalNodeEntry:
     parent: InternalDirectoryEntry | None = None
     dirInfo: InternalDirectoryEntry | None = None
 
+    # Lazily loaded files view the archive's buffer here until they are modified.
+    source: memoryview | None = field(default=None, compare=False, repr=False)
+    sourcePos: int = field(default=0, compare=False, repr=False)
+    # Set when the data changes, so incremental saves know what to rewrite.
+    dirty: bool = field(default=False, compare=False, repr=False)
+    # Archive parsed from this file, written back into it when the owning archive is saved.
+    embedded: ResourceArchive | None = field(default=None, compare=False, repr=False)
+    # Decompressed data of a Yaz0 file that changed, compressed once its raw data is needed.
+    pendingDecoded: bytes | None = field(default=None, compare=False, repr=False)
+
     @classmethod
-    def load(
-        cls, archive: BinaryIO, datas_offset: int, strings_offset: int
+    def from_row(
+        cls, row: tuple[int, int, int, int, int], strings: _StringTableReader
     ) -> "InternalNodeEntry":
-        fileID = read_uint16(archive)
-        nameHash = read_uint16(archive)
-        flagsAndOffset = read_uint32(archive)
-        flags = (flagsAndOffset & 0xFF000000) >> 24
+        """
+        Creates a node from a decoded node table row. File data is attached by the caller.
+        """
+        fileID, nameHash, flagsAndOffset, modularA, modularB = row
         nameOffset = flagsAndOffset & 0x00FFFFFF
-        modularA = read_uint32(archive)
-        modularB = read_uint32(archive)
-        archive.seek(4, 1)
-
-        _oldPos = archive.tell()
-
-        archive.seek(strings_offset + nameOffset, 0)
-        name = read_string(archive)
-
-        self = cls(fileID, nameHash, flags, nameOffset, modularA, modularB, name, None)
-
-        if self.is_file():
-            archive.seek(datas_offset + self.modularA, 0)
-            self.data = BytesIO(archive.read(self.modularB))
-
-        archive.seek(_oldPos, 0)
-
-        return self
+        return cls(
+            fileID,
+            nameHash,
+            (flagsAndOffset & 0xFF000000) >> 24,
+            nameOffset,
+            modularA,
+            modularB,
+            strings.get(nameOffset),
+            None,
+        )
 
-    def save(
-        self,
-        archive: BinaryIO,
-        datas_offset: int,
-        strings_offset: int,
-        syncID: int | None = None,
-    ) -> None:
+    def to_row(self, syncID: int | None = None) -> tuple[int, int, int, int, int]:
         if self.is_directory():
-            write_uint16(archive, 0xFFFF)
+            fileID = 0xFFFF
         elif syncID is not None:
-            write_uint16(archive, syncID)
+            fileID = syncID
         else:
-            write_uint16(archive, self.fileID)
-        write_uint16(archive, self.nameHash)
-        write_uint32(archive, (self.flags << 24) | self.nameOffset)
-        write_uint32(archive, self.modularA)
-        write_uint32(archive, self.modularB)
-
-        _oldPos = archive.tell()
+            fileID = self.fileID
+        return (
+            fileID,
+            self.nameHash,
+            (self.flags << 24) | self.nameOffset,
+            self.modularA,
+            self.modularB,
+        )
 
-        archive.seek(strings_offset + self.nameOffset, 0)
-        write_string(archive, self.name)
+    def save(self, archive: BinaryIO, syncID: int | None = None) -> None:
+        archive.write(_NODE_STRUCT.pack(*self.to_row(syncID)))
 
+    def iter_files(self) -> Iterator[InternalNodeEntry]:
+        """
+        Yields this node if it is a file, or every file below it otherwise.
+        """
         if self.is_file():
-            archive.seek(datas_offset + self.modularA, 0)
-            archive.write(self.data.getvalue())
-
-        archive.seek(_oldPos, 0)
+            yield self
+            return
+        if self.dirInfo is None or self.name in [".", ".."]:
+            return
+        for subNode in self.dirInfo.subNodes:
+            yield from subNode.iter_files()
 
     def is_file(self) -> bool:
         return (self.flags & ResourceAttribute.FILE) != 0
@@ -204,16 +548,200 @@ class InternalNodeEntry:
         return (self.flags & ResourceAttribute.LOAD_FROM_DVD) != 0
 
     def is_compressed(self) -> bool:
-        return (self.flags & ResourceAttribute.COMPRESSION) != 0
+        return (self.flags & ResourceAttribute.COMPRESSED) != 0
 
     def is_yaz0_compressed(self) -> bool:
-        return (self.flags & ResourceAttribute.YAZ0_COMPRESSION) != 0
+        return (self.flags & ResourceAttribute.YAZ0_COMPRESSED) != 0
+
+    def is_loaded(self) -> bool:
+        return self.data is not None
+
+    def get_view(self) -> memoryview:
+        """
+        Returns a read-only view of the file data without copying it.
+
+        Lazily loaded files view the archive buffer, others their own stream.
+        """
+        if self.pendingDecoded is not None:
+            self._compress_pending()
+        if self.data is None:
+            if self.source is None:
+                return memoryview(b"")
+            return self.source.toreadonly()
+        return self.data.getbuffer().toreadonly()
+
+    def detach(self) -> BytesIO:
+        """
+        Copies the viewed file data into its own stream, so it can be modified
+        without touching the archive buffer.
+        """
+        if self.data is None:
+            self.data = BytesIO(self.get_view())
+            self.data.seek(self.sourcePos, 0)
+            self.source = None
+            self.sourcePos = 0
+        return self.data
 
     def get_data(self) -> BytesIO | None:
         if self.is_file():
-            return BytesIO(self.data)
+            return BytesIO(self.get_view())
         return None
 
+    def set_data(self, data: ReadableBuffer) -> None:
+        DECODED_PAYLOAD_CACHE.discard(self)
+        self.pendingDecoded = None
+        self._replace_data(data)
+
+    def get_decoded_view(self) -> bytes | memoryview:
+        """
+        Returns the file data, decompressed if the file is Yaz0 compressed.
+        """
+        if self.pendingDecoded is not None:
+            return self.pendingDecoded
+        if not self.is_yaz0_compressed():
+            return self.get_view()
+
+        decoded = DECODED_PAYLOAD_CACHE.get(self)
+        if decoded is not None:
+            return decoded
+
+        data = self.get_view()
+        if not is_yaz0_compressed(data):
+            # Flagged, but stored uncompressed
+            return data
+
+        decoded = decompress_yaz0(BytesIO(data)).getvalue()
+        DECODED_PAYLOAD_CACHE.put(self, decoded)
+        return decoded
+
+    def set_decoded_data(self, data: ReadableBuffer) -> None:
+        """
+        Replaces the decompressed file data. Yaz0 compressed files are only
+        recompressed once their raw data is needed, normally when saving.
+        """
+        if not self.is_yaz0_compressed():
+            self.set_data(data)
+            return
+
+        decoded = bytes(data)
+        self.pendingDecoded = decoded
+        self.dirty = True
+        DECODED_PAYLOAD_CACHE.put(self, decoded)
+
+    def _compress_pending(self) -> None:
+        decoded = self.pendingDecoded
+        self.pendingDecoded = None
+        self._replace_data(compress_yaz0(BytesIO(decoded)).getvalue())
+
+    def _replace_data(self, data: ReadableBuffer) -> None:
+        self.data = BytesIO(data)
+        self.source = None
+        self.sourcePos = 0
+        self.modularB = len(self.data.getbuffer())
+        self.dirty = True
+
+
+class ResourceFile(BufferedIOBase):
+    """
+    File object over a file's data, see `ResourceHandle.open`.
+
+    Reads come straight from the file's storage, which for lazily loaded
+    archives is the archive buffer itself. With `copyOnWrite`, the first
+    write copies the data into a private stream; the archive never sees it.
+    """
+
+    def __init__(self, view: memoryview, copyOnWrite: bool = False):
+        self._view = view
+        self._copy: BytesIO | None = None
+        self._position = 0
+        self._copyOnWrite = copyOnWrite
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def writable(self) -> bool:
+        return self._copyOnWrite
+
+    def getbuffer(self) -> memoryview:
+        """
+        Returns a read-only view of the current contents.
+        """
+        self._check_closed()
+        if self._copy is not None:
+            return self._copy.getbuffer().toreadonly()
+        return self._view
+
+    def getvalue(self) -> bytes:
+        return bytes(self.getbuffer())
+
+    def read(self, __size: int | None = -1, /) -> bytes:
+        self._check_closed()
+        if self._copy is not None:
+            return self._copy.read(__size)
+        start = self._position
+        end = len(self._view) if __size is None or __size < 0 else start + __size
+        self._position = max(start, min(end, len(self._view)))
+        return bytes(self._view[start:self._position])
+
+    def read1(self, __size: int = -1, /) -> bytes:
+        return self.read(__size)
+
+    def readinto(self, __buffer: ReadableBuffer, /) -> int:
+        self._check_closed()
+        if self._copy is not None:
+            return self._copy.readinto(__buffer)
+        target = memoryview(__buffer).cast("B")
+        start = min(self._position, len(self._view))
+        size = min(len(target), len(self._view) - start)
+        target[:size] = self._view[start : start + size]
+        self._position = start + size
+        return size
+
+    def write(self, __buffer: ReadableBuffer, /) -> int:
+        self._check_closed()
+        if not self._copyOnWrite:
+            raise OSError("File was opened read-only")
+        if self._copy is None:
+            self._copy = BytesIO(self._view)
+            self._copy.seek(self._position, 0)
+            self._view = memoryview(b"")
+        return self._copy.write(__buffer)
+
+    def seek(self, __offset: int, __whence: int = os.SEEK_SET, /) -> int:
+        self._check_closed()
+        if self._copy is not None:
+            return self._copy.seek(__offset, __whence)
+        if __whence == os.SEEK_SET:
+            position = __offset
+        elif __whence == os.SEEK_CUR:
+            position = self._position + __offset
+        elif __whence == os.SEEK_END:
+            position = len(self._view) + __offset
+        else:
+            raise ValueError(f"Invalid whence ({__whence})")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}")
+        self._position = position
+        return position
+
+    def tell(self) -> int:
+        self._check_closed()
+        if self._copy is not None:
+            return self._copy.tell()
+        return self._position
+
+    def close(self) -> None:
+        self._view = memoryview(b"")
+        self._copy = None
+        super().close()
+
+    def _check_closed(self) -> None:
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+
 
 class ResourceHandle:
     @dataclass
@@ -235,13 +763,17 @@ class ResourceHandle:
         if active:
             self._nodeEntry.flags |= attribute
         else:
-            self._nodeEntry.flags &= attribute
+            self._nodeEntry.flags &= ~attribute
+        self._mark_dirty()
 
     def get_name(self) -> str:
         return self._nodeEntry.name
 
     def set_name(self, name: str):
-        self._nodeEntry.name = name
+        if self._nodeEntry.parent is not None:
+            self._nodeEntry.parent.rename_node(self._nodeEntry, name)
+        else:
+            self._nodeEntry.name = name
         self._nodeEntry.nameHash = jdrama.get_key_code(name)
 
     def get_extension(self) -> str:
@@ -310,13 +842,31 @@ class ResourceHandle:
         return self._nodeEntry.is_file()
 
     def get_magic(self) -> str:
-        return self._nodeEntry.magic
+        if self.is_file():
+            raise TypeError("Files have no magic")
+        return self._nodeEntry.dirInfo.magic
+
+    def set_magic(self, magic: str) -> None:
+        if self.is_file():
+            raise TypeError("Files have no magic")
+        self._nodeEntry.dirInfo.magic = magic.upper()[:4].ljust(4)
+        self._mark_dirty()
 
     def get_id(self) -> int:
         return self._nodeEntry.fileID
 
     def set_id(self, __id: int, /) -> None:
+        archive = self.get_archive()
+        if archive is not None and self.is_file():
+            archive._fileIDs.remove(self._nodeEntry.fileID)
+            archive._fileIDs.add(__id)
         self._nodeEntry.fileID = __id
+        self._mark_dirty()
+
+    def get_archive(self) -> ResourceArchive | None:
+        if self._nodeEntry.parent is None:
+            return None
+        return self._nodeEntry.parent.get_archive()
 
     def get_size(self) -> int:
         if self.is_file():
@@ -325,9 +875,61 @@ class ResourceHandle:
 
     def get_data(self) -> bytes:
         if self.is_file():
-            return self._nodeEntry.data.getvalue()
+            return bytes(self._nodeEntry.get_view())
+        raise TypeError("Cannot get data from a directory")
+
+    def get_view(self) -> memoryview:
+        """
+        Returns a read-only view of the file data, without copying it.
+
+        Files of a lazily loaded archive view the archive buffer until they
+        are first written to. Release the view when done with it, a live view
+        keeps the archive's source file mapped after `release_source`.
+        """
+        if self.is_file():
+            return self._nodeEntry.get_view()
         raise TypeError("Cannot get data from a directory")
 
+    def open(self, *, copyOnWrite: bool = False) -> ResourceFile:
+        """
+        Opens the file data as a file object, for parsers that read streams.
+
+        Nothing is copied up front. With `copyOnWrite` the file object may be
+        written to, on a private copy that leaves this file untouched.
+        """
+        if self.is_directory():
+            raise TypeError("Cannot open a directory")
+        return ResourceFile(self._nodeEntry.get_view(), copyOnWrite)
+
+    def is_yaz0_compressed(self) -> bool:
+        return self._nodeEntry.is_yaz0_compressed()
+
+    def get_decoded_data(self) -> bytes | memoryview:
+        """
+        Returns the file data, decompressed if the file is flagged as Yaz0 compressed.
+
+        Decompressed data is kept in `DECODED_PAYLOAD_CACHE`, so repeated
+        reads of the same file don't decompress it again.
+        """
+        if self.is_file():
+            return self._nodeEntry.get_decoded_view()
+        raise TypeError("Cannot get data from a directory")
+
+    def set_decoded_data(self, __data: ReadableBuffer, /) -> None:
+        """
+        Replaces the decompressed file data.
+
+        Yaz0 compressed files are recompressed lazily, when the archive is
+        saved or the raw data is read. Untouched files keep their original
+        compressed bytes.
+        """
+        if self.is_directory():
+            raise TypeError("Cannot set data of a directory")
+
+        self._drop_embedded_archive()
+        self._nodeEntry.set_decoded_data(__data)
+        self._mark_dirty()
+
     def get_handles(self, *, flatten: bool = False) -> Iterator[ResourceHandle]:
         if self.is_file():
             raise TypeError("Cannot get handles from a file")
@@ -349,17 +951,10 @@ class ResourceHandle:
         # if the path is empty, return self
         if len(__path.parts) == 0:
             return self
-        # if the path is a single part, return the child with that name
-        if len(__path.parts) == 1:
-            for node in self._nodeEntry.dirInfo.subNodes:
-                if node.name == __path.parts[0]:
-                    return ResourceHandle(node)
+        node = self._nodeEntry.dirInfo.resolve(__path.parts)
+        if node is None:
             return None
-        # if the path is longer, recurse into the first part
-        for node in self._nodeEntry.dirInfo.subNodes:
-            if node.name == __path.parts[0]:
-                return ResourceHandle(node).get_handle(__path.parts[1:])
-        return None
+        return ResourceHandle(node)
 
     def path_exists(self, __path: PurePath | str, /) -> bool:
         return self.get_handle(__path) is not None
@@ -374,39 +969,39 @@ class ResourceHandle:
         if self.is_file():
             raise TypeError("Cannot add handles to a file")
 
-        if __handle.get_parent() == self:
+        dirInfo = self._nodeEntry.dirInfo
+        if __handle._nodeEntry.parent is dirInfo:
             return True
 
-        if self.path_exists(__handle.get_name()):
+        conflictingNode = dirInfo.get_node(__handle.get_name())
+        if conflictingNode is not None:
             if action == FileConflictAction.REPLACE:
                 # Clean up the handle's original parent
-                if __handle.get_parent() is not None:
-                    __handle.get_parent().remove_handle(__handle)
-                self.remove_handle(__handle.get_name())
+                if __handle._nodeEntry.parent is not None:
+                    __handle._nodeEntry.parent.remove_node(__handle._nodeEntry)
+                dirInfo.remove_node(conflictingNode)
             elif action == FileConflictAction.SKIP:
                 return False
             else:
                 # Clean up the handle's original parent
-                if __handle.get_parent() is not None:
-                    __handle.get_parent().remove_handle(__handle)
+                if __handle._nodeEntry.parent is not None:
+                    __handle._nodeEntry.parent.remove_node(__handle._nodeEntry)
                 __handle.set_name(self._fs_resolve_name(__handle.get_name()))
-                self._nodeEntry.dirInfo.fileCount += 1
+                dirInfo.fileCount += 1
         else:
             # Clean up the handle's original parent
-            if __handle.get_parent() is not None:
-                __handle.get_parent().remove_handle(__handle)
-            self._nodeEntry.dirInfo.fileCount += 1
+            if __handle._nodeEntry.parent is not None:
+                __handle._nodeEntry.parent.remove_node(__handle._nodeEntry)
+            dirInfo.fileCount += 1
 
-        self._nodeEntry.dirInfo.subNodes.append(__handle._nodeEntry)
-        __handle._nodeEntry.parent = self._nodeEntry.dirInfo
+        dirInfo.add_node(__handle._nodeEntry)
+        return True
 
     def remove_handle(self, __handle: ResourceHandle, /) -> bool:
         if self.is_file():
             raise TypeError("Cannot remove handles from a file")
-        if self.path_exists(__handle.get_name()):
-            self._nodeEntry.dirInfo.subNodes.remove(__handle._nodeEntry)
+        if self._nodeEntry.dirInfo.remove_node(__handle._nodeEntry):
             self._nodeEntry.dirInfo.fileCount -= 1
-            __handle._nodeEntry.parent = None
             return True
         return False
 
@@ -414,26 +1009,37 @@ class ResourceHandle:
         if self.is_file():
             raise TypeError("Cannot remove handles from a file")
         handle = self.get_handle(__path)
-        if handle:
-            self._nodeEntry.dirInfo.subNodes.remove(handle._nodeEntry)
-            self._nodeEntry.dirInfo.fileCount -= 1
-            handle._nodeEntry.parent = None
+        if handle is None or handle._nodeEntry is self._nodeEntry:
+            return False
+        parent = handle._nodeEntry.parent
+        if parent is not None and parent.remove_node(handle._nodeEntry):
+            parent.fileCount -= 1
             return True
         return False
 
     def new_file(
         self,
         name: str,
-        initialData: bytes | bytearray = b"",
+        initialData: bytes | bytearray | memoryview = b"",
         attributes: ResourceAttribute = ResourceAttribute.FILE
         | ResourceAttribute.PRELOAD_TO_MRAM,
-        fileID: int = 0,
+        fileID: int | None = None,
     ) -> ResourceHandle | None:
+        """
+        Creates a file in this directory.
+
+        A `memoryview` is kept as a view, like the files of a lazily loaded
+        archive, so its buffer must outlive the file or be detached first.
+        """
         if self.is_file():
             raise TypeError("Cannot add handles to a file")
         if self.path_exists(name):
             return None
 
+        if fileID is None:
+            archive = self.get_archive()
+            fileID = 0 if archive is None else archive.get_next_free_id()
+
         nodeInfo = InternalNodeEntry(
             fileID=fileID,
             nameHash=jdrama.get_key_code(name),
@@ -442,8 +1048,12 @@ class ResourceHandle:
             modularA=-1,
             modularB=len(initialData),
             name=name,
-            data=BytesIO(initialData),
+            data=None,
         )
+        if isinstance(initialData, memoryview):
+            nodeInfo.source = initialData
+        else:
+            nodeInfo.data = BytesIO(initialData)
 
         handle = ResourceHandle(nodeInfo)
         handle._nodeEntry.flags |= ResourceAttribute.FILE
@@ -463,7 +1073,7 @@ class ResourceHandle:
             return None
 
         dirInfo = InternalDirectoryEntry(
-            magic=name.upper()[:4].encode("ascii"),
+            magic=name.upper()[:4].ljust(4),
             name=name,
             nameOffset=-1,
             nameHash=jdrama.get_key_code(name),
@@ -499,7 +1109,13 @@ class ResourceHandle:
         /,
         *,
         action: FileConflictAction = FileConflictAction.REPLACE,
+        maxWorkers: Optional[int] = None,
+        progress: Optional[BatchProgressCallback] = None,
     ) -> bool:
+        """
+        Extracts this resource into `__folderPath`, writing the files of a
+        directory across up to `maxWorkers` threads.
+        """
         if isinstance(__folderPath, str):
             __folderPath = Path(__folderPath)
 
@@ -524,18 +1140,21 @@ class ResourceHandle:
                     self._fs_resolve_name(self.get_name())
                 )
 
-        if self.is_file():
-            with open(targetPath, "wb") as f:
-                self.seek(0)
-                f.write(self.read())
-            return True
-        else:
-            for handle in self.get_handles():
-                handle.export_to(targetPath, action=action)
-            return True
+        _export_nodes([(targetPath, self._nodeEntry)], maxWorkers, progress)
+        return True
 
     @classmethod
-    def import_from(self, path: Path | str) -> ResourceHandle | None:
+    def import_from(
+        self,
+        path: Path | str,
+        *,
+        maxWorkers: Optional[int] = None,
+        progress: Optional[BatchProgressCallback] = None,
+    ) -> ResourceHandle | None:
+        """
+        Builds a detached resource from a file or folder, reading the files of
+        a folder across up to `maxWorkers` threads.
+        """
         if isinstance(path, str):
             path = Path(path)
 
@@ -545,22 +1164,22 @@ class ResourceHandle:
 
             nodeInfo = InternalNodeEntry(
                 fileID=0,
-                nameHash=jdrama.get_key_code(path.stem),
+                nameHash=jdrama.get_key_code(path.name),
                 flags=ResourceAttribute.FILE | ResourceAttribute.PRELOAD_TO_MRAM,
                 nameOffset=-1,
                 modularA=-1,
                 modularB=len(initialData),
-                name=path.stem,
+                name=path.name,
                 data=BytesIO(initialData),
             )
 
             return ResourceHandle(nodeInfo)
         else:
             dirInfo = InternalDirectoryEntry(
-                magic=path.stem.upper()[:4].encode("ascii"),
-                name=path.stem,
+                magic=path.name.upper()[:4].ljust(4),
+                name=path.name,
                 nameOffset=-1,
-                nameHash=jdrama.get_key_code(path.stem),
+                nameHash=jdrama.get_key_code(path.name),
                 fileCount=0,
                 firstFileOffset=-1,
                 nodeInfo=None,
@@ -569,12 +1188,12 @@ class ResourceHandle:
 
             nodeInfo = InternalNodeEntry(
                 fileID=0xFFFF,
-                nameHash=jdrama.get_key_code(path.stem),
+                nameHash=jdrama.get_key_code(path.name),
                 flags=ResourceAttribute.DIRECTORY | ResourceAttribute.PRELOAD_TO_MRAM,
                 nameOffset=-1,
                 modularA=-1,
                 modularB=0x10,
-                name=path.stem,
+                name=path.name,
                 data=None,
                 dirInfo=dirInfo,
             )
@@ -582,13 +1201,24 @@ class ResourceHandle:
             dirInfo.nodeInfo = nodeInfo
 
             handle = ResourceHandle(nodeInfo)
+            handle._populate_from(path, maxWorkers, progress)
+            return handle
 
-            for subPath in path.iterdir():
-                subHandle = ResourceHandle.import_from(subPath)
-                if subHandle:
-                    handle.add_handle(subHandle)
+    def _populate_from(
+        self,
+        path: Path,
+        maxWorkers: Optional[int],
+        progress: Optional[BatchProgressCallback],
+    ) -> None:
+        entries, datas = _read_folder(path, maxWorkers, progress)
 
-            return handle
+        parents: dict[Path, ResourceHandle] = {path: self}
+        for entryPath, isDirectory in entries:
+            parent = parents[entryPath.parent]
+            if isDirectory:
+                parents[entryPath] = parent.new_directory(entryPath.name)
+            else:
+                parent.new_file(entryPath.name, datas[entryPath])
 
     def rename(
         self,
@@ -658,17 +1288,23 @@ class ResourceHandle:
 
         return False
 
-    def read(self, __size: int, /) -> bytes:
+    def read(self, __size: int = -1, /) -> bytes:
         """
         Reads a number of bytes from the file.
         """
         if self.is_directory():
             raise TypeError("Cannot read from a directory")
 
-        if self._nodeEntry.data is None:
-            raise ValueError("File data is not loaded")
+        entry = self._nodeEntry
+        if entry.data is None:
+            if entry.source is None:
+                raise ValueError("File data is not loaded")
+            start = entry.sourcePos
+            end = len(entry.source) if __size < 0 else start + __size
+            entry.sourcePos = max(start, min(end, len(entry.source)))
+            return bytes(entry.source[start:end])
 
-        return self._nodeEntry.data.read(__size)
+        return entry.data.read(__size)
 
     def write(self, __buffer: ReadableBuffer, /) -> int:
         """
@@ -677,10 +1313,75 @@ class ResourceHandle:
         if self.is_directory():
             raise TypeError("Cannot write to a directory")
 
-        if self._nodeEntry.data is None:
+        if self._nodeEntry.data is None and self._nodeEntry.source is None:
             raise ValueError("File data is not loaded")
 
-        return self._nodeEntry.data.write(__buffer)
+        self._drop_embedded_archive()
+        entry = self._nodeEntry
+        data = entry.detach()
+        DECODED_PAYLOAD_CACHE.discard(entry)
+        entry.dirty = True
+        self._mark_dirty()
+        try:
+            written = data.write(__buffer)
+        except BufferError:
+            # Views of the data are still alive, so it can't grow in place;
+            # leave them the old stream and continue on a copy
+            position = data.tell()
+            entry.data = BytesIO(data.getvalue())
+            entry.data.seek(position, 0)
+            written = entry.data.write(__buffer)
+        entry.modularB = len(entry.data.getbuffer())
+        return written
+
+    def set_data(self, __data: ReadableBuffer, /) -> None:
+        """
+        Replaces the file data.
+        """
+        if self.is_directory():
+            raise TypeError("Cannot set data of a directory")
+
+        self._drop_embedded_archive()
+        self._nodeEntry.set_data(__data)
+        self._mark_dirty()
+
+    def open_archive(self) -> ResourceArchive | None:
+        """
+        Parses this file as an archive, or returns None if it isn't one.
+
+        The archive stays bound to this file: changes to it are written back
+        into this file the next time the archive owning this file is saved,
+        so nested archives are serialized only once, outermost save first.
+        Opening the file again returns the same archive until the file's
+        data is replaced.
+        """
+        if self.is_directory():
+            raise TypeError("Cannot open a directory as an archive")
+
+        entry = self._nodeEntry
+        if entry.embedded is not None:
+            return entry.embedded
+
+        data = BytesIO(entry.get_decoded_view())
+        if not ResourceArchive.is_data_archive(data):
+            return None
+
+        archive = ResourceArchive.from_bytes(data, lazy=True)
+        if archive is not None:
+            archive._owner = entry
+            entry.embedded = archive
+        return archive
+
+    def _drop_embedded_archive(self) -> None:
+        embedded = self._nodeEntry.embedded
+        if embedded is not None:
+            embedded._owner = None
+            self._nodeEntry.embedded = None
+
+    def _mark_dirty(self) -> None:
+        archive = self.get_archive()
+        if archive is not None:
+            archive.mark_dirty()
 
     def seek(self, __offset: int, __whence: int = os.SEEK_CUR) -> int:
         """
@@ -689,10 +1390,22 @@ class ResourceHandle:
         if self.is_directory():
             raise TypeError("Cannot seek in a directory")
 
-        if self._nodeEntry.data is None:
-            raise ValueError("File data is not loaded")
+        entry = self._nodeEntry
+        if entry.data is None:
+            if entry.source is None:
+                raise ValueError("File data is not loaded")
+            if __whence == os.SEEK_SET:
+                pos = __offset
+            elif __whence == os.SEEK_CUR:
+                pos = entry.sourcePos + __offset
+            else:
+                pos = len(entry.source) + __offset
+            if pos < 0:
+                raise ValueError(f"Negative seek position {pos}")
+            entry.sourcePos = pos
+            return pos
 
-        return self._nodeEntry.data.seek(__offset, __whence)
+        return entry.data.seek(__offset, __whence)
 
     def __eq__(self, __o: object) -> bool:
         if isinstance(__o, ResourceHandle):
@@ -706,29 +1419,36 @@ class ResourceHandle:
         return hash(self._nodeEntry)
 
     def _get_files_by_load_type(self) -> _LoadSortedHandles:
+        return ResourceHandle._sort_files_by_load_type(self.get_handles(flatten=True))
+
+    @staticmethod
+    def _sort_files_by_load_type(
+        handles: Iterable[ResourceHandle],
+    ) -> ResourceHandle._LoadSortedHandles:
         mramHandles = []
         aramHandles = []
         dvdHandles = []
-        for handle in self.get_handles():
+        buckets = (mramHandles, aramHandles, dvdHandles)
+        for handle in handles:
             if handle.is_directory():
-                info = handle._get_files_by_load_type()
-                mramHandles.extend(info.mram)
-                aramHandles.extend(info.aram)
-                dvdHandles.extend(info.dvd)
-            else:
-                if handle.is_flagged(ResourceAttribute.PRELOAD_TO_MRAM):
-                    mramHandles.append(handle)
-                elif handle.is_flagged(ResourceAttribute.PRELOAD_TO_ARAM):
-                    mramHandles.append(handle)
-                elif handle.is_flagged(ResourceAttribute.LOAD_FROM_DVD):
-                    mramHandles.append(handle)
-                else:
-                    raise ValueError(
-                        f"Resource handle {handle.get_name()} isn't set to load"
-                    )
+                continue
+            buckets[handle._get_load_bucket()].append(handle)
 
         return ResourceHandle._LoadSortedHandles(mramHandles, aramHandles, dvdHandles)
 
+    def _get_load_bucket(self) -> int:
+        """
+        Returns the index of the data bucket this file is stored in, in
+        MRAM, ARAM, DVD order.
+        """
+        if self.is_flagged(ResourceAttribute.PRELOAD_TO_MRAM):
+            return 0
+        if self.is_flagged(ResourceAttribute.PRELOAD_TO_ARAM):
+            return 1
+        if self.is_flagged(ResourceAttribute.LOAD_FROM_DVD):
+            return 2
+        raise ValueError(f"Resource handle {self.get_name()} isn't set to load")
+
     def _fs_resolve_name(self, name: str) -> str:
         maxIterations = 1000
         parts = name.rsplit(".", 1)
@@ -793,24 +1513,17 @@ class ResourceArchive(A_Serializable):
             return self.mramSize + self.aramSize + self.dvdSize
 
         def get_data_offset(self) -> int:
-            ofs = align_int(
-                align_int(
-                    self.nodeMetaData.directoryCount * 0x10
-                    + self.nodeMetaData.fileEntryCount * 0x14,
-                    0x20,
-                )
-                + self.nodeMetaData.stringTableSize,
-                0x20,
-            )
-            return ofs
+            return self.get_string_table_offset() + self.nodeMetaData.stringTableSize
 
         def get_string_table_offset(self) -> int:
             return align_int(
-                self.nodeMetaData.directoryCount * 0x10
-                + self.nodeMetaData.fileEntryCount * 0x14,
+                self.get_node_table_offset() + self.nodeMetaData.fileEntryCount * 0x14,
                 0x20,
             )
 
+        def get_node_table_offset(self) -> int:
+            return align_int(0x40 + self.nodeMetaData.directoryCount * 0x10, 0x20)
+
     @dataclass
     class StringTableData:
         strings: bytes
@@ -818,14 +1531,43 @@ class ResourceArchive(A_Serializable):
         # These are just for caching purposes
         offsets: dict[str, int]
 
+    @dataclass
+    class _PatchBaseline:
+        """
+        The layout of the archive as last read from or written to `path`.
+        """
+        path: Path
+        directoryTable: list[InternalDirectoryEntry]
+        # (node, flags, directory index) of each node table row
+        rows: list[tuple[InternalNodeEntry, int, int]]
+        datasOffset: int
+        bucketSizes: list[int]
+        # (offset, room up to the next payload) of each file row
+        extents: dict[int, tuple[int, int]]
+        sharedOffsets: set[int]
+
     def __init__(self, rootInfo: InternalDirectoryEntry, syncIDs: bool = True):
         self.nodeInfo = ResourceArchive.NodeMetaData(
             0, 0x20, 0, 0x30, 5, 0x60, 0, syncIDs, [rootInfo], []
         )
         self.metaInfo = ResourceArchive.RARCMetaData(self.nodeInfo, 0, 0, 0)
         self.rootInfo = rootInfo
+        self._sourceBuffer: memoryview | None = None
+        self._sourceMap: mmap.mmap | None = None
+        self._pathCache: dict[tuple[str, ...], InternalNodeEntry] = {}
+        self._pathCacheGeneration = InternalDirectoryEntry.generation
+        self._patchBaseline: ResourceArchive._PatchBaseline | None = None
+        # Set on any change since the archive was loaded or saved to a file.
+        self._dirty = False
+        # File of an outer archive this archive was opened from, see `ResourceHandle.open_archive`.
+        self._owner: InternalNodeEntry | None = None
         self.regenerate_flat_lists()
 
+        rootInfo.archive = self
+        self._fileIDs = FileIDAllocator(
+            entry.fileID for entry in self.nodeInfo.nodeEntryTable if entry.is_file()
+        )
+
     @staticmethod
     def is_data_archive(archive: BinaryIO) -> bool:
         _oldPos = archive.tell()
@@ -861,46 +1603,150 @@ class ResourceArchive(A_Serializable):
 
         return directoryCount
 
+    @staticmethod
+    def get_directory_table_offset(archive: BinaryIO) -> int:
+        _oldPos = archive.tell()
+
+        assert archive.read(4) == b"RARC", 'Invalid identifier. Expected "RARC"'
+        archive.seek(0x24, 0)
+
+        directoryTableOffset = read_uint32(archive) + 0x20
+
+        archive.seek(_oldPos, 0)
+
+        return directoryTableOffset
+
+    @staticmethod
+    def get_root_file_count(archive: BinaryIO) -> int:
+        _oldPos = archive.tell()
+
+        directoryTableOffset = ResourceArchive.get_directory_table_offset(archive)
+        archive.seek(directoryTableOffset + 0xA, 0)
+
+        fileCount = read_uint16(archive)
+
+        archive.seek(_oldPos, 0)
+
+        return fileCount
+
+    @staticmethod
+    def _map_source(data: BinaryIO) -> tuple[memoryview, mmap.mmap | None]:
+        """
+        Returns a read-only view of the whole stream, sharing its memory
+        where possible.
+        """
+        if isinstance(data, BytesIO):
+            return data.getbuffer().toreadonly(), None
+
+        try:
+            fileno = data.fileno()
+        except (AttributeError, OSError):
+            fileno = -1
+
+        if fileno >= 0 and os.fstat(fileno).st_size > 0:
+            sourceMap = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+            return memoryview(sourceMap), sourceMap
+
+        _oldPos = data.tell()
+        data.seek(0, 0)
+        buffer = memoryview(data.read())
+        data.seek(_oldPos, 0)
+        return buffer, None
+
     @classmethod
-    def from_bytes(
-        cls, data: BinaryIO, *args: VariadicArgs, **kwargs: VariadicKwargs
+    def from_file(
+        cls, path: Path | str, *, lazy: bool = True
     ) -> "ResourceArchive" | None:
-        assert data.read(4) == b"RARC", 'Invalid identifier. Expected "RARC"'
-
-        # Header
-        rarcSize = read_uint32(data)
-        dataHeaderOffset = read_uint32(data)
-        dataOffset = read_uint32(data) + 0x20
-        dataLength = read_uint32(data)
-        mramSize = read_uint32(data)
-        aramSize = read_uint32(data)
-        data.seek(4, 1)
-
-        # Data Header
-        directoryCount = read_uint32(data)
-        directoryTableOffset = read_uint32(data) + 0x20
-        fileEntryCount = read_uint32(data)
-        fileEntryTableOffset = read_uint32(data) + 0x20
-        stringTableSize = read_uint32(data)
-        stringTableOffset = read_uint32(data) + 0x20
-        nextFreeFileID = read_uint16(data)
-        syncIDs = read_bool(data)
+        """
+        Loads the archive at `path`.
 
-        # Directory Nodes
-        data.seek(directoryTableOffset, 0)
+        With `lazy`, the file is memory mapped and file data is only read when
+        it is accessed. The file must not be overwritten until the archive is
+        released with `release_source`.
+        """
+        with open(path, "rb") as f:
+            archive = cls.from_bytes(f, lazy=lazy)
+
+        if archive is not None:
+            archive._patchBaseline = archive._make_patch_baseline(
+                Path(path),
+                archive._flatDirectoryList,
+                archive._flatNodeList,
+                archive._loadedDataOffset,
+            )
+        return archive
 
-        flatDirectoryList: list[InternalDirectoryEntry] = []
-        for _ in range(directoryCount):
-            directory = InternalDirectoryEntry.load(data, stringTableOffset)
-            flatDirectoryList.append(directory)
+    @classmethod
+    def from_bytes(
+        cls,
+        data: BinaryIO,
+        *args: VariadicArgs,
+        lazy: bool = False,
+        **kwargs: VariadicKwargs,
+    ) -> "ResourceArchive" | None:
+        """
+        Parses an archive starting at the current position of `data`.
 
-        # File Nodes
-        data.seek(fileEntryTableOffset, 0)
+        With `lazy`, file nodes keep a view into a buffer shared with `data`
+        (a memory map for real files) instead of copying their data out.
+        """
+        _startPos = data.tell()
+        (
+            magic,
+            rarcSize,
+            dataHeaderOffset,
+            dataOffset,
+            dataLength,
+            mramSize,
+            aramSize,
+            dvdSize,
+            directoryCount,
+            directoryTableOffset,
+            fileEntryCount,
+            fileEntryTableOffset,
+            stringTableSize,
+            stringTableOffset,
+            nextFreeFileID,
+            syncIDs,
+        ) = _HEADER_STRUCT.unpack(data.read(_HEADER_STRUCT.size))
+        assert magic == b"RARC", 'Invalid identifier. Expected "RARC"'
+        dataOffset += 0x20
+        directoryTableOffset += 0x20
+        fileEntryTableOffset += 0x20
+        stringTableOffset += 0x20
+
+        # Each table is read in one block and decoded in one pass
+        data.seek(_startPos + stringTableOffset, 0)
+        strings = _StringTableReader(data.read(stringTableSize))
+
+        data.seek(_startPos + directoryTableOffset, 0)
+        flatDirectoryList: list[InternalDirectoryEntry] = [
+            InternalDirectoryEntry.from_row(row, strings)
+            for row in _DIRECTORY_STRUCT.iter_unpack(
+                data.read(directoryCount * _DIRECTORY_STRUCT.size)
+            )
+        ]
 
-        flatNodeList: dict[InternalNodeEntry] = []
-        for _ in range(fileEntryCount):
-            node = InternalNodeEntry.load(data, dataOffset, stringTableOffset)
-            if node.is_directory() and node.modularA < 0xFFFF:
+        data.seek(_startPos + fileEntryTableOffset, 0)
+        nodeTable = data.read(fileEntryCount * _NODE_STRUCT.size)
+
+        sourceBuffer: memoryview | None = None
+        sourceMap: mmap.mmap | None = None
+        if lazy:
+            sourceBuffer, sourceMap = ResourceArchive._map_source(data)
+
+        flatNodeList: list[InternalNodeEntry] = []
+        for row in _NODE_STRUCT.iter_unpack(nodeTable):
+            node = InternalNodeEntry.from_row(row, strings)
+            if node.is_file():
+                dataPos = _startPos + dataOffset + node.modularA
+                if sourceBuffer is not None:
+                    # The shared buffer spans the whole stream, not just the archive
+                    node.source = sourceBuffer[dataPos : dataPos + node.modularB]
+                else:
+                    data.seek(dataPos, 0)
+                    node.data = BytesIO(data.read(node.modularB))
+            elif node.modularA < 0xFFFF:
                 try:
                     node.dirInfo = flatDirectoryList[node.modularA]
                 except IndexError:
@@ -919,121 +1765,387 @@ class ResourceArchive(A_Serializable):
             for nodeInfo in flatNodeList[
                 dirEntry.firstFileOffset : dirEntry.fileCount + dirEntry.firstFileOffset
             ]:
-                nodeInfo.parent = dirEntry
-                dirEntry.subNodes.append(nodeInfo)
+                dirEntry.add_node(nodeInfo)
 
         archive = cls(flatDirectoryList[0], syncIDs)
         archive._flatNodeList = flatNodeList
         archive._flatDirectoryList = flatDirectoryList
+        archive._loadedDataOffset = dataOffset
+        archive.metaInfo.mramSize = mramSize
+        archive.metaInfo.aramSize = aramSize
+        archive.metaInfo.dvdSize = dvdSize
+        archive._sourceBuffer = sourceBuffer
+        archive._sourceMap = sourceMap
 
         return archive
 
+    def is_lazy(self) -> bool:
+        return self._sourceBuffer is not None
+
+    def release_source(self) -> None:
+        """
+        Copies every file still viewing the source buffer into its own
+        stream and drops the buffer, unmapping the source file. The
+        archive's decompressed payloads are dropped from the shared cache.
+        """
+        DECODED_PAYLOAD_CACHE.discard_all(self._flatNodeList)
+        if self._sourceBuffer is None:
+            return
+
+        for node in self._flatNodeList:
+            if node.source is not None:
+                node.detach()
+
+        self._sourceBuffer.release()
+        self._sourceBuffer = None
+        if self._sourceMap is not None:
+            try:
+                self._sourceMap.close()
+            except BufferError:
+                # Views handed out by `get_view` or `open` are still alive, the map
+                # closes once they are collected
+                pass
+            self._sourceMap = None
+
+    def is_dirty(self) -> bool:
+        return self._dirty
+
+    def mark_dirty(self) -> None:
+        """
+        Flags the archive as modified, along with every archive it is nested in.
+        """
+        archive: ResourceArchive | None = self
+        while archive is not None:
+            archive._dirty = True
+            owner = archive._owner
+            if owner is None or owner.parent is None:
+                break
+            archive = owner.parent.get_archive()
+
+    def get_owner(self) -> ResourceHandle | None:
+        """
+        Returns the file this archive was opened from with `ResourceHandle.open_archive`.
+        """
+        if self._owner is None:
+            return None
+        return ResourceHandle(self._owner)
+
     def to_bytes(self) -> bytes:
         stream = BytesIO()
+        self.save_to(stream)
+        return stream.getvalue()
 
-        dataTable = self._regenerate_data_info(0)
+    def save_to(
+        self, __dest: Path | str | SupportsWrite, /, *, incremental: bool = False
+    ) -> None:
+        """
+        Serializes the archive into `__dest`.
 
-        stringTableData = self._get_string_table_data(self.nodeInfo.nodeEntryTable)
+        The tables are laid out up front and the file data is then streamed
+        straight from each file's source, so only the metadata is ever held in
+        memory. Paths are written to a temporary file that replaces the
+        destination once complete.
 
-        # File Writing
-        stream.write(b"RARC")
-        stream.write(
-            b"\xDD\xDD\xDD\xDD\x00\x00\x00\x20\xDD\xDD\xDD\xDD\xEE\xEE\xEE\xEE"
+        With `incremental`, saving back to the file the archive was loaded
+        from or last saved to only rewrites the tables and the data of
+        modified files, as long as no node was added, removed or moved.
+        """
+        self._flush_embedded_archives()
+
+        if not isinstance(__dest, (str, Path)):
+            self._write_to(__dest)
+            return
+
+        destPath = Path(__dest)
+        if incremental and self._patch_file(destPath):
+            self._dirty = False
+            return
+
+        fd, tempPath = tempfile.mkstemp(
+            prefix=f".{destPath.name}.", suffix=".tmp", dir=destPath.parent
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                self._write_to(f)
+            try:
+                os.replace(tempPath, destPath)
+            except PermissionError:
+                # Windows won't replace a file that is still mapped, which it
+                # is when overwriting the source of a lazy archive
+                if not self.is_lazy():
+                    raise
+                self.release_source()
+                os.replace(tempPath, destPath)
+        except BaseException:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+        self._patchBaseline = self._make_patch_baseline(
+            destPath,
+            self.nodeInfo.directoryTable,
+            self.nodeInfo.nodeEntryTable,
+            self.metaInfo.get_data_offset(),
         )
-        write_uint32(stream, self.metaInfo.mramSize)
-        write_uint32(stream, self.metaInfo.aramSize)
-        write_uint32(stream, self.metaInfo.dvdSize)
-
-        # Data Header
-        write_uint32(stream, len(self.nodeInfo.directoryTable))
-        stream.write(b"\xDD\xDD\xDD\xDD")
-        write_uint32(stream, len(self.nodeInfo.nodeEntryTable))
-        stream.write(b"\xDD\xDD\xDD\xDD")
-        stream.write(b"\xEE\xEE\xEE\xEE")
-        stream.write(b"\xEE\xEE\xEE\xEE")
-        write_uint16(stream, len(self.nodeInfo.nodeEntryTable))
-        write_bool(stream, self.sync_ids())
+        self._dirty = False
 
-        # Padding
-        stream.write(b"\x00\x00\x00\x00\x00")
+    def _flush_embedded_archives(self) -> None:
+        """
+        Writes each modified nested archive back into the file it was opened from.
+        """
+        for subNode in self.rootInfo.subNodes:
+            if subNode.name in [".", ".."]:
+                continue
+            for node in subNode.iter_files():
+                embedded = node.embedded
+                if embedded is None or not embedded.is_dirty():
+                    continue
+                node.set_decoded_data(embedded.to_bytes())
+                embedded._dirty = False
 
-        # Directory Nodes
-        directoryEntryOffset = stream.tell()
+    def _write_to(self, stream: SupportsWrite) -> None:
+        stringTableData = self._regenerate_tables()
+        payloads = self._regenerate_data_info(0)
+        stream.write(self._get_metadata(stringTableData))
 
-        datasOffset = self.metaInfo.get_data_offset()
+        # File Table
+        dataSize = self.metaInfo.get_size()
+        position = 0
+        for dataOffset, data in payloads:
+            if dataOffset != position:
+                stream.write(b"\x00" * (dataOffset - position))
+            stream.write(data)
+            position = dataOffset + len(data)
+        if position != dataSize:
+            stream.write(b"\x00" * (dataSize - position))
+
+    def _regenerate_tables(self) -> ResourceArchive.StringTableData:
+        self.regenerate_flat_lists()
+        stringTableData = self._get_string_table_data(self.nodeInfo.nodeEntryTable)
+        self._assign_name_offsets(stringTableData)
+        self.nodeInfo.stringTableSize = align_int(len(stringTableData.strings), 0x20)
+        return stringTableData
+
+    def _get_metadata(self, stringTableData: ResourceArchive.StringTableData) -> bytes:
+        """
+        Returns everything before the data section, from the current tables.
+        """
+        nodeTableOffset = self.metaInfo.get_node_table_offset()
         stringTableOffset = self.metaInfo.get_string_table_offset()
+        datasOffset = self.metaInfo.get_data_offset()
+        dataSize = self.metaInfo.get_size()
 
-        for directory in self.nodeInfo.directoryTable:
-            directory.save(stream, stringTableOffset)
+        header = BytesIO()
+
+        # Header and Data Header
+        header.write(
+            _HEADER_STRUCT.pack(
+                b"RARC",
+                datasOffset + dataSize,
+                0x20,
+                datasOffset - 0x20,
+                dataSize,
+                self.metaInfo.mramSize,
+                self.metaInfo.aramSize,
+                self.metaInfo.dvdSize,
+                self.nodeInfo.directoryCount,
+                0x40 - 0x20,
+                self.nodeInfo.fileEntryCount,
+                nodeTableOffset - 0x20,
+                self.nodeInfo.stringTableSize,
+                stringTableOffset - 0x20,
+                self.nodeInfo.nextFreeFileID,
+                self.sync_ids(),
+            )
+        )
+
+        # Directory Nodes
+        header.write(
+            b"".join(
+                _DIRECTORY_STRUCT.pack(*directory.to_row())
+                for directory in self.nodeInfo.directoryTable
+            )
+        )
 
         # Padding
-        write_pad32(stream)
+        write_pad32(header)
 
         # File Entries
-        fileEntryOffset = stream.tell()
-        for i, entry in enumerate(self.nodeInfo.nodeEntryTable):
-            entry.save(
-                stream,
-                datasOffset,
-                stringTableOffset,
-                i if self.nodeInfo.syncIDs else None,
+        syncIDs = self.sync_ids()
+        header.write(
+            b"".join(
+                _NODE_STRUCT.pack(*entry.to_row(i if syncIDs else None))
+                for i, entry in enumerate(self.nodeInfo.nodeEntryTable)
             )
+        )
 
         # Padding
-        write_pad32(stream)
+        write_pad32(header)
 
         # String Table
-        validStringTableOffset = stream.tell()
         assert (
-            validStringTableOffset == stringTableOffset
-        ), f"String table offset is invalid. Expected {stringTableOffset}, got {validStringTableOffset}"
-        stream.write(stringTableData.strings)
+            header.tell() == stringTableOffset
+        ), f"String table offset is invalid. Expected {stringTableOffset}, got {header.tell()}"
+        header.write(stringTableData.strings)
 
         # Padding
-        write_pad32(stream)
+        write_pad32(header)
 
-        # File Table
-        validDatasOffset = stream.tell()
         assert (
-            validDatasOffset == datasOffset
-        ), f"Data offset is invalid. Expected {datasOffset}, got {validDatasOffset}"
-        stream.write(dataTable.getvalue())
-
-        # Header
-        rarcSize = len(stream.getvalue())
-
-        stream.seek(0x4, 0)
-        write_uint32(stream, rarcSize)
-        stream.seek(0x4, 1)
-        write_uint32(stream, datasOffset - 0x20)
-        write_uint32(stream, rarcSize - datasOffset)
-        stream.seek(0x10, 1)
-        write_uint32(stream, directoryEntryOffset - 0x20)
-        stream.seek(0x4, 1)
-        write_uint32(stream, fileEntryOffset - 0x20)
-        write_uint32(stream, datasOffset - stringTableOffset)
-        write_uint32(stream, stringTableOffset - 0x20)
+            header.tell() == datasOffset
+        ), f"Data offset is invalid. Expected {datasOffset}, got {header.tell()}"
+        return header.getvalue()
 
-        return stream.getvalue()
+    def _make_patch_baseline(
+        self,
+        path: Path,
+        directoryTable: list[InternalDirectoryEntry],
+        nodeEntryTable: list[InternalNodeEntry],
+        datasOffset: int,
+    ) -> ResourceArchive._PatchBaseline:
+        bucketSizes = [
+            self.metaInfo.mramSize,
+            self.metaInfo.aramSize,
+            self.metaInfo.dvdSize,
+        ]
 
-    @classmethod
-    def import_from(self, path: Path | str) -> ResourceHandle | None:
-        if isinstance(path, str):
-            path = Path(path)
+        rows: list[tuple[InternalNodeEntry, int, int]] = []
+        fileOffsets: dict[int, int] = {}
+        for entry in nodeEntryTable:
+            rows.append(
+                (entry, int(entry.flags), entry.modularA if entry.is_directory() else -1)
+            )
+            if entry.is_file():
+                fileOffsets[entry.modularA] = fileOffsets.get(entry.modularA, 0) + 1
+                entry.dirty = False
+
+        # Each payload may grow up to where the next one starts
+        starts = sorted(fileOffsets)
+        starts.append(max(sum(bucketSizes), starts[-1] if starts else 0))
+        rooms = {starts[i]: starts[i + 1] - starts[i] for i in range(len(starts) - 1)}
+
+        extents = {
+            i: (entry.modularA, rooms[entry.modularA])
+            for i, entry in enumerate(nodeEntryTable)
+            if entry.is_file()
+        }
+        sharedOffsets = {offset for offset, count in fileOffsets.items() if count > 1}
+
+        return ResourceArchive._PatchBaseline(
+            path.resolve(),
+            list(directoryTable),
+            rows,
+            datasOffset,
+            bucketSizes,
+            extents,
+            sharedOffsets,
+        )
 
-        if not path.is_dir():
-            return None
+    def _patch_file(self, path: Path) -> bool:
+        """
+        Rewrites the tables and the modified payloads of the archive at `path`
+        in place. Payloads that no longer fit their old extent are appended,
+        which only works for files in the last non-empty load bucket.
+
+        Returns False without touching the file if a full rewrite is needed.
+        """
+        baseline = self._patchBaseline
+        if baseline is None or baseline.path != path.resolve() or not path.is_file():
+            return False
+
+        stringTableData = self._regenerate_tables()
+        nodeEntryTable = self.nodeInfo.nodeEntryTable
+        if (
+            self.metaInfo.get_data_offset() != baseline.datasOffset
+            or len(self.nodeInfo.directoryTable) != len(baseline.directoryTable)
+            or len(nodeEntryTable) != len(baseline.rows)
+        ):
+            return False
 
-        archive = ResourceArchive(path.name)
+        for directory, savedDirectory in zip(
+            self.nodeInfo.directoryTable, baseline.directoryTable
+        ):
+            if directory is not savedDirectory:
+                return False
+
+        for entry, (savedEntry, flags, dirIndex) in zip(nodeEntryTable, baseline.rows):
+            if entry.name in [".", ".."]:
+                # Regenerated each save, so compare what they point to
+                if entry.name != savedEntry.name or entry.modularA != dirIndex:
+                    return False
+            elif entry is not savedEntry or int(entry.flags) != flags:
+                return False
 
-        for p in path.iterdir():
-            resource = ResourceHandle.import_from(p)
+        bucketSizes = list(baseline.bucketSizes)
+        dataEnd = sum(bucketSizes)
+        writes: list[tuple[InternalNodeEntry, int, bytes | memoryview, int]] = []
+        for i, entry in enumerate(nodeEntryTable):
+            if not entry.is_file() or not entry.dirty:
+                continue
 
-            if resource is None:
+            data = entry.get_view()
+            offset, room = baseline.extents[i]
+            if len(data) <= room and offset not in baseline.sharedOffsets:
+                writes.append((entry, offset, data, room))
                 continue
 
-            archive.add_handle(resource)
+            bucket = ResourceHandle(entry)._get_load_bucket()
+            if any(bucketSizes[bucket + 1 :]):
+                return False
+
+            room = align_int(len(data), 0x20)
+            writes.append((entry, dataEnd, data, room))
+            bucketSizes[bucket] += room
+            dataEnd += room
+
+        for entry, offset, data, _ in writes:
+            entry.modularA = offset
+            entry.modularB = len(data)
+        self.metaInfo.mramSize, self.metaInfo.aramSize, self.metaInfo.dvdSize = bucketSizes
+
+        with open(path, "r+b") as f:
+            f.write(self._get_metadata(stringTableData))
+            for _, offset, data, room in writes:
+                f.seek(baseline.datasOffset + offset, 0)
+                f.write(data)
+                f.write(b"\x00" * (room - len(data)))
+
+        self._patchBaseline = self._make_patch_baseline(
+            path, self.nodeInfo.directoryTable, nodeEntryTable, baseline.datasOffset
+        )
+        return True
+
+    @classmethod
+    def import_from(
+        cls,
+        path: Path | str,
+        *,
+        maxWorkers: Optional[int] = None,
+        progress: Optional[BatchProgressCallback] = None,
+    ) -> "ResourceArchive" | None:
+        """
+        Packs a folder into a new archive named after it.
 
+        Every file is read up front across up to `maxWorkers` threads, then
+        the tree is built and laid out in a single pass.
+        """
+        if isinstance(path, str):
+            path = Path(path)
+
+        if not path.is_dir():
+            return None
+
+        rootInfo = InternalDirectoryEntry(
+            magic="ROOT",
+            nameOffset=-1,
+            nameHash=jdrama.get_key_code(path.name),
+            fileCount=0,
+            firstFileOffset=-1,
+            name=path.name,
+        )
+        archive = cls(rootInfo)
+        archive._get_root_handle()._populate_from(path, maxWorkers, progress)
+        archive.regenerate_ids()
         return archive
 
     def export_to(
@@ -1041,16 +2153,42 @@ class ResourceArchive(A_Serializable):
         path: Path | str,
         *,
         action: FileConflictAction = FileConflictAction.REPLACE,
+        maxWorkers: Optional[int] = None,
+        progress: Optional[BatchProgressCallback] = None,
     ) -> bool:
+        """
+        Extracts the archive into `path`/<root name>.
+
+        The directory tree is created first, then the file data is written
+        across up to `maxWorkers` threads.
+        """
         if isinstance(path, str):
             path = Path(path)
 
         rootPath = path / self.rootInfo.name
         rootPath.mkdir(parents=True, exist_ok=True)
 
+        targets: list[tuple[Path, InternalNodeEntry]] = []
         for node in self.rootInfo.subNodes:
-            ResourceHandle(node).export_to(rootPath, action=action)
+            if node.name in [".", ".."]:
+                continue
 
+            targetPath = rootPath / node.name
+            if targetPath.exists():
+                if action == FileConflictAction.REPLACE:
+                    if targetPath.is_dir():
+                        shutil.rmtree(targetPath)
+                    else:
+                        targetPath.unlink()
+                elif action == FileConflictAction.SKIP:
+                    continue
+                else:
+                    targetPath = targetPath.with_stem(
+                        self._get_root_handle()._fs_resolve_name(node.name)
+                    )
+            targets.append((targetPath, node))
+
+        _export_nodes(targets, maxWorkers, progress)
         return True
 
     def get_handle(
@@ -1060,42 +2198,82 @@ class ResourceArchive(A_Serializable):
             __path = PurePath(__path)
         if len(__path.parts) == 0:
             return None
-        if len(__path.parts) == 1:
-            # Get the handle from the root directory
-            for node in self.rootInfo.subNodes:
-                if node.name == __path.name:
-                    return ResourceHandle(node)
-        # Get the handle from the subdirectory
-        for node in self.rootInfo.subNodes:
-            if node.name == __path.parts[0]:
-                return ResourceHandle(node).get_handle(
-                    __path.relative_to(__path.parts[0]), flatten=flatten
-                )
-        return None
+        node = self._resolve_cached(__path.parts)
+        if node is None:
+            return None
+        return ResourceHandle(node)
+
+    def _resolve_cached(self, parts: tuple[str, ...]) -> InternalNodeEntry | None:
+        # Any add, remove or rename in any directory invalidates the cache
+        if self._pathCacheGeneration != InternalDirectoryEntry.generation:
+            self._pathCache.clear()
+            self._pathCacheGeneration = InternalDirectoryEntry.generation
+
+        node = self._pathCache.get(parts)
+        if node is None:
+            node = self.rootInfo.resolve(parts)
+            if node is not None:
+                self._pathCache[parts] = node
+        return node
 
     def get_handles(self, *, flatten: bool = False) -> list[ResourceHandle]:
-        if flatten:
-            return [
-                ResourceHandle(node)
-                for node in self.rootInfo.nodeEntryTable
-                if node.name not in [".", ".."]
-            ]
-        return [
-            ResourceHandle(node)
-            for node in self.rootInfo.subNodes
-            if node.name not in [".", ".."]
-        ]
+        handles: list[ResourceHandle] = []
+        for node in self.rootInfo.subNodes:
+            if node.name in [".", ".."]:
+                continue
+            handle = ResourceHandle(node)
+            handles.append(handle)
+            if flatten and handle.is_directory():
+                handles.extend(handle.get_handles(flatten=True))
+        return handles
+
+    def new_file(
+        self,
+        name: str,
+        initialData: bytes | bytearray | memoryview = b"",
+        attributes: ResourceAttribute = ResourceAttribute.FILE
+        | ResourceAttribute.PRELOAD_TO_MRAM,
+        fileID: int | None = None,
+    ) -> ResourceHandle | None:
+        if fileID is None:
+            fileID = self.get_next_free_id()
+        return self._get_root_handle().new_file(name, initialData, attributes, fileID)
+
+    def new_directory(
+        self,
+        name: str,
+        attributes: ResourceAttribute = ResourceAttribute.DIRECTORY
+        | ResourceAttribute.PRELOAD_TO_MRAM,
+    ) -> ResourceHandle | None:
+        return self._get_root_handle().new_directory(name, attributes)
+
+    def _get_root_handle(self) -> ResourceHandle:
+        # The root directory has no node of its own, so wrap it in a stand-in
+        return ResourceHandle(
+            InternalNodeEntry(
+                fileID=0xFFFF,
+                nameHash=self.rootInfo.nameHash,
+                flags=ResourceAttribute.DIRECTORY,
+                nameOffset=-1,
+                modularA=0,
+                modularB=0x10,
+                name=self.rootInfo.name,
+                data=None,
+                dirInfo=self.rootInfo,
+            )
+        )
 
     def add_handle(self, handle: ResourceHandle, /) -> bool:
         if handle.is_directory():
             return False
 
-        if handle._nodeEntry in self.rootInfo.subNodes:
+        if handle._nodeEntry.parent is self.rootInfo:
             return False
 
-        self.rootInfo.subNodes.append(handle._nodeEntry)
+        if handle._nodeEntry.parent is not None:
+            handle._nodeEntry.parent.remove_node(handle._nodeEntry)
+        self.rootInfo.add_node(handle._nodeEntry)
         self.rootInfo.fileCount += 1
-        handle._nodeEntry.parent = self.rootInfo
         return True
 
     def remove_path(self, __path: PurePath | str, /) -> bool:
@@ -1103,18 +2281,14 @@ class ResourceArchive(A_Serializable):
             __path = PurePath(__path)
         if len(__path.parts) == 0:
             return False
-        if len(__path.parts) == 1:
-            for node in self.rootInfo.subNodes:
-                if node.name == __path.name:
-                    self.rootInfo.subNodes.remove(node)
-                    self.rootInfo.fileCount -= 1
-                    node.parent = None
-                    return True
-        for node in self.rootInfo.subNodes:
-            if node.name == __path.parts[0]:
-                return ResourceHandle(node).remove_path(
-                    __path.relative_to(__path.parts[0])
-                )
+        node = self._resolve_cached(__path.parts)
+        if node is None or node.parent is None:
+            return False
+        parent = node.parent
+        if not parent.remove_node(node):
+            return False
+        parent.fileCount -= 1
+        return True
 
     def rename(
         self,
@@ -1130,143 +2304,180 @@ class ResourceArchive(A_Serializable):
         self.set_name(__path.name)
         return True
 
-    def sync_ids(self) -> bool:
-        return self._syncIDs
+    def get_name(self) -> str:
+        return self.rootInfo.name
 
-    def get_next_free_id(self) -> int:
-        allIDs: list[int] = []
-        for handle in self.get_handles(flatten=True):
-            if handle.is_directory():
-                continue
-            allIDs.append(handle.get_id())
+    def set_name(self, name: str) -> None:
+        self.rootInfo.name = name
+        self.rootInfo.nameHash = jdrama.get_key_code(name)
 
-        if len(allIDs) == 0:
-            return 0
+    def sync_ids(self) -> bool:
+        return self.nodeInfo.syncIDs
 
-        allIDs.sort()
-        for i in range(allIDs[0] + 1, allIDs[-1]):
-            if i not in allIDs:
-                return i
-        return len(allIDs)
+    def get_next_free_id(self) -> int:
+        return self._fileIDs.get_next_free()
 
     def regenerate_ids(self) -> None:
+        """
+        Numbers the files by their position in the node table, which is what
+        synced archives store on save.
+        """
         if not self.sync_ids():
             return
-        nodeID = 0
-        for handle in self.get_handles(flatten=True):
-            if handle.is_directory():
-                continue
-            handle.set_id(nodeID)
-            nodeID += 1
+        self.regenerate_flat_lists()
+        for i, entry in enumerate(self.nodeInfo.nodeEntryTable):
+            if entry.is_file():
+                entry.fileID = i
+        self._fileIDs = FileIDAllocator(
+            entry.fileID for entry in self.nodeInfo.nodeEntryTable if entry.is_file()
+        )
 
     def regenerate_flat_lists(self) -> None:
-        self.nodeInfo.fileTable = []
-        self._regenerate_flat_lists_for_node(self.rootInfo)
-
-    def _regenerate_flat_lists_for_node(self, dirInfo: InternalDirectoryEntry) -> None:
-        # Sort the subnodes
-        specialNodes = []
-        for child in dirInfo.subNodes:
-            if child.is_directory() and child.name in [".", ".."]:
-                specialNodes.append(child)
-        for specialNode in specialNodes:
-            dirInfo.subNodes.remove(specialNode)
-            dirInfo.subNodes.append(specialNode)
-
-        dirInfo.firstFileOffset = self.nodeInfo.fileEntryCount
-        self.nodeInfo.nodeEntryTable.extend(dirInfo.subNodes)
-
-        for child in dirInfo.subNodes:
-            if child.is_directory() and child.name not in [".", ".."]:
-                self._regenerate_flat_lists_for_node(child.dirInfo)
-
-    def _regenerate_data_info(self, offset: int) -> BytesIO:
-        mramData = b""
-        aramData = b""
-        dvdData = b""
-
-        offsetMap: dict[ResourceHandle, int] = {}
-
-        startOffset = offset
-        sortedHandles = self._get_files_by_load_type()
-        for handle in sortedHandles.mram:
-            data = handle.get_data()
-            # Check if the data is already in the MRAM data
-            for otherHandle in sortedHandles.mram:
-                if otherHandle is handle:
-                    continue
-                if otherHandle.get_data() == data:
-                    offsetMap[handle] = offsetMap[otherHandle]
-                    break
-            else:
-                offsetMap[handle] = offset
-            handle._nodeEntry.modularA = offsetMap[handle]
-            mramData += data
-            offset += len(data)
-
-        self.metaInfo.mramSize = offset - startOffset
-
-        startOffset = offset
-        for handle in sortedHandles.aram:
-            data = handle.get_data()
-            # Check if the data is already in the ARAM data
-            for otherHandle in sortedHandles.aram:
-                if otherHandle is handle:
-                    continue
-                if otherHandle.get_data() == data:
-                    offsetMap[handle] = offsetMap[otherHandle]
-                    break
-            else:
-                offsetMap[handle] = offset
-            aramData += data
-            offset += len(data)
-
-        self.metaInfo.aramSize = offset - startOffset
-
-        startOffset = offset
-        for handle in sortedHandles.dvd:
-            data = handle.get_data()
-            # Check if the data is already in the DVD data
-            for otherHandle in sortedHandles.dvd:
-                if otherHandle is handle:
-                    continue
-                if otherHandle.get_data() == data:
-                    offsetMap[handle] = offsetMap[otherHandle]
-                    break
-            else:
-                offsetMap[handle] = offset
-            dvdData += data
-            offset += len(data)
+        """
+        Rebuilds the directory and node tables in the order Nintendo's
+        packer uses. Directories are listed breadth first, while each
+        directory's block of nodes is placed depth first.
+        """
+        directoryTable = [self.rootInfo]
+        i = 0
+        while i < len(directoryTable):
+            for child in directoryTable[i].subNodes:
+                if child.is_directory() and child.name not in [".", ".."]:
+                    child.modularA = len(directoryTable)
+                    child.modularB = 0x10
+                    directoryTable.append(child.dirInfo)
+            i += 1
+
+        dirIndexes = {id(dirInfo): i for i, dirInfo in enumerate(directoryTable)}
+
+        self.nodeInfo.directoryTable = directoryTable
+        self.nodeInfo.nodeEntryTable = []
+        self._regenerate_flat_lists_for_node(self.rootInfo, dirIndexes, 0xFFFFFFFF)
+
+        self.nodeInfo.directoryCount = len(directoryTable)
+        self.nodeInfo.fileEntryCount = len(self.nodeInfo.nodeEntryTable)
+        if self.sync_ids():
+            self.nodeInfo.nextFreeFileID = self.nodeInfo.fileEntryCount
+        else:
+            self.nodeInfo.nextFreeFileID = 1 + max(
+                (n.fileID for n in self.nodeInfo.nodeEntryTable if n.is_file()),
+                default=-1,
+            )
 
-        self.metaInfo.dvdSize = offset - startOffset
+    def _regenerate_flat_lists_for_node(
+        self,
+        dirInfo: InternalDirectoryEntry,
+        dirIndexes: dict[int, int],
+        parentIndex: int,
+    ) -> None:
+        children = [
+            child for child in dirInfo.subNodes if child.name not in [".", ".."]
+        ]
 
-        return BytesIO(mramData + aramData + dvdData)
+        dirInfo.firstFileOffset = len(self.nodeInfo.nodeEntryTable)
+        dirInfo.fileCount = len(children) + 2
+        if dirInfo.nodeInfo is not None:
+            dirInfo.name = dirInfo.nodeInfo.name
+            dirInfo.nameHash = dirInfo.nodeInfo.nameHash
+        if isinstance(dirInfo.magic, bytes):
+            dirInfo.magic = dirInfo.magic.decode("ascii")
+
+        # The special nodes are always regenerated, as new directories lack them
+        dirIndex = dirIndexes[id(dirInfo)]
+        self.nodeInfo.nodeEntryTable.extend(children)
+        for name, index in ((".", dirIndex), ("..", parentIndex)):
+            self.nodeInfo.nodeEntryTable.append(
+                InternalNodeEntry(
+                    fileID=0xFFFF,
+                    nameHash=jdrama.get_key_code(name),
+                    flags=ResourceAttribute.DIRECTORY,
+                    nameOffset=-1,
+                    modularA=index,
+                    modularB=0x10,
+                    name=name,
+                    data=None,
+                    dirInfo=dirInfo,
+                )
+            )
 
-    def _get_string_table_data(
-        self, fileList: list[InternalNodeEntry]
-    ) -> StringTableData:
-        offsets: dict[str, int] = {}
-        stringBuf = BytesIO()
+        for child in children:
+            if child.is_directory():
+                self._regenerate_flat_lists_for_node(child.dirInfo, dirIndexes, dirIndex)
+
+    def _assign_name_offsets(
+        self, stringTableData: ResourceArchive.StringTableData
+    ) -> None:
+        for directory in self.nodeInfo.directoryTable:
+            directory.nameOffset = stringTableData.offsets[directory.name]
+        for entry in self.nodeInfo.nodeEntryTable:
+            entry.nameOffset = stringTableData.offsets[entry.name]
+
+    def _get_files_by_load_type(self) -> ResourceHandle._LoadSortedHandles:
+        return ResourceHandle._sort_files_by_load_type(
+            ResourceHandle(entry) for entry in self.nodeInfo.nodeEntryTable
+        )
+
+    def _regenerate_data_info(
+        self, offset: int
+    ) -> list[tuple[int, bytes | memoryview]]:
+        """
+        Lays out the data section, updating each file's offset and size.
+        Returns each distinct payload with its offset, in ascending order.
 
-        rootName = self.get_name()
-        offsets[rootName] = 0
-        write_string(stringBuf, rootName)
+        Identical payloads are stored once per load bucket. Sharing data across
+        buckets isn't possible, as the game loads each bucket separately.
+        """
+        payloads: list[tuple[int, bytes | memoryview]] = []
 
-        # Write the special nodes
-        offsets["."] = stringBuf.tell()
-        write_string(stringBuf, ".")
+        sortedHandles = self._get_files_by_load_type()
+        bucketSizes: list[int] = []
+        for handles in (sortedHandles.mram, sortedHandles.aram, sortedHandles.dvd):
+            startOffset = offset
+            digestMap: dict[bytes, list[int]] = {}
+            for handle in handles:
+                entry = handle._nodeEntry
+                data = entry.get_view()
+                digest = hashlib.sha1(data).digest()
+
+                dataOffset = -1
+                # Collisions are practically impossible, but stay correct anyway
+                for candidate in digestMap.get(digest, ()):
+                    _, candidateData = payloads[candidate]
+                    if candidateData == data:
+                        dataOffset = payloads[candidate][0]
+                        break
+
+                if dataOffset == -1:
+                    dataOffset = offset
+                    digestMap.setdefault(digest, []).append(len(payloads))
+                    payloads.append((dataOffset, data))
+                    offset = align_int(offset + len(data), 0x20)
+
+                entry.modularA = dataOffset
+                entry.modularB = len(data)
+            bucketSizes.append(offset - startOffset)
+
+        self.metaInfo.mramSize, self.metaInfo.aramSize, self.metaInfo.dvdSize = bucketSizes
+        return payloads
 
-        offsets[".."] = stringBuf.tell()
-        write_string(stringBuf, "..")
+    def _get_string_table_data(
+        self, fileList: list[InternalNodeEntry]
+    ) -> ResourceArchive.StringTableData:
+        offsets: dict[str, int] = {}
+        encodedNames: list[bytes] = []
+        size = 0
 
-        # Write the rest of the nodes
-        for entry in fileList:
-            # Skip duplicate names
-            if entry.name not in offsets:
-                offsets[entry.name] = stringBuf.tell()
-                write_string(stringBuf, entry.name)
+        # The root name comes first, then the special nodes, then the rest of
+        # the nodes with duplicate names skipped
+        for name in chain((self.get_name(), ".", ".."), (entry.name for entry in fileList)):
+            if name in offsets:
+                continue
+            offsets[name] = size
+            encoded = _encode_name(name) + b"\x00"
+            encodedNames.append(encoded)
+            size += len(encoded)
 
-        return ResourceArchive._StringTableData(stringBuf.getvalue(), offsets)
+        return ResourceArchive.StringTableData(b"".join(encodedNames), offsets)
 
     def __eq__(self, __o: object) -> bool:
         if not isinstance(__o, ResourceArchive):
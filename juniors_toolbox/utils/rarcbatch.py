@@ -0,0 +1,158 @@
+import argparse
+import json
+from pathlib import Path
+from typing import Callable, Optional
+
+from juniors_toolbox.utils.rarc import ResourceArchive
+from juniors_toolbox.utils.yaz0 import decompress_yaz0, is_yaz0_compressed
+from juniors_toolbox.utils.yaz0batch import find_archives
+
+BATCH_MANIFEST_NAME = ".rarcbatch.json"
+
+
+# Called as `progress(archivePath, filePath, completed, total)` for each file of each archive
+TreeProgressCallback = Callable[[Path, Path, int, int], None]
+
+
+def load_archive(path: Path) -> Optional[ResourceArchive]:
+    """
+    Loads a .arc or Yaz0 compressed .szs archive lazily
+
+    :param path: Archive to load
+    :return: The archive, or None if it isn't one
+    """
+    with open(path, "rb") as f:
+        magic = f.read(4)
+
+    if not is_yaz0_compressed(magic):
+        if magic != b"RARC":
+            return None
+        return ResourceArchive.from_file(path)
+
+    with open(path, "rb") as f:
+        data = decompress_yaz0(f)
+    if not ResourceArchive.is_data_archive(data):
+        return None
+    return ResourceArchive.from_bytes(data, lazy=True)
+
+
+def extract_archive_tree(
+    sourceRoot: Path,
+    destRoot: Path,
+    *,
+    maxWorkers: Optional[int] = None,
+    progress: Optional[TreeProgressCallback] = None,
+) -> list[Path]:
+    """
+    Extracts every .arc and .szs archive under a folder
+
+    Each archive is extracted to `destRoot`/<relative path without suffix>/<root name>.
+    The layout is recorded in a manifest so `pack_archive_tree` can rebuild it.
+
+    :param sourceRoot: Folder holding the archives
+    :param destRoot: Folder to extract into
+    :param maxWorkers: Maximum number of writer threads per archive
+    :param progress: Called as `progress(archive, file, completed, total)` as each file is written
+    :return: Each extracted archive
+    """
+    manifest: dict[str, str] = {}
+    extracted: list[Path] = []
+
+    for source in find_archives(sourceRoot, (".arc", ".szs")):
+        archive = load_archive(source)
+        if archive is None:
+            continue
+
+        relPath = source.relative_to(sourceRoot)
+
+        def _report(path: Path, completed: int, total: int) -> None:
+            if progress is not None:
+                progress(source, path, completed, total)
+
+        archive.export_to(
+            destRoot / relPath.with_suffix(""), maxWorkers=maxWorkers, progress=_report
+        )
+        archive.release_source()
+
+        manifest[relPath.as_posix()] = archive.get_name()
+        extracted.append(source)
+
+    destRoot.mkdir(parents=True, exist_ok=True)
+    (destRoot / BATCH_MANIFEST_NAME).write_text(
+        json.dumps(manifest, indent=4), encoding="utf-8"
+    )
+    return extracted
+
+
+def pack_archive_tree(
+    sourceRoot: Path,
+    destRoot: Path,
+    *,
+    maxWorkers: Optional[int] = None,
+    progress: Optional[TreeProgressCallback] = None,
+) -> list[Path]:
+    """
+    Packs every archive listed in the manifest written by `extract_archive_tree`
+
+    Archives are written uncompressed as .arc, mirroring the original layout.
+
+    :param sourceRoot: Folder the archives were extracted to
+    :param destRoot: Folder to write the .arc files to
+    :param maxWorkers: Maximum number of reader threads per archive
+    :param progress: Called as `progress(archive, file, completed, total)` as each file is read
+    :return: Each packed archive
+    """
+    manifest: dict[str, str] = json.loads(
+        (sourceRoot / BATCH_MANIFEST_NAME).read_text(encoding="utf-8")
+    )
+    packed: list[Path] = []
+
+    for relName, rootName in manifest.items():
+        relPath = Path(relName)
+        destination = destRoot / relPath.with_suffix(".arc")
+
+        def _report(path: Path, completed: int, total: int) -> None:
+            if progress is not None:
+                progress(destination, path, completed, total)
+
+        archive = ResourceArchive.import_from(
+            sourceRoot / relPath.with_suffix("") / rootName,
+            maxWorkers=maxWorkers,
+            progress=_report,
+        )
+        if archive is None:
+            continue
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        archive.save_to(destination)
+        packed.append(destination)
+
+    return packed
+
+
+def _print_progress(archive: Path, path: Path, completed: int, total: int) -> None:
+    if completed == total:
+        print(f"[RARC-BATCH] {archive} ({total} files)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='RARC batch extractor/packer for SMS modding',
+                                     description='Extract or pack every archive under a folder',
+                                     allow_abbrev=False)
+
+    parser.add_argument('mode', choices=('extract', 'pack'), help='operation to run')
+    parser.add_argument('path', help='input folder')
+    parser.add_argument('dest', help='output folder')
+    parser.add_argument('-j', '--jobs',
+                        help='Maximum number of I/O threads per archive',
+                        type=int,
+                        default=None)
+
+    args = parser.parse_args()
+
+    if args.mode == 'extract':
+        extract_archive_tree(Path(args.path), Path(args.dest),
+                             maxWorkers=args.jobs, progress=_print_progress)
+    else:
+        pack_archive_tree(Path(args.path), Path(args.dest),
+                          maxWorkers=args.jobs, progress=_print_progress)
@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Optional
+
+from juniors_toolbox.utils.rarc import ResourceArchive, ResourceAttribute, ResourceHandle
+
+
+@dataclass
+class ArchiveManifestEntry:
+    # Posix path relative to the archive root, without the root name
+    path: str
+    flags: int
+    # Byte size of a file, or the node count of a directory
+    size: int
+    # Offset of a file's data from the start of the data section, -1 for directories
+    offset: int
+    fileID: int
+
+    def get_path(self) -> PurePosixPath:
+        return PurePosixPath(self.path)
+
+    def is_file(self) -> bool:
+        return (self.flags & ResourceAttribute.FILE) != 0
+
+    def is_directory(self) -> bool:
+        return (self.flags & ResourceAttribute.DIRECTORY) != 0
+
+
+@dataclass
+class ArchiveManifest:
+    """
+    Structural summary of an archive: its tree, node flags, sizes and offsets,
+    enough to list it without parsing or decompressing it
+    """
+    rootName: str
+    # Parents are always listed before their children
+    entries: list[ArchiveManifestEntry] = field(default_factory=list)
+
+    # Identity of the archive file this manifest describes
+    sourceSize: int = -1
+    sourceMTime: int = -1
+    sourceDigest: str = ""
+
+    @classmethod
+    def from_archive(cls, archive: ResourceArchive) -> "ArchiveManifest":
+        """
+        Summarizes `archive` as it was loaded. Offsets are only meaningful
+        until the archive is modified.
+        """
+        manifest = cls(archive.get_name())
+
+        def _add_handles(handles: list[ResourceHandle], parentPath: PurePosixPath) -> None:
+            for handle in handles:
+                path = parentPath / handle.get_name()
+                isFile = handle.is_file()
+                manifest.entries.append(
+                    ArchiveManifestEntry(
+                        path.as_posix(),
+                        int(handle.get_flags()),
+                        handle.get_size(),
+                        handle._nodeEntry.modularA if isFile else -1,
+                        handle.get_id() if isFile else -1,
+                    )
+                )
+                if not isFile:
+                    _add_handles(list(handle.get_handles()), path)
+
+        _add_handles(archive.get_handles(), PurePosixPath())
+        return manifest
+
+    @classmethod
+    def from_json(cls, data: dict) -> "ArchiveManifest":
+        manifest = cls(**{k: v for k, v in data.items() if k != "entries"})
+        manifest.entries = [ArchiveManifestEntry(*entry) for entry in data["entries"]]
+        return manifest
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        # Stored as rows to keep large archives compact
+        data["entries"] = [list(asdict(entry).values()) for entry in self.entries]
+        return data
+
+    def get_root_file_count(self) -> int:
+        return sum(1 for entry in self.entries if len(entry.get_path().parts) == 1)
+
+    def get_directory_count(self) -> int:
+        return 1 + sum(1 for entry in self.entries if entry.is_directory())
+
+
+class ArchiveManifestCache:
+    """
+    Persistent store of `ArchiveManifest`s, one file per archive path
+
+    A manifest is reused while the archive's size and mtime are unchanged.
+    If only the mtime moved, the content hash decides, so touched or copied
+    archives still hit without being parsed again.
+    """
+
+    VERSION = 1
+
+    def __init__(self, cacheFolder: Path):
+        self.cacheFolder = cacheFolder
+
+    def get(self, path: Path) -> Optional[ArchiveManifest]:
+        """
+        Returns the manifest cached for the archive at `path`,
+        or None if there is none or the archive has changed since
+        """
+        try:
+            stat = path.stat()
+            with open(self._get_entry_path(path), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get("version") != self.VERSION or data.get("path") != self._get_key(path):
+            return None
+
+        try:
+            manifest = ArchiveManifest.from_json(data["manifest"])
+        except (KeyError, TypeError):
+            return None
+
+        if manifest.sourceSize != stat.st_size:
+            return None
+
+        if manifest.sourceMTime != stat.st_mtime_ns:
+            if manifest.sourceDigest != self._get_digest(path):
+                return None
+            manifest.sourceMTime = stat.st_mtime_ns
+            self._write_entry(path, manifest)
+
+        return manifest
+
+    def put(self, path: Path, manifest: ArchiveManifest) -> None:
+        """
+        Caches `manifest` for the archive at `path`, stamped with the file's current identity
+        """
+        try:
+            stat = path.stat()
+            manifest.sourceDigest = self._get_digest(path)
+        except OSError:
+            return
+        manifest.sourceSize = stat.st_size
+        manifest.sourceMTime = stat.st_mtime_ns
+        self._write_entry(path, manifest)
+
+    def invalidate(self, path: Path) -> None:
+        try:
+            self._get_entry_path(path).unlink()
+        except OSError:
+            pass
+
+    def _write_entry(self, path: Path, manifest: ArchiveManifest) -> None:
+        data = {
+            "version": self.VERSION,
+            "path": self._get_key(path),
+            "manifest": manifest.to_json(),
+        }
+        try:
+            self.cacheFolder.mkdir(parents=True, exist_ok=True)
+            fd, tmpName = tempfile.mkstemp(dir=self.cacheFolder, suffix=".tmp")
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmpName, self._get_entry_path(path))
+        except OSError:
+            os.remove(tmpName)
+
+    def _get_entry_path(self, path: Path) -> Path:
+        return self.cacheFolder / (
+            hashlib.sha1(self._get_key(path).encode("utf-8")).hexdigest() + ".json"
+        )
+
+    @staticmethod
+    def _get_key(path: Path) -> str:
+        return str(Path(path).resolve())
+
+    @staticmethod
+    def _get_digest(path: Path) -> str:
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            while chunk := f.read(0x100000):
+                digest.update(chunk)
+        return digest.hexdigest()
@@ -0,0 +1,482 @@
+import argparse
+import hashlib
+import mmap
+import os
+import tempfile
+from dataclasses import dataclass, field
+from enum import IntEnum
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterator, Optional, Protocol
+
+from juniors_toolbox.utils import ReadableBuffer, SupportsRead, SupportsWrite, jdrama
+from juniors_toolbox.utils.iohelper import (
+    read_ubyte,
+    read_uint16,
+    read_uint32,
+    write_ubyte,
+    write_uint16,
+    write_uint32,
+)
+from juniors_toolbox.utils.rarc import (
+    InternalDirectoryEntry,
+    ResourceArchive,
+    ResourceAttribute,
+    ResourceHandle,
+)
+from juniors_toolbox.utils.yaz0 import compress_yaz0, decompress_yaz0, is_yaz0_compressed
+
+PATCH_MAGIC = b"RPCH"
+PATCH_VERSION = 1
+
+
+class PatchEntryKind(IntEnum):
+    DIRECTORY = 0
+    BASE_FILE = 1  # Payload of a file in the base archive
+    PATCH_FILE = 2  # Payload shipped in the patch
+
+
+class PatchEntryStatus(IntEnum):
+    UNCHANGED = 0
+    ADDED = 1
+    CHANGED = 2
+
+
+class _PatchSource(SupportsRead, Protocol):
+    def tell(self) -> int: ...
+
+
+@dataclass
+class ArchivePatchEntry:
+    # Index of the parent directory entry, or -1 for the root
+    parent: int
+    name: str
+    kind: PatchEntryKind
+    status: PatchEntryStatus
+    flags: int
+    # File ID of a file, magic of a directory
+    fileID: int = 0xFFFF
+    magic: str = ""
+    # Base file index or patch payload index, see `kind`
+    ref: int = -1
+
+
+@dataclass
+class ArchivePatch:
+    """
+    Difference between two archives
+
+    The target's tree is listed in full, since it is small, while payloads
+    are either referenced from the base archive by content or shipped in
+    the patch. Only added and changed payloads take up space.
+    """
+    baseDigest: bytes
+    targetDigest: bytes
+    rootName: str
+    rootMagic: str
+    syncIDs: bool
+    targetYaz0: bool
+    entries: list[ArchivePatchEntry] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    payloads: list[ReadableBuffer] = field(default_factory=list)
+
+    def get_added(self) -> list[PurePosixPath]:
+        return self._get_paths(PatchEntryStatus.ADDED)
+
+    def get_changed(self) -> list[PurePosixPath]:
+        return self._get_paths(PatchEntryStatus.CHANGED)
+
+    def get_removed(self) -> list[PurePosixPath]:
+        return [PurePosixPath(path) for path in self.removed]
+
+    def get_payload_size(self) -> int:
+        return sum(len(payload) for payload in self.payloads)
+
+    def _get_paths(self, status: PatchEntryStatus) -> list[PurePosixPath]:
+        paths: list[PurePosixPath] = []
+        for entry in self.entries:
+            parentPath = PurePosixPath() if entry.parent == -1 else paths[entry.parent]
+            paths.append(parentPath / entry.name)
+        return [
+            path for path, entry in zip(paths, self.entries) if entry.status == status
+        ]
+
+    def save(self, stream: BinaryIO) -> None:
+        stream.write(PATCH_MAGIC)
+        write_uint16(stream, PATCH_VERSION)
+        write_uint16(stream, (self.syncIDs << 0) | (self.targetYaz0 << 1))
+        stream.write(self.baseDigest)
+        stream.write(self.targetDigest)
+        _write_name(stream, self.rootName)
+        stream.write(self.rootMagic.encode("ascii"))
+
+        write_uint32(stream, len(self.entries))
+        for entry in self.entries:
+            write_uint32(stream, entry.parent & 0xFFFFFFFF)
+            _write_name(stream, entry.name)
+            write_ubyte(stream, (entry.kind << 4) | entry.status)
+            write_ubyte(stream, entry.flags)
+            if entry.kind == PatchEntryKind.DIRECTORY:
+                stream.write(entry.magic.encode("ascii"))
+            else:
+                write_uint16(stream, entry.fileID)
+                write_uint32(stream, entry.ref)
+
+        write_uint32(stream, len(self.removed))
+        for path in self.removed:
+            _write_name(stream, path)
+
+        write_uint32(stream, len(self.payloads))
+        for payload in self.payloads:
+            write_uint32(stream, len(payload))
+        for payload in self.payloads:
+            stream.write(payload)
+
+    @classmethod
+    def load(cls, stream: _PatchSource, buffer: Optional[memoryview] = None) -> "ArchivePatch":
+        """
+        Parses a patch from the start of `stream`
+
+        :param stream: Stream to parse
+        :param buffer: Contents of `stream`, payloads are returned as views into it if given
+        :return: The patch
+        """
+        if stream.read(4) != PATCH_MAGIC:
+            raise ValueError("Not an archive patch")
+        version = read_uint16(stream)
+        if version != PATCH_VERSION:
+            raise ValueError(f"Unsupported archive patch version {version}")
+
+        flags = read_uint16(stream)
+        baseDigest = stream.read(20)
+        targetDigest = stream.read(20)
+        rootName = _read_name(stream)
+        rootMagic = stream.read(4).decode("ascii")
+        patch = cls(
+            baseDigest, targetDigest, rootName, rootMagic, bool(flags & 1), bool(flags & 2)
+        )
+
+        for _ in range(read_uint32(stream)):
+            parent = read_uint32(stream)
+            name = _read_name(stream)
+            kindAndStatus = read_ubyte(stream)
+            entry = ArchivePatchEntry(
+                -1 if parent == 0xFFFFFFFF else parent,
+                name,
+                PatchEntryKind(kindAndStatus >> 4),
+                PatchEntryStatus(kindAndStatus & 0xF),
+                read_ubyte(stream),
+            )
+            if entry.kind == PatchEntryKind.DIRECTORY:
+                entry.magic = stream.read(4).decode("ascii")
+            else:
+                entry.fileID = read_uint16(stream)
+                entry.ref = read_uint32(stream)
+            patch.entries.append(entry)
+
+        for _ in range(read_uint32(stream)):
+            patch.removed.append(_read_name(stream))
+
+        sizes = [read_uint32(stream) for _ in range(read_uint32(stream))]
+        offset = stream.tell()
+        for size in sizes:
+            if buffer is None:
+                patch.payloads.append(stream.read(size))
+            else:
+                patch.payloads.append(buffer[offset : offset + size])
+            offset += size
+
+        return patch
+
+
+def load_archive_source(path: Path) -> tuple[ResourceArchive, bytes, bool]:
+    """
+    Loads an archive, decompressing it first if it is Yaz0 compressed
+
+    :param path: Archive to load
+    :return: The archive, the SHA-1 of its uncompressed form, and whether it was compressed
+    """
+    with open(path, "rb") as f:
+        isYaz0 = is_yaz0_compressed(f.read(4))
+        f.seek(0)
+        if isYaz0:
+            data = decompress_yaz0(f)
+            digest = hashlib.sha1(data.getbuffer()).digest()
+            archive = ResourceArchive.from_bytes(data, lazy=True)
+        else:
+            sha1 = hashlib.sha1()
+            while chunk := f.read(0x100000):
+                sha1.update(chunk)
+            digest = sha1.digest()
+            archive = None
+
+    if not isYaz0:
+        archive = ResourceArchive.from_file(path)
+    if archive is None:
+        raise ValueError(f"{path} is not an archive")
+    return archive, digest, isYaz0
+
+
+def diff_archives(
+    base: ResourceArchive, baseDigest: bytes, target: ResourceArchive, targetYaz0: bool = False
+) -> ArchivePatch:
+    """
+    Compares two archives node by node by content hash
+
+    :param base: Archive the patch applies to
+    :param baseDigest: SHA-1 of the base's uncompressed form, see `load_archive_source`
+    :param target: Archive the patch rebuilds
+    :param targetYaz0: Whether the rebuilt archive should be Yaz0 compressed
+    :return: The patch
+    """
+    baseFiles: dict[bytes, int] = {}
+    basePaths: dict[PurePosixPath, bytes] = {}
+    for i, (path, handle) in enumerate(_iter_files(base)):
+        digest = hashlib.sha1(handle.get_view()).digest()
+        baseFiles.setdefault(digest, i)
+        basePaths[path] = digest
+
+    rootMagic = target.rootInfo.magic
+    patch = ArchivePatch(
+        baseDigest,
+        _get_digest(target),
+        target.get_name(),
+        rootMagic if isinstance(rootMagic, str) else rootMagic.decode("ascii"),
+        target.sync_ids(),
+        targetYaz0,
+    )
+
+    payloadIndexes: dict[bytes, int] = {}
+    targetPaths: set[PurePosixPath] = set()
+
+    def _add_handles(handles: list[ResourceHandle], parent: int, parentPath: PurePosixPath) -> None:
+        for handle in handles:
+            path = parentPath / handle.get_name()
+            targetPaths.add(path)
+            entry = ArchivePatchEntry(
+                parent,
+                handle.get_name(),
+                PatchEntryKind.DIRECTORY,
+                PatchEntryStatus.UNCHANGED,
+                int(handle.get_flags()),
+            )
+            patch.entries.append(entry)
+
+            if handle.is_directory():
+                entry.magic = handle.get_magic()
+                if not _base_has_directory(base, path):
+                    entry.status = PatchEntryStatus.ADDED
+                _add_handles(list(handle.get_handles()), len(patch.entries) - 1, path)
+                continue
+
+            entry.fileID = handle.get_id()
+            data = handle.get_view()
+            digest = hashlib.sha1(data).digest()
+            if digest in baseFiles:
+                entry.kind = PatchEntryKind.BASE_FILE
+                entry.ref = baseFiles[digest]
+            else:
+                entry.kind = PatchEntryKind.PATCH_FILE
+                if digest not in payloadIndexes:
+                    payloadIndexes[digest] = len(patch.payloads)
+                    patch.payloads.append(data)
+                entry.ref = payloadIndexes[digest]
+
+            if path not in basePaths:
+                entry.status = PatchEntryStatus.ADDED
+            elif basePaths[path] != digest:
+                entry.status = PatchEntryStatus.CHANGED
+
+    _add_handles(target.get_handles(), -1, PurePosixPath())
+
+    patch.removed = [
+        path.as_posix() for path in basePaths if path not in targetPaths
+    ]
+    return patch
+
+
+def apply_patch(base: ResourceArchive, baseDigest: bytes, patch: ArchivePatch) -> ResourceArchive:
+    """
+    Builds the patch's target archive
+
+    Files view their payloads in the base archive or the patch, so nothing
+    is copied until the result is saved.
+
+    :param base: Archive the patch was made against
+    :param baseDigest: SHA-1 of the base's uncompressed form, see `load_archive_source`
+    :param patch: Patch to apply
+    :return: The target archive
+    """
+    if baseDigest != patch.baseDigest:
+        raise ValueError("The patch was made for a different archive")
+
+    baseFiles = [handle.get_view() for _, handle in _iter_files(base)]
+
+    rootInfo = InternalDirectoryEntry(
+        magic=patch.rootMagic,
+        nameOffset=-1,
+        nameHash=jdrama.get_key_code(patch.rootName),
+        fileCount=0,
+        firstFileOffset=-1,
+        name=patch.rootName,
+    )
+    target = ResourceArchive(rootInfo, patch.syncIDs)
+
+    handles: list[ResourceHandle | None] = []
+    for entry in patch.entries:
+        parent = target._get_root_handle() if entry.parent == -1 else handles[entry.parent]
+        if parent is None:
+            raise ValueError(f"Malformed patch, {entry.name} has no parent")
+
+        if entry.kind == PatchEntryKind.DIRECTORY:
+            handle = parent.new_directory(entry.name, ResourceAttribute(entry.flags))
+            if handle is not None:
+                handle.set_magic(entry.magic)
+        else:
+            if entry.kind == PatchEntryKind.BASE_FILE:
+                data = baseFiles[entry.ref]
+            else:
+                data = memoryview(patch.payloads[entry.ref])
+            handle = parent.new_file(
+                entry.name, data, ResourceAttribute(entry.flags), entry.fileID
+            )
+        handles.append(handle)
+
+    return target
+
+
+def diff_archive_files(basePath: Path, targetPath: Path, patchPath: Path) -> ArchivePatch:
+    """
+    Writes a patch that turns the archive at `basePath` into the one at `targetPath`
+
+    Yaz0 compressed archives are compared in their decompressed form.
+    """
+    base, baseDigest, _ = load_archive_source(basePath)
+    target, _, targetYaz0 = load_archive_source(targetPath)
+
+    patch = diff_archives(base, baseDigest, target, targetYaz0)
+    with open(patchPath, "wb") as f:
+        patch.save(f)
+    return patch
+
+
+def apply_patch_file(basePath: Path, patchPath: Path, destPath: Path) -> None:
+    """
+    Applies the patch at `patchPath` to the archive at `basePath`, writing the result to `destPath`
+
+    The result is streamed out and checked against the patch before it
+    replaces `destPath`.
+    """
+    base, baseDigest, _ = load_archive_source(basePath)
+
+    with open(patchPath, "rb") as f:
+        patchMap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        patch = ArchivePatch.load(patchMap, memoryview(patchMap))
+        target = apply_patch(base, baseDigest, patch)
+
+        fd, tempPath = tempfile.mkstemp(
+            prefix=f".{destPath.name}.", suffix=".tmp", dir=destPath.parent
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if patch.targetYaz0:
+                    stream = BytesIO()
+                    target.save_to(stream)
+                    digest = hashlib.sha1(stream.getbuffer()).digest()
+                    stream.seek(0)
+                    f.write(compress_yaz0(stream).getbuffer())
+                else:
+                    writer = _DigestWriter(f)
+                    target.save_to(writer)
+                    digest = writer.digest.digest()
+
+            if digest != patch.targetDigest:
+                raise ValueError("The patched archive doesn't match the patch's target")
+            os.replace(tempPath, destPath)
+        except BaseException:
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+            raise
+
+        # Drop the views into the patch so it can be unmapped
+        del target, patch
+    finally:
+        try:
+            patchMap.close()
+        except BufferError:
+            pass
+
+
+class _DigestWriter:
+    def __init__(self, stream: SupportsWrite):
+        self.stream = stream
+        self.digest = hashlib.sha1()
+
+    def write(self, data: ReadableBuffer) -> int:
+        self.digest.update(data)
+        return self.stream.write(data)
+
+
+def _get_digest(archive: ResourceArchive) -> bytes:
+    writer = _DigestWriter(_NullStream())
+    archive.save_to(writer)
+    return writer.digest.digest()
+
+
+class _NullStream:
+    def write(self, data: ReadableBuffer) -> int:
+        return len(data)
+
+
+def _iter_files(archive: ResourceArchive) -> Iterator[tuple[PurePosixPath, ResourceHandle]]:
+    def _walk(handles: list[ResourceHandle], parentPath: PurePosixPath) -> Iterator[tuple[PurePosixPath, ResourceHandle]]:
+        for handle in handles:
+            path = parentPath / handle.get_name()
+            if handle.is_file():
+                yield path, handle
+            else:
+                yield from _walk(list(handle.get_handles()), path)
+
+    yield from _walk(archive.get_handles(), PurePosixPath())
+
+
+def _base_has_directory(base: ResourceArchive, path: PurePosixPath) -> bool:
+    handle = base.get_handle(path)
+    return handle is not None and handle.is_directory()
+
+
+def _write_name(stream: BinaryIO, name: str) -> None:
+    encoded = name.encode("utf-8")
+    write_uint16(stream, len(encoded))
+    stream.write(encoded)
+
+
+def _read_name(stream: SupportsRead) -> str:
+    return stream.read(read_uint16(stream)).decode("utf-8")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='RARC patcher for SMS modding',
+                                     description='Diff two archives into a patch, or apply a patch to an archive',
+                                     allow_abbrev=False)
+
+    subparsers = parser.add_subparsers(dest='mode', required=True)
+    diffParser = subparsers.add_parser('diff', help='create a patch')
+    diffParser.add_argument('base', help='original archive (.arc or .szs)')
+    diffParser.add_argument('target', help='modified archive (.arc or .szs)')
+    diffParser.add_argument('patch', help='patch file to write')
+    applyParser = subparsers.add_parser('apply', help='apply a patch')
+    applyParser.add_argument('base', help='original archive (.arc or .szs)')
+    applyParser.add_argument('patch', help='patch file to apply')
+    applyParser.add_argument('dest', help='archive to write')
+
+    args = parser.parse_args()
+
+    if args.mode == 'diff':
+        patch = diff_archive_files(Path(args.base), Path(args.target), Path(args.patch))
+        print(f"[RARC-PATCH] {len(patch.get_added())} added, {len(patch.get_changed())} changed, "
+              f"{len(patch.get_removed())} removed, {patch.get_payload_size()} payload bytes")
+    else:
+        apply_patch_file(Path(args.base), Path(args.patch), Path(args.dest))
@@ -0,0 +1,286 @@
+import argparse
+import mmap
+import struct
+import sys
+from dataclasses import dataclass, field
+from enum import IntEnum
+from pathlib import Path
+from typing import Iterable, Optional
+
+from juniors_toolbox.utils.rarc import ResourceAttribute
+from juniors_toolbox.utils.yaz0 import decompress_yaz0_file, is_yaz0_compressed
+from juniors_toolbox.utils.yaz0batch import find_archives
+
+_HEADER = struct.Struct(">4s7I")
+_INFO = struct.Struct(">6IHB")
+_DIRECTORY = struct.Struct(">4sIHHI")
+_NODE = struct.Struct(">HHIII4x")
+
+
+class IssueSeverity(IntEnum):
+    WARNING = 0
+    ERROR = 1
+
+
+@dataclass
+class ArchiveIssue:
+    severity: IssueSeverity
+    # Offset in the archive the issue was found at
+    offset: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"{self.severity.name} @ 0x{self.offset:X}: {self.message}"
+
+
+@dataclass
+class ArchiveReport:
+    """
+    Result of validating an archive
+    """
+    path: Optional[Path] = None
+    size: int = 0
+    directoryCount: int = 0
+    nodeCount: int = 0
+    issues: list[ArchiveIssue] = field(default_factory=list)
+
+    def is_valid(self) -> bool:
+        return not any(issue.severity == IssueSeverity.ERROR for issue in self.issues)
+
+    def get_errors(self) -> list[ArchiveIssue]:
+        return [issue for issue in self.issues if issue.severity == IssueSeverity.ERROR]
+
+    def get_warnings(self) -> list[ArchiveIssue]:
+        return [issue for issue in self.issues if issue.severity == IssueSeverity.WARNING]
+
+    def error(self, offset: int, message: str) -> None:
+        self.issues.append(ArchiveIssue(IssueSeverity.ERROR, offset, message))
+
+    def warning(self, offset: int, message: str) -> None:
+        self.issues.append(ArchiveIssue(IssueSeverity.WARNING, offset, message))
+
+
+def validate_archive(buffer: bytes | bytearray | memoryview | mmap.mmap) -> ArchiveReport:
+    """
+    Checks the structure of an archive directly over its raw bytes
+
+    The header, table bounds, string table offsets, directory ranges, name
+    hashes and data extents are checked without building the archive, so
+    malformed archives are reported rather than raised on.
+
+    :param buffer: Uncompressed archive
+    :return: Every issue found
+    """
+    view = memoryview(buffer).cast("B")
+    report = ArchiveReport(size=len(view))
+
+    if len(view) < 0x40:
+        report.error(0, f"File is too small for a header ({len(view)} bytes)")
+        return report
+
+    magic, fileSize, headerSize, dataOffset, dataSize, mramSize, aramSize, dvdSize = _HEADER.unpack_from(view, 0)
+    if magic != b"RARC":
+        report.error(0, f"Invalid identifier {bytes(magic)!r}, expected b'RARC'")
+        return report
+    if fileSize != len(view):
+        report.error(0x4, f"Header size 0x{fileSize:X} doesn't match the file size 0x{len(view):X}")
+    if headerSize != 0x20:
+        report.error(0x8, f"Header length is 0x{headerSize:X}, expected 0x20")
+
+    dataOffset += 0x20
+    dataEnd = dataOffset + dataSize
+    if dataEnd > len(view):
+        report.error(0xC, f"Data section 0x{dataOffset:X}-0x{dataEnd:X} runs past the end of the file")
+    if mramSize + aramSize + dvdSize != dataSize:
+        report.warning(0x14, f"Load sizes add up to 0x{mramSize + aramSize + dvdSize:X}, not the data size 0x{dataSize:X}")
+
+    (
+        directoryCount, directoryTableOffset, nodeCount, nodeTableOffset,
+        stringTableSize, stringTableOffset, nextFreeID, syncIDs
+    ) = _INFO.unpack_from(view, 0x20)
+    report.directoryCount = directoryCount
+    report.nodeCount = nodeCount
+
+    tables = (
+        ("Directory table", 0x24, directoryTableOffset + 0x20, directoryCount * _DIRECTORY.size),
+        ("Node table", 0x2C, nodeTableOffset + 0x20, nodeCount * _NODE.size),
+        ("String table", 0x34, stringTableOffset + 0x20, stringTableSize),
+    )
+    tablesInBounds = True
+    for name, fieldOffset, start, size in tables:
+        if start + size > min(dataOffset, len(view)):
+            report.error(fieldOffset, f"{name} 0x{start:X}-0x{start + size:X} runs into the data section or past the end of the file")
+            tablesInBounds = False
+    for i, (name, _, start, size) in enumerate(tables):
+        for otherName, fieldOffset, otherStart, otherSize in tables[i + 1:]:
+            if start < otherStart + otherSize and otherStart < start + size:
+                report.error(fieldOffset, f"{otherName} overlaps the {name.lower()}")
+                tablesInBounds = False
+    if not tablesInBounds:
+        return report
+
+    if directoryCount == 0:
+        report.error(0x20, "Archive has no root directory")
+        return report
+
+    stringStart = stringTableOffset + 0x20
+    strings = bytes(view[stringStart : stringStart + stringTableSize])
+    names: dict[int, Optional[bytes]] = {}
+
+    def _get_name(nameOffset: int) -> Optional[bytes]:
+        if nameOffset in names:
+            return names[nameOffset]
+        end = strings.find(b"\x00", nameOffset)
+        name = None if nameOffset >= len(strings) or end == -1 else strings[nameOffset:end]
+        names[nameOffset] = name
+        return name
+
+    def _check_name(offset: int, nameOffset: int, nameHash: int) -> Optional[bytes]:
+        name = _get_name(nameOffset)
+        if name is None:
+            report.error(offset, f"Name offset 0x{nameOffset:X} is outside the string table")
+        elif _get_name_hash(name) != nameHash:
+            report.error(offset, f"Name hash 0x{nameHash:04X} of {name!r} should be 0x{_get_name_hash(name):04X}")
+        return name
+
+    # Directories
+    directoryStart = directoryTableOffset + 0x20
+    nodeStart = nodeTableOffset + 0x20
+    claimedBy: list[int] = [-1] * nodeCount
+    for i, (_, nameOffset, nameHash, fileCount, firstNode) in enumerate(
+        _DIRECTORY.iter_unpack(view[directoryStart : directoryStart + directoryCount * _DIRECTORY.size])
+    ):
+        offset = directoryStart + i * _DIRECTORY.size
+        _check_name(offset, nameOffset, nameHash)
+        if firstNode + fileCount > nodeCount:
+            report.error(offset, f"Directory {i} nodes {firstNode}-{firstNode + fileCount} run past the node table ({nodeCount} nodes)")
+            continue
+        for nodeIndex in range(firstNode, firstNode + fileCount):
+            if claimedBy[nodeIndex] != -1:
+                report.error(offset, f"Directory {i} shares node {nodeIndex} with directory {claimedBy[nodeIndex]}")
+                break
+            claimedBy[nodeIndex] = i
+
+    # Nodes
+    dataExtents: dict[int, int] = {}
+    fileIDs: dict[int, int] = {}
+    for i, (fileID, nameHash, flagsAndOffset, modularA, modularB) in enumerate(
+        _NODE.iter_unpack(view[nodeStart : nodeStart + nodeCount * _NODE.size])
+    ):
+        offset = nodeStart + i * _NODE.size
+        flags = flagsAndOffset >> 24
+        nodeName = _check_name(offset, flagsAndOffset & 0xFFFFFF, nameHash)
+        if claimedBy[i] == -1:
+            report.warning(offset, f"Node {i} belongs to no directory")
+
+        isFile = (flags & ResourceAttribute.FILE) != 0
+        isDirectory = (flags & ResourceAttribute.DIRECTORY) != 0
+        if isFile == isDirectory:
+            report.error(offset, f"Node {i} has flags 0x{flags:02X}, it must be exactly one of file or directory")
+            continue
+
+        if isDirectory:
+            if fileID != 0xFFFF:
+                report.warning(offset, f"Directory node {i} has ID 0x{fileID:04X}, expected 0xFFFF")
+            if modularA >= directoryCount and not (nodeName == b".." and modularA == 0xFFFFFFFF):
+                report.error(offset + 0x8, f"Directory node {i} points to directory {modularA} of {directoryCount}")
+            if modularB != 0x10:
+                report.warning(offset + 0xC, f"Directory node {i} has size 0x{modularB:X}, expected 0x10")
+            continue
+
+        start = dataOffset + modularA
+        if start + modularB > dataEnd:
+            report.error(offset + 0x8, f"File {nodeName!r} data 0x{start:X}-0x{start + modularB:X} runs past the data section")
+        elif dataExtents.get(modularA, modularB) != modularB:
+            report.error(offset + 0x8, f"File {nodeName!r} shares data at 0x{start:X} with a file of another size")
+        else:
+            dataExtents[modularA] = modularB
+
+        if syncIDs and fileID != i:
+            report.warning(offset, f"File {nodeName!r} has ID {fileID}, but IDs are synced to node {i}")
+        elif fileID in fileIDs:
+            report.error(offset, f"File {nodeName!r} reuses the ID {fileID} of node {fileIDs[fileID]}")
+        fileIDs.setdefault(fileID, i)
+
+    if not syncIDs and fileIDs and nextFreeID <= max(fileIDs):
+        report.warning(0x38, f"Next free ID {nextFreeID} is already in use")
+
+    # Payloads may be shared, but never partially overlap
+    previousEnd = 0
+    for start in sorted(dataExtents):
+        if start < previousEnd:
+            report.error(dataOffset + start, f"Data at 0x{dataOffset + start:X} overlaps the previous file")
+        previousEnd = max(previousEnd, start + dataExtents[start])
+
+    return report
+
+
+def validate_archive_file(path: Path) -> ArchiveReport:
+    """
+    Validates the archive at `path`, decompressing it first if it is Yaz0 compressed
+    """
+    with open(path, "rb") as f:
+        if is_yaz0_compressed(f.read(4)):
+            try:
+                decompressed = decompress_yaz0_file(path)
+            except (ValueError, IndexError, struct.error) as e:
+                report = ArchiveReport(size=f.seek(0, 2))
+                report.error(0, f"Yaz0 data can't be decompressed: {e}")
+            else:
+                report = validate_archive(decompressed.getbuffer())
+        elif f.seek(0, 2) == 0:
+            report = validate_archive(b"")
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                report = validate_archive(buffer)
+
+    report.path = path
+    return report
+
+
+def validate_archive_tree(root: Path, suffixes: Iterable[str] = (".arc", ".szs")) -> list[ArchiveReport]:
+    """
+    Validates every archive under a folder
+
+    :param root: Folder to search
+    :param suffixes: Archive suffixes to check
+    :return: A report for each archive
+    """
+    return [validate_archive_file(path) for path in find_archives(root, suffixes)]
+
+
+def _get_name_hash(name: bytes) -> int:
+    # Same as `jdrama.get_key_code`, over the stored bytes
+    context = 0
+    for char in name:
+        context = (char + context * 3) & 0xFFFF
+    return context
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='RARC validator for SMS modding',
+                                     description='Check the structure of archives without loading them',
+                                     allow_abbrev=False)
+
+    parser.add_argument('path', help='archive, or folder to search for archives')
+    parser.add_argument('-w', '--warnings',
+                        help='Also print warnings',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    reports = validate_archive_tree(path) if path.is_dir() else [validate_archive_file(path)]
+
+    failed = 0
+    for report in reports:
+        issues = report.issues if args.warnings else report.get_errors()
+        if not report.is_valid():
+            failed += 1
+        if issues:
+            print(f"[RARC-VALIDATE] {report.path}")
+            for issue in issues:
+                print(f"    {issue}")
+
+    print(f"[RARC-VALIDATE] {len(reports) - failed}/{len(reports)} archives valid")
+    sys.exit(1 if failed else 0)
@@ -20,11 +20,17 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import os
+from abc import ABC, abstractmethod
 from pathlib import Path
 
 
 import struct
+from bisect import bisect_left
+from dataclasses import dataclass
+from enum import IntEnum
 from io import BytesIO
+from typing import Iterator
 
 from juniors_toolbox.utils.iohelper import *
 
@@ -34,6 +40,59 @@ try:
 except ImportError:
     PY_FAST_YAZ0_INSTALLED = False
 
+try:
+    import oead
+    OEAD_INSTALLED = True
+except ImportError:
+    OEAD_INSTALLED = False
+
+
+class Yaz0Strategy(IntEnum):
+    GREEDY = 0  # Always take the longest match
+    LAZY = 1  # Put a match off by a byte if the next byte has a much longer one
+    OPTIMAL = 2  # Pick the codes that minimise the encoded size
+
+
+@dataclass(frozen=True)
+class Yaz0Level:
+    searchDepth: int
+    strategy: Yaz0Strategy
+
+
+# Compression levels for `compress_yaz0`, from fastest to smallest.
+# The search depth sets the ratio far more than the strategy does.
+#
+# Measured with the pure Python backend on a 339 KiB stage archive (k.arc)
+# and a 256 KiB synthetic RARC from `yaz0bench`:
+#
+#   Level  Depth   Strategy   Stage archive    Synthetic RARC
+#   0      0       greedy     0.53s  1.125     0.41s  1.125   (nothing is matched)
+#   1      0x100   greedy     0.73s  0.556     0.71s  0.651
+#   2      0x100   lazy       1.11s  0.554     0.78s  0.649
+#   3      0x400   greedy     0.69s  0.456     0.63s  0.570
+#   4      0x400   lazy       1.30s  0.453     0.98s  0.569
+#   5      0x800   greedy     0.83s  0.358     0.59s  0.553
+#   6      0x800   lazy       1.05s  0.355     0.78s  0.551
+#   7      0x1000  greedy     0.39s  0.145     0.60s  0.537
+#   8      0x1000  lazy       0.49s  0.142     0.79s  0.535   (Nintendo's algorithm, the default)
+#   9      0x1000  optimal    9.08s  0.141     4.92s  0.533
+#
+# Native backends can't follow every strategy, so they map each level to
+# their closest settings instead (see `A_Yaz0Backend.compress_level`).
+YAZ0_LEVELS: tuple[Yaz0Level, ...] = (
+    Yaz0Level(0, Yaz0Strategy.GREEDY),
+    Yaz0Level(0x100, Yaz0Strategy.GREEDY),
+    Yaz0Level(0x100, Yaz0Strategy.LAZY),
+    Yaz0Level(0x400, Yaz0Strategy.GREEDY),
+    Yaz0Level(0x400, Yaz0Strategy.LAZY),
+    Yaz0Level(0x800, Yaz0Strategy.GREEDY),
+    Yaz0Level(0x800, Yaz0Strategy.LAZY),
+    Yaz0Level(0x1000, Yaz0Strategy.GREEDY),
+    Yaz0Level(0x1000, Yaz0Strategy.LAZY),
+    Yaz0Level(0x1000, Yaz0Strategy.OPTIMAL),
+)
+DEFAULT_YAZ0_LEVEL = 8
+
 
 class Yaz0:
     MAX_RUN_LENGTH = 0xFF + 0x12
@@ -44,7 +103,7 @@ class Yaz0:
 
     # Variables to hold the reserved next match across loops.
     next_num_bytes = 0
-    next_match_pos = 0
+    next_match_pos: Optional[int] = None
     next_flag = False
 
     @staticmethod
@@ -60,40 +119,101 @@ class Yaz0:
             print("File is not compressed.")
             return comp_data
 
-        if PY_FAST_YAZ0_INSTALLED:
-            comp_data.seek(-4, 1)
-            uncomp_data = comp_data.read()
-            uncomp_data = pyfastyaz0.decompress(uncomp_data)
-            uncomp_data = BytesIO(uncomp_data)
-            return uncomp_data
+        comp_data.seek(-4, 1)
+        comp = comp_data.read()
+        return BytesIO(get_yaz0_backend().decompress(comp))
 
-        uncomp_size = read_uint32(comp_data)
+    @staticmethod
+    def decompress_python(comp: bytes) -> bytes:
+        uncomp_size = Yaz0.get_decompressed_size(comp)
+
+        # Size the output from the header and decode straight into its buffer
+        uncomp_data = BytesIO()
+        if uncomp_size > 0:
+            uncomp_data.seek(uncomp_size - 1)
+            uncomp_data.write(b"\0")
+            uncomp_data.seek(0)
+
+            with uncomp_data.getbuffer() as output:
+                Yaz0._decode_into(comp, output, 0x10, 0, uncomp_size)
+
+        return uncomp_data.getvalue()
+
+    @staticmethod
+    def iter_decompress(comp_data: BinaryIO, chunk_size: int = 0x10000) -> Iterator[memoryview]:
+        """
+        Decompresses YAZ0 compressed data, yielding the output as it is decoded.
+
+        Each chunk is a read-only view of roughly `chunk_size` bytes that stays valid
+        after the generator moves on.
+        """
+        if not Yaz0.check_is_compressed(comp_data):
+            raise ValueError("Data is not YAZ0 compressed")
 
         comp_data.seek(-4, 1)
         comp = comp_data.read()
+        uncomp_size = Yaz0.get_decompressed_size(comp)
 
-        output = []
-        output_len = 0
+        output = bytearray(uncomp_size)
+        view = memoryview(output)
         src_offset = 0x10
-        valid_bit_count = 0
-        curr_code_byte = 0
-        while output_len < uncomp_size:
-            if valid_bit_count == 0:
-                curr_code_byte = comp[src_offset]
-                src_offset += 1
-                valid_bit_count = 8
-
-            if curr_code_byte & 0x80 != 0:
-                output.append(comp[src_offset])
-                src_offset += 1
-                output_len += 1
-            else:
+        dst_offset = 0
+        while dst_offset < uncomp_size:
+            chunk_start = dst_offset
+            src_offset, dst_offset = Yaz0._decode_into(
+                comp, view, src_offset, dst_offset, dst_offset + chunk_size)
+            yield view[chunk_start:dst_offset].toreadonly()
+
+    @staticmethod
+    def get_decompressed_size(comp: bytes) -> int:
+        return struct.unpack_from(">I", comp, 4)[0]
+
+    @staticmethod
+    def _decode_into(comp: bytes | bytearray, output: bytearray | memoryview, src_offset: int, dst_offset: int, dst_end: int) -> tuple[int, int]:
+        """
+        Decodes whole code groups of `comp` into `output` until at least `dst_end`
+        bytes of output exist, returning the new source and output offsets.
+
+        Stopping between code groups means the returned offsets are all that is
+        needed to resume decoding later.
+        """
+        output_len = len(output)
+        comp_len = len(comp)
+        if dst_end > output_len:
+            dst_end = output_len
+
+        while dst_offset < dst_end:
+            curr_code_byte = comp[src_offset]
+            src_offset += 1
+
+            if curr_code_byte == 0xFF and dst_offset + 8 <= output_len and src_offset + 8 <= comp_len:
+                # Eight bytes copied directly, move them all at once.
+                # Truncated input falls through to the byte loop, which raises on it
+                output[dst_offset:dst_offset+8] = comp[src_offset:src_offset+8]
+                src_offset += 8
+                dst_offset += 8
+                continue
+
+            for bit in (0x80, 0x40, 0x20, 0x10, 0x08, 0x04, 0x02, 0x01):
+                if dst_offset >= output_len:
+                    break
+
+                if curr_code_byte & bit != 0:
+                    output[dst_offset] = comp[src_offset]
+                    src_offset += 1
+                    dst_offset += 1
+                    continue
+
                 byte1 = comp[src_offset]
                 byte2 = comp[src_offset+1]
                 src_offset += 2
 
-                dist = ((byte1 & 0xF) << 8) | byte2
-                copy_src_offset = output_len - (dist + 1)
+                dist = (((byte1 & 0xF) << 8) | byte2) + 1
+                copy_src_offset = dst_offset - dist
+                if copy_src_offset < 0:
+                    raise ValueError(
+                        f"Back-reference at output offset 0x{dst_offset:X} points before the start of the data")
+
                 num_bytes = (byte1 >> 4)
                 if num_bytes == 0:
                     num_bytes = comp[src_offset] + 0x12
@@ -101,126 +221,199 @@ class Yaz0:
                 else:
                     num_bytes += 2
 
-                for i in range(0, num_bytes):
-                    output.append(output[copy_src_offset])
-                    output_len += 1
-                    copy_src_offset += 1
+                if num_bytes > output_len - dst_offset:
+                    num_bytes = output_len - dst_offset
 
-            curr_code_byte = (curr_code_byte << 1)
-            valid_bit_count -= 1
+                if num_bytes <= dist:
+                    output[dst_offset:dst_offset+num_bytes] = output[copy_src_offset:copy_src_offset+num_bytes]
+                else:
+                    # The copy reads bytes it is producing, so the output repeats every `dist` bytes.
+                    # Copy one period, then keep doubling what has been copied so far.
+                    output[dst_offset:dst_offset+dist] = output[copy_src_offset:dst_offset]
+                    copied = dist
+                    while copied < num_bytes:
+                        size = min(copied, num_bytes - copied)
+                        output[dst_offset+copied:dst_offset+copied+size] = output[dst_offset:dst_offset+size]
+                        copied += size
+
+                dst_offset += num_bytes
 
-        uncomp_data = struct.pack("B"*output_len, *output)
+        return (src_offset, dst_offset)
 
-        return BytesIO(uncomp_data)
+    @staticmethod
+    def compress(uncomp_data: BinaryIO, search_depth=DEFAULT_SEARCH_DEPTH, should_pad_data=False, strategy=Yaz0Strategy.LAZY) -> BytesIO:
+        backend = get_yaz0_backend(search_depth=search_depth, strategy=strategy)
+        comp_data = backend.compress(uncomp_data.read(), search_depth, strategy)
+        if should_pad_data:
+            if (len(comp_data) % 0x20) != 0:
+                comp_data += b'\0' * (0x20 - (len(comp_data) % 0x20))
+        return BytesIO(comp_data)
 
     @staticmethod
-    def compress(uncomp_data: BinaryIO, search_depth=DEFAULT_SEARCH_DEPTH, should_pad_data=False):
-        if PY_FAST_YAZ0_INSTALLED:
-            comp_data = pyfastyaz0.compress(uncomp_data.read(), search_depth)
-            if should_pad_data:
-                if (len(comp_data) % 0x20) != 0:
-                    comp_data += b'\0' * (0x20 - (len(comp_data) % 0x20))
-            return BytesIO(comp_data)
+    def compress_level(uncomp_data: BinaryIO, level: int = DEFAULT_YAZ0_LEVEL, should_pad_data=False) -> BytesIO:
+        backend = get_yaz0_backend(level=level)
+        comp_data = backend.compress_level(uncomp_data.read(), level)
+        if should_pad_data:
+            if (len(comp_data) % 0x20) != 0:
+                comp_data += b'\0' * (0x20 - (len(comp_data) % 0x20))
+        return BytesIO(comp_data)
 
+    @staticmethod
+    def compress_python(uncomp: bytes, search_depth=DEFAULT_SEARCH_DEPTH, strategy=Yaz0Strategy.LAZY) -> bytes:
         comp_data = BytesIO()
         comp_data.write(b"Yaz0")
 
-        _oldPos = uncomp_data.tell()
-        uncomp_data.seek(0, 2)
-        uncomp_size = uncomp_data.tell()
-        uncomp_data.seek(_oldPos, 0)
-
+        uncomp_size = len(uncomp)
         write_uint32(comp_data, uncomp_size)
 
         write_uint32(comp_data, 0)
         write_uint32(comp_data, 0)
 
-        Yaz0.next_num_bytes = 0
-        Yaz0.next_match_pos = None
-        Yaz0.next_flag = False
+        match_finder = Yaz0HashChain(uncomp, search_depth=search_depth)
+        if strategy == Yaz0Strategy.OPTIMAL:
+            tokens = Yaz0.parse_optimal(uncomp, match_finder)
+        else:
+            tokens = Yaz0.parse_incremental(
+                uncomp, match_finder, lazy=strategy == Yaz0Strategy.LAZY)
 
-        uncomp_offset = 0
-        uncomp = uncomp_data.read()
-        comp_offset = 0x10
-        dst = []
+        dst = bytearray()
         valid_bit_count = 0
         curr_code_byte = 0
-        while uncomp_offset < uncomp_size:
-            num_bytes, match_pos = Yaz0.get_num_bytes_and_match_pos(
-                uncomp, uncomp_offset, search_depth=search_depth)
-
+        for uncomp_offset, num_bytes, match_pos in tokens:
             if num_bytes < 3:
                 # Copy the byte directly
                 dst.append(uncomp[uncomp_offset])
-                uncomp_offset += 1
 
                 curr_code_byte |= (0x80 >> valid_bit_count)
             else:
+                assert match_pos is not None
                 dist = (uncomp_offset - match_pos - 1)
 
                 if num_bytes >= 0x12:
                     dst.append((dist & 0xFF00) >> 8)
                     dst.append((dist & 0x00FF))
-
-                    if num_bytes > Yaz0.MAX_RUN_LENGTH:
-                        num_bytes = Yaz0.MAX_RUN_LENGTH
                     dst.append(num_bytes - 0x12)
                 else:
                     byte = (((num_bytes - 2) << 4) | (dist >> 8) & 0x0F)
                     dst.append(byte)
                     dst.append(dist & 0xFF)
 
-                uncomp_offset += num_bytes
-
             valid_bit_count += 1
 
             if valid_bit_count == 8:
                 # Finished 8 codes, so write this block
                 write_ubyte(comp_data, curr_code_byte)
-
-                for byte in dst:
-                    write_ubyte(comp_data, byte)
+                comp_data.write(dst)
 
                 curr_code_byte = 0
                 valid_bit_count = 0
-                dst = []
+                dst.clear()
 
         if valid_bit_count > 0:
             # Still some codes leftover that weren't written yet, so write them now.
             write_ubyte(comp_data, curr_code_byte)
-            comp_offset += 1
-
-            for byte in dst:
-                write_ubyte(comp_data, byte)
-                comp_offset += 1
+            comp_data.write(dst)
         else:
             # If there are no codes leftover to be written, we instead write a single zero at the end for some reason.
             # I don't think it's necessary in practice, but we do it for maximum accuracy with the original algorithm.
             write_ubyte(comp_data, 0)
-            comp_offset += 1
 
-        if should_pad_data:
-            if (len(comp_data) % 0x20) != 0:
-                comp_data += b'\0' * (0x20 - (len(comp_data) % 0x20))
+        return comp_data.getvalue()
 
-        return comp_data
+    @staticmethod
+    def parse_incremental(uncomp: bytes, match_finder: "Yaz0HashChain", lazy: bool = True) -> Iterator[tuple[int, int, Optional[int]]]:
+        """
+        Yields (offset, num_bytes, match_pos) codes, taking the longest match at each
+        position. With `lazy`, a match is put off by a byte when the next byte has a
+        much better one.
+        """
+        Yaz0.next_num_bytes = 0
+        Yaz0.next_match_pos = None
+        Yaz0.next_flag = False
+
+        uncomp_offset = 0
+        uncomp_size = len(uncomp)
+        while uncomp_offset < uncomp_size:
+            num_bytes, match_pos = Yaz0.get_num_bytes_and_match_pos(
+                uncomp, uncomp_offset, search_depth=match_finder.search_depth, match_finder=match_finder, lazy=lazy)
+
+            if num_bytes < 3:
+                yield (uncomp_offset, 1, None)
+                uncomp_offset += 1
+            else:
+                if num_bytes > Yaz0.MAX_RUN_LENGTH:
+                    num_bytes = Yaz0.MAX_RUN_LENGTH
+                yield (uncomp_offset, num_bytes, match_pos)
+                uncomp_offset += num_bytes
 
     @staticmethod
-    def get_num_bytes_and_match_pos(uncomp, uncomp_offset, search_depth=DEFAULT_SEARCH_DEPTH):
+    def parse_optimal(uncomp: bytes, match_finder: "Yaz0HashChain") -> Iterator[tuple[int, int, Optional[int]]]:
+        """
+        Yields (offset, num_bytes, match_pos) codes chosen to minimise the encoded size.
+
+        Any length up to the longest match at a position is also a valid match, so
+        the parse is worked out backwards from the end of the data: each position
+        keeps whichever of a literal or a truncated match leaves the fewest bits to
+        encode. Codes cost 9 bits for a literal, 17 for a short match and 25 for a
+        long one.
+        """
+        uncomp_size = len(uncomp)
+        match_lengths = [0] * uncomp_size
+        match_positions: list[Optional[int]] = [None] * uncomp_size
+        for uncomp_offset in range(uncomp_size):
+            match_lengths[uncomp_offset], match_positions[uncomp_offset] = match_finder.find_match(uncomp_offset)
+
+        costs = [0] * (uncomp_size + 1)
+        choices = [1] * uncomp_size
+        for uncomp_offset in range(uncomp_size - 1, -1, -1):
+            best_cost = costs[uncomp_offset + 1] + 9
+            best_length = 1
+
+            max_length = match_lengths[uncomp_offset]
+            if max_length >= 3:
+                for length in range(3, min(max_length, 0x11) + 1):
+                    cost = costs[uncomp_offset + length] + 17
+                    if cost < best_cost:
+                        best_cost = cost
+                        best_length = length
+                for length in range(0x12, max_length + 1):
+                    cost = costs[uncomp_offset + length] + 25
+                    if cost < best_cost:
+                        best_cost = cost
+                        best_length = length
+
+            costs[uncomp_offset] = best_cost
+            choices[uncomp_offset] = best_length
+
+        uncomp_offset = 0
+        while uncomp_offset < uncomp_size:
+            num_bytes = choices[uncomp_offset]
+            if num_bytes < 3:
+                yield (uncomp_offset, 1, None)
+            else:
+                yield (uncomp_offset, num_bytes, match_positions[uncomp_offset])
+            uncomp_offset += num_bytes
+
+    @staticmethod
+    def get_num_bytes_and_match_pos(uncomp, uncomp_offset, search_depth=DEFAULT_SEARCH_DEPTH, match_finder=None, lazy=True):
         num_bytes = 1
 
         if Yaz0.next_flag:
             Yaz0.next_flag = False
             return (Yaz0.next_num_bytes, Yaz0.next_match_pos)
 
+        if match_finder is None:
+            def find_match(offset): return Yaz0.simple_rle_encode(
+                uncomp, offset, search_depth=search_depth)
+        else:
+            find_match = match_finder.find_match
+
         Yaz0.next_flag = False
-        num_bytes, match_pos = Yaz0.simple_rle_encode(
-            uncomp, uncomp_offset, search_depth=search_depth)
+        num_bytes, match_pos = find_match(uncomp_offset)
 
-        if num_bytes >= 3:
+        if lazy and num_bytes >= 3:
             # Check if the next byte has a match that would compress better than the current byte.
-            Yaz0.next_num_bytes, Yaz0.next_match_pos = Yaz0.simple_rle_encode(
-                uncomp, uncomp_offset+1, search_depth=search_depth)
+            Yaz0.next_num_bytes, Yaz0.next_match_pos = find_match(uncomp_offset+1)
 
             if Yaz0.next_num_bytes >= num_bytes+2:
                 # If it does, then only copy one byte for this match and reserve the next match for later so we save more space.
@@ -255,7 +448,391 @@ class Yaz0:
         return (num_bytes, match_pos)
 
 
-def decompress_yaz0(data: BytesIO) -> BytesIO:
+class Yaz0HashChain:
+    """
+    Match finder that indexes every 3 byte sequence of the input by position.
+
+    A search only visits the earlier positions that start with the same 3 bytes
+    as the data being matched, instead of every position in the search window.
+    The match returned is the one `Yaz0.simple_rle_encode` would find: the longest
+    one, with ties going to the earliest position. Matches shorter than 3 bytes are
+    never returned, as the compressor would copy those bytes directly anyway.
+    """
+
+    MIN_MATCH_LENGTH = 3
+
+    def __init__(self, uncomp: bytes, search_depth: int = Yaz0.DEFAULT_SEARCH_DEPTH):
+        self.uncomp = uncomp
+        self.search_depth = search_depth
+
+        # Maps each 3 byte sequence to the ascending positions it occurs at
+        self._chains: dict[int, list[int]] = {}
+        self._indexed_to = 0
+        self._rolling_key = 0
+
+    def find_match(self, uncomp_offset: int) -> tuple[int, Optional[int]]:
+        uncomp = self.uncomp
+
+        max_num_bytes_to_check = len(uncomp) - uncomp_offset
+        if max_num_bytes_to_check > Yaz0.MAX_RUN_LENGTH:
+            max_num_bytes_to_check = Yaz0.MAX_RUN_LENGTH
+        if max_num_bytes_to_check < Yaz0HashChain.MIN_MATCH_LENGTH or self.search_depth <= 0:
+            return (0, None)
+
+        self._index_to(uncomp_offset)
+
+        key = (uncomp[uncomp_offset] << 16) | (
+            uncomp[uncomp_offset+1] << 8) | uncomp[uncomp_offset+2]
+        chain = self._chains.get(key)
+        if chain is None:
+            return (0, None)
+
+        start_offset = uncomp_offset - self.search_depth
+        if start_offset < 0:
+            start_offset = 0
+
+        num_bytes = 0
+        match_pos = None
+        for i in range(bisect_left(chain, start_offset), len(chain)):
+            possible_match_pos = chain[i]
+            if possible_match_pos >= uncomp_offset:
+                break
+
+            # A candidate can only win if it also matches the byte the current best stops at
+            if num_bytes > 0 and uncomp[possible_match_pos + num_bytes] != uncomp[uncomp_offset + num_bytes]:
+                continue
+
+            num_bytes_matched = self._get_match_length(
+                possible_match_pos, uncomp_offset, max_num_bytes_to_check)
+            if num_bytes_matched > num_bytes:
+                num_bytes = num_bytes_matched
+                match_pos = possible_match_pos
+                if num_bytes == max_num_bytes_to_check:
+                    break
+
+        return (num_bytes, match_pos)
+
+    def _index_to(self, uncomp_offset: int) -> None:
+        uncomp = self.uncomp
+        chains = self._chains
+
+        end_offset = min(uncomp_offset, len(uncomp) - 2)
+        pos = self._indexed_to
+        if pos >= end_offset:
+            return
+
+        key = self._rolling_key
+        if pos == 0:
+            key = uncomp[0] << 8 | uncomp[1]
+        for pos in range(pos, end_offset):
+            key = ((key << 8) | uncomp[pos+2]) & 0xFFFFFF
+            chain = chains.get(key)
+            if chain is None:
+                chains[key] = [pos]
+            else:
+                chain.append(pos)
+
+        self._rolling_key = key
+        self._indexed_to = end_offset
+
+    def _get_match_length(self, match_pos: int, uncomp_offset: int, max_length: int) -> int:
+        uncomp = self.uncomp
+        if uncomp[match_pos:match_pos+max_length] == uncomp[uncomp_offset:uncomp_offset+max_length]:
+            return max_length
+
+        # Binary search for the mismatch, the first 3 bytes are known to match
+        matched = Yaz0HashChain.MIN_MATCH_LENGTH
+        mismatched = max_length
+        while mismatched - matched > 1:
+            length = (matched + mismatched) >> 1
+            if uncomp[match_pos:match_pos+length] == uncomp[uncomp_offset:uncomp_offset+length]:
+                matched = length
+            else:
+                mismatched = length
+        return matched
+
+
+class Yaz0Decoder:
+    """
+    Resumable YAZ0 decoder that only decodes as much output as has been asked for.
+
+    Compressed data is read from the stream on demand, so looking at the start
+    of a large file costs about as much as the bytes that are actually decoded.
+    """
+
+    HEADER_SIZE = 0x10
+
+    # A single code group can extend the output this far past the requested size
+    MAX_GROUP_OUTPUT = 8 * Yaz0.MAX_RUN_LENGTH
+
+    def __init__(self, comp_data: BinaryIO):
+        header = comp_data.read(Yaz0Decoder.HEADER_SIZE)
+        if header[:4] != b"Yaz0" or len(header) < Yaz0Decoder.HEADER_SIZE:
+            raise ValueError("Data is not YAZ0 compressed")
+
+        self._stream = comp_data
+        self._streamEnded = False
+        self._comp = bytearray(header)
+        self._output = bytearray()
+        self._srcOffset = Yaz0Decoder.HEADER_SIZE
+        self._dstOffset = 0
+        self.decompressedSize: int = Yaz0.get_decompressed_size(header)
+
+    @property
+    def decodedSize(self) -> int:
+        return self._dstOffset
+
+    def is_finished(self) -> bool:
+        return self._dstOffset >= self.decompressedSize
+
+    def decode(self, size: int) -> bytes:
+        """
+        Decodes the output up to at least `size` bytes, resuming where the last call stopped
+
+        :param size: Number of bytes from the start of the output that are needed
+        :return: The first `size` bytes of the output, or all of it if it is smaller
+        """
+        if size > self.decompressedSize:
+            size = self.decompressedSize
+
+        if size > self._dstOffset:
+            self._read_input(self._srcOffset + ((size - self._dstOffset) * 9 // 8) + 0x20)
+
+            capacity = min(self.decompressedSize,
+                           size + Yaz0Decoder.MAX_GROUP_OUTPUT)
+            if capacity > len(self._output):
+                self._output.extend(bytes(capacity - len(self._output)))
+
+            self._srcOffset, self._dstOffset = Yaz0._decode_into(
+                self._comp, self._output, self._srcOffset, self._dstOffset, size)
+
+        return bytes(self._output[:size])
+
+    def decode_all(self) -> bytes:
+        return self.decode(self.decompressedSize)
+
+    def _read_input(self, end: int) -> None:
+        # Literals cost 9 bytes of input per 8 of output and back-references less,
+        # so the caller's estimate always covers the groups it wants decoded
+        if self._streamEnded or end <= len(self._comp):
+            return
+        data = self._stream.read(end - len(self._comp))
+        if len(data) < end - len(self._comp):
+            self._streamEnded = True
+        self._comp += data
+
+
+class A_Yaz0Backend(ABC):
+    """
+    Interface for a YAZ0 implementation that compression can be routed to
+    """
+
+    # Available backends are tried from lowest to highest rank, so faster ones rank lower
+    name: str = ""
+    rank: int = 0
+
+    @abstractmethod
+    def is_available(self) -> bool: ...
+
+    @abstractmethod
+    def compress(self, data: bytes, search_depth: int, strategy: Yaz0Strategy = Yaz0Strategy.LAZY) -> bytes: ...
+
+    @abstractmethod
+    def decompress(self, data: bytes) -> bytes: ...
+
+    def supports_search_depth(self, search_depth: int) -> bool:
+        return True
+
+    def supports_strategy(self, strategy: Yaz0Strategy) -> bool:
+        return strategy == Yaz0Strategy.LAZY
+
+    def supports_level(self, level: int) -> bool:
+        yaz0Level = YAZ0_LEVELS[level]
+        return self.supports_search_depth(yaz0Level.searchDepth) and self.supports_strategy(yaz0Level.strategy)
+
+    def compress_level(self, data: bytes, level: int) -> bytes:
+        """
+        Compresses `data` at one of the `YAZ0_LEVELS`
+
+        Backends that can't honour a level's exact strategy override this to
+        map it to the closest settings they have, so every level stays fast
+        """
+        yaz0Level = YAZ0_LEVELS[level]
+        return self.compress(data, yaz0Level.searchDepth, yaz0Level.strategy)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.name})"
+
+
+class PythonYaz0Backend(A_Yaz0Backend):
+    name = "python"
+    rank = 100
+
+    def is_available(self) -> bool:
+        return True
+
+    def compress(self, data: bytes, search_depth: int, strategy: Yaz0Strategy = Yaz0Strategy.LAZY) -> bytes:
+        return Yaz0.compress_python(data, search_depth, strategy)
+
+    def decompress(self, data: bytes) -> bytes:
+        return Yaz0.decompress_python(data)
+
+    def supports_strategy(self, strategy: Yaz0Strategy) -> bool:
+        return True
+
+
+class PyFastYaz0Backend(A_Yaz0Backend):
+    name = "pyfastyaz0"
+    rank = 0
+
+    def is_available(self) -> bool:
+        return PY_FAST_YAZ0_INSTALLED
+
+    def compress(self, data: bytes, search_depth: int, strategy: Yaz0Strategy = Yaz0Strategy.LAZY) -> bytes:
+        return pyfastyaz0.compress(data, search_depth)
+
+    def decompress(self, data: bytes) -> bytes:
+        return pyfastyaz0.decompress(data)
+
+    def supports_level(self, level: int) -> bool:
+        return True
+
+    def compress_level(self, data: bytes, level: int) -> bytes:
+        # Only the search depth can be chosen, which is what sets the ratio
+        return pyfastyaz0.compress(data, YAZ0_LEVELS[level].searchDepth)
+
+
+class OeadYaz0Backend(A_Yaz0Backend):
+    name = "oead"
+    rank = 10
+
+    def is_available(self) -> bool:
+        return OEAD_INSTALLED
+
+    # oead's own levels run from 6 (fastest) to 9 (smallest), lower ones act like 6
+    MIN_LEVEL = 6
+
+    def compress(self, data: bytes, search_depth: int, strategy: Yaz0Strategy = Yaz0Strategy.LAZY) -> bytes:
+        # Full depth greedy, lazy and optimal are levels 7, 8 and 9 of both
+        return bytes(oead.yaz0.compress(data, level=7 + strategy))
+
+    def decompress(self, data: bytes) -> bytes:
+        return bytes(oead.yaz0.decompress(data))
+
+    def supports_search_depth(self, search_depth: int) -> bool:
+        # oead always searches the whole window
+        return search_depth >= Yaz0.DEFAULT_SEARCH_DEPTH
+
+    def supports_strategy(self, strategy: Yaz0Strategy) -> bool:
+        return True
+
+    def supports_level(self, level: int) -> bool:
+        return True
+
+    def compress_level(self, data: bytes, level: int) -> bytes:
+        return bytes(oead.yaz0.compress(data, level=max(level, OeadYaz0Backend.MIN_LEVEL)))
+
+
+YAZ0_BACKEND_ENV = "JUNIORS_TOOLBOX_YAZ0_BACKEND"
+
+_YAZ0_BACKENDS: dict[str, A_Yaz0Backend] = {}
+_PINNED_YAZ0_BACKEND: Optional[str] = None
+
+
+def _probe_yaz0_backend(backend: A_Yaz0Backend) -> bool:
+    if not backend.is_available():
+        return False
+
+    sample = b"Yaz0 backend probe " * 16 + bytes(range(256))
+    try:
+        comp = backend.compress(sample, Yaz0.DEFAULT_SEARCH_DEPTH)
+        return backend.decompress(comp) == sample and Yaz0.decompress_python(comp) == sample
+    except Exception:
+        return False
+
+
+def register_yaz0_backend(backend: A_Yaz0Backend) -> bool:
+    """
+    Adds a backend to the registry if it is installed and round trips a sample correctly
+
+    :param backend: Backend to register
+    :return: True if the backend was registered
+    """
+    if not _probe_yaz0_backend(backend):
+        return False
+    _YAZ0_BACKENDS[backend.name] = backend
+    return True
+
+
+def get_yaz0_backends() -> list[A_Yaz0Backend]:
+    """
+    Returns every working backend, fastest first
+    """
+    return sorted(_YAZ0_BACKENDS.values(), key=lambda b: b.rank)
+
+
+def get_yaz0_backend(
+    name: Optional[str] = None,
+    *,
+    search_depth: int = Yaz0.DEFAULT_SEARCH_DEPTH,
+    strategy: Yaz0Strategy = Yaz0Strategy.LAZY,
+    level: Optional[int] = None
+) -> A_Yaz0Backend:
+    """
+    Returns the backend to use for a job
+
+    :param name: Name of a specific backend, otherwise the pinned or fastest backend is used
+    :param search_depth: Search depth the backend must honour when compressing
+    :param strategy: Match strategy the backend must honour when compressing
+    :param level: Compression level the backend must support, replacing `search_depth` and `strategy`
+    :return: The chosen backend
+    """
+    if name is not None:
+        try:
+            return _YAZ0_BACKENDS[name]
+        except KeyError:
+            raise ValueError(f"YAZ0 backend \"{name}\" is not available")
+
+    def _supports(backend: A_Yaz0Backend) -> bool:
+        if level is not None:
+            return backend.supports_level(level)
+        return backend.supports_search_depth(search_depth) and backend.supports_strategy(strategy)
+
+    if _PINNED_YAZ0_BACKEND is not None:
+        backend = _YAZ0_BACKENDS[_PINNED_YAZ0_BACKEND]
+        if _supports(backend):
+            return backend
+
+    for backend in get_yaz0_backends():
+        if _supports(backend):
+            return backend
+
+    raise RuntimeError("No YAZ0 backend is available")
+
+
+def set_yaz0_backend(name: Optional[str]) -> None:
+    """
+    Pins the backend used for all YAZ0 work, or unpins it when `name` is None
+
+    :param name: Name of the backend to pin
+    """
+    global _PINNED_YAZ0_BACKEND
+    if name is not None and name not in _YAZ0_BACKENDS:
+        raise ValueError(f"YAZ0 backend \"{name}\" is not available")
+    _PINNED_YAZ0_BACKEND = name
+
+
+for _backend in (PyFastYaz0Backend(), OeadYaz0Backend(), PythonYaz0Backend()):
+    register_yaz0_backend(_backend)
+
+if os.getenv(YAZ0_BACKEND_ENV):
+    try:
+        set_yaz0_backend(os.getenv(YAZ0_BACKEND_ENV))
+    except ValueError as e:
+        print(f"[YAZ0] {e}, using the fastest available backend")
+
+
+def decompress_yaz0(data: BinaryIO) -> BytesIO:
     """
     Decompresses YAZ0 compressed data
 
@@ -265,16 +842,29 @@ def decompress_yaz0(data: BytesIO) -> BytesIO:
     return Yaz0.decompress(data)
 
 
-def compress_yaz0(data: BytesIO, level: int = 7, align_data: bool = False) -> BytesIO:
+def decompress_yaz0_prefix(data: BinaryIO, size: int) -> BytesIO:
+    """
+    Decompresses only the start of YAZ0 compressed data
+
+    :param data: Data to decompress
+    :param size: Number of bytes to decompress
+    :return: Up to `size` bytes of decompressed data
+    """
+    return BytesIO(Yaz0Decoder(data).decode(size))
+
+
+def compress_yaz0(data: BinaryIO, level: int = DEFAULT_YAZ0_LEVEL, align_data: bool = False) -> BytesIO:
     """
     Compresses data using YAZ0
 
     :param data: Data to compress
-    :param level: Compression level
+    :param level: Compression level from 0 (fastest) to 9 (smallest), see `YAZ0_LEVELS`
     :param align_data: Whether to align the data
     :return: Compressed data
     """
-    return Yaz0.compress(data, search_depth=level, should_pad_data=align_data)
+    if not 0 <= level < len(YAZ0_LEVELS):
+        raise ValueError(f"YAZ0 compression level must be 0-{len(YAZ0_LEVELS) - 1}, got {level}")
+    return Yaz0.compress_level(data, level=level, should_pad_data=align_data)
 
 
 def decompress_yaz0_file(path: Path) -> BytesIO:
@@ -285,11 +875,10 @@ def decompress_yaz0_file(path: Path) -> BytesIO:
     :return: Decompressed data
     """
     with open(path, 'rb') as f:
-        data = f.read()
-    return decompress_yaz0(data)
+        return decompress_yaz0(f)
 
 
-def compress_yaz0_file(path: Path, data_alignment: int = 0, level: int = 7) -> BytesIO:
+def compress_yaz0_file(path: Path, data_alignment: int = 0, level: int = DEFAULT_YAZ0_LEVEL) -> BytesIO:
     """
     Compresses a file using YAZ0
 
@@ -299,8 +888,7 @@ def compress_yaz0_file(path: Path, data_alignment: int = 0, level: int = 7) -> B
     :return: Compressed data
     """
     with open(path, 'rb') as f:
-        data = f.read()
-    return compress_yaz0(data)
+        return compress_yaz0(f, level=level, align_data=data_alignment != 0)
 
 
 def is_yaz0_compressed(data: bytes) -> bool:
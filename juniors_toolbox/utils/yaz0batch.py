@@ -0,0 +1,233 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from juniors_toolbox.utils.yaz0 import DEFAULT_YAZ0_LEVEL, YAZ0_LEVELS, compress_yaz0
+
+BATCH_MANIFEST_NAME = ".yaz0batch.json"
+
+
+@dataclass
+class Yaz0BatchJob:
+    source: Path
+    destination: Path
+    level: int
+    alignData: bool
+    knownHash: Optional[str] = None
+
+
+@dataclass
+class Yaz0BatchResult:
+    source: Path
+    destination: Path
+    sourceHash: str
+    sourceSize: int
+    compressedSize: int
+    skipped: bool = False
+    error: Optional[str] = None
+
+
+ProgressCallback = Callable[[Yaz0BatchResult, int, int], None]
+
+
+def find_archives(root: Path, suffixes: Iterable[str] = (".arc",)) -> list[Path]:
+    """
+    Finds every file under `root` with one of the given suffixes
+
+    :param root: Folder to search
+    :param suffixes: File suffixes to collect
+    :return: Sorted list of matching files
+    """
+    suffixes = {s.lower() for s in suffixes}
+    return sorted(
+        p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in suffixes
+    )
+
+
+def compress_yaz0_job(job: Yaz0BatchJob) -> Yaz0BatchResult:
+    """
+    Compresses one file of a batch, skipping it if the source hash matches the last run
+
+    :param job: Description of the file to compress
+    :return: Result of the job
+    """
+    data = job.source.read_bytes()
+    sourceHash = hashlib.sha1(data).hexdigest()
+
+    if sourceHash == job.knownHash and job.destination.is_file():
+        return Yaz0BatchResult(
+            job.source,
+            job.destination,
+            sourceHash,
+            len(data),
+            job.destination.stat().st_size,
+            skipped=True,
+        )
+
+    compressed = compress_yaz0(
+        BytesIO(data), level=job.level, align_data=job.alignData
+    ).getvalue()
+
+    job.destination.parent.mkdir(parents=True, exist_ok=True)
+    tmpPath = job.destination.with_name(job.destination.name + ".tmp")
+    tmpPath.write_bytes(compressed)
+    os.replace(tmpPath, job.destination)
+
+    return Yaz0BatchResult(
+        job.source, job.destination, sourceHash, len(data), len(compressed)
+    )
+
+
+def _failed_result(job: Yaz0BatchJob, error: Exception) -> Yaz0BatchResult:
+    return Yaz0BatchResult(
+        job.source, job.destination, "", 0, 0, error=str(error)
+    )
+
+
+def compress_yaz0_tree(
+    sourceRoot: Path,
+    destRoot: Optional[Path] = None,
+    *,
+    level: int = DEFAULT_YAZ0_LEVEL,
+    alignData: bool = False,
+    maxWorkers: Optional[int] = None,
+    force: bool = False,
+    progress: Optional[ProgressCallback] = None,
+) -> list[Yaz0BatchResult]:
+    """
+    Compresses every .arc file under a folder to .szs across a process pool
+
+    Source hashes are kept in a manifest at the root of the destination folder,
+    so files that haven't changed since the last run are skipped.
+
+    :param sourceRoot: Folder holding the .arc files
+    :param destRoot: Folder to write the .szs files to, mirroring the source layout. Defaults to `sourceRoot`
+    :param level: Compression level from 0 (fastest) to 9 (smallest)
+    :param alignData: Whether to pad each output to 0x20 bytes
+    :param maxWorkers: Maximum number of processes, defaults to the CPU count
+    :param force: Compress every file even if it is unchanged
+    :param progress: Called as `progress(result, completed, total)` when each file finishes
+    :return: Result of each file, in completion order
+    """
+    if destRoot is None:
+        destRoot = sourceRoot
+
+    manifestPath = destRoot / BATCH_MANIFEST_NAME
+    manifest: dict[str, dict] = {}
+    if manifestPath.is_file() and not force:
+        try:
+            manifest = json.loads(manifestPath.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            manifest = {}
+
+    jobs: list[Yaz0BatchJob] = []
+    for source in find_archives(sourceRoot):
+        relPath = source.relative_to(sourceRoot)
+        entry = manifest.get(relPath.as_posix(), {})
+        knownHash = None
+        if entry.get("level") == level and entry.get("alignData") == alignData:
+            knownHash = entry.get("hash")
+        jobs.append(
+            Yaz0BatchJob(
+                source,
+                destRoot / relPath.with_suffix(".szs"),
+                level,
+                alignData,
+                knownHash,
+            )
+        )
+
+    results: list[Yaz0BatchResult] = []
+
+    def _finish(result: Yaz0BatchResult) -> None:
+        results.append(result)
+        if result.error is None:
+            manifest[result.source.relative_to(sourceRoot).as_posix()] = {
+                "hash": result.sourceHash,
+                "level": level,
+                "alignData": alignData,
+            }
+        if progress is not None:
+            progress(result, len(results), len(jobs))
+
+    if maxWorkers == 1 or len(jobs) <= 1:
+        for job in jobs:
+            try:
+                result = compress_yaz0_job(job)
+            except Exception as e:
+                result = _failed_result(job, e)
+            _finish(result)
+    else:
+        with ProcessPoolExecutor(max_workers=maxWorkers) as executor:
+            futures = {executor.submit(compress_yaz0_job, job): job for job in jobs}
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = _failed_result(job, e)
+                _finish(result)
+
+    destRoot.mkdir(parents=True, exist_ok=True)
+    manifestPath.write_text(json.dumps(manifest, indent=4), encoding="utf-8")
+
+    return results
+
+
+def _print_progress(result: Yaz0BatchResult, completed: int, total: int) -> None:
+    if result.error is not None:
+        print(f"[YAZ0-BATCH] [{completed}/{total}] (Failed) {result.source}: {result.error}")
+    elif result.skipped:
+        print(f"[YAZ0-BATCH] [{completed}/{total}] (Unchanged) {result.destination}")
+    else:
+        print(
+            f"[YAZ0-BATCH] [{completed}/{total}] {result.source} -> {result.destination} "
+            f"({result.sourceSize} -> {result.compressedSize} bytes)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='Yaz0 batch compressor for SMS modding',
+                                     description='Compress a folder of .arc files to .szs',
+                                     allow_abbrev=False)
+
+    parser.add_argument('path', help='input folder')
+    parser.add_argument('--dest',
+                        help='Where to write the .szs files, defaults to the input folder',
+                        metavar='folderpath')
+    parser.add_argument('-j', '--jobs',
+                        help='Maximum number of worker processes',
+                        type=int,
+                        default=None)
+    parser.add_argument('--level',
+                        help='Compression level, 0 is fastest and 9 is smallest',
+                        type=int,
+                        choices=range(len(YAZ0_LEVELS)),
+                        default=DEFAULT_YAZ0_LEVEL)
+    parser.add_argument('--align',
+                        help='Pad each file to a multiple of 0x20 bytes',
+                        action='store_true')
+    parser.add_argument('--force',
+                        help='Compress every file, even unchanged ones',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    dest = Path(args.dest) if args.dest else None
+
+    compress_yaz0_tree(
+        path,
+        dest,
+        level=args.level,
+        alignData=args.align,
+        maxWorkers=args.jobs,
+        force=args.force,
+        progress=_print_progress,
+    )
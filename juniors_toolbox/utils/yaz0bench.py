@@ -0,0 +1,324 @@
+import argparse
+import random
+import struct
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Optional, TypeVar
+
+from juniors_toolbox.utils import JSYSTEM_PADDING_TEXT
+from juniors_toolbox.utils.yaz0 import (
+    YAZ0_BACKEND_ENV,
+    YAZ0_LEVELS,
+    A_Yaz0Backend,
+    Yaz0,
+    get_yaz0_backend,
+    get_yaz0_backends,
+)
+
+_T = TypeVar("_T")
+
+
+@dataclass
+class Yaz0BenchmarkResult:
+    backend: str
+    corpus: str
+    size: int
+    compressedSize: int
+    compressTime: float
+    decompressTime: float
+
+    @property
+    def ratio(self) -> float:
+        if self.size == 0:
+            return 1.0
+        return self.compressedSize / self.size
+
+    @property
+    def compressThroughput(self) -> float:
+        """ MiB/s """
+        return self.size / (1 << 20) / max(self.compressTime, 1e-9)
+
+    @property
+    def decompressThroughput(self) -> float:
+        """ MiB/s """
+        return self.size / (1 << 20) / max(self.decompressTime, 1e-9)
+
+
+def _pad_jsystem(data: bytearray, multiple: int = 0x20) -> None:
+    i = 0
+    while len(data) % multiple != 0:
+        data += JSYSTEM_PADDING_TEXT[i % len(JSYSTEM_PADDING_TEXT)].encode()
+        i += 1
+
+
+def make_random_corpus(size: int, seed: int = 0) -> bytes:
+    """ Incompressible data, the worst case for every backend """
+    return random.Random(seed).randbytes(size)
+
+
+def make_zero_corpus(size: int, seed: int = 0) -> bytes:
+    """ A single long run, the best case for every backend """
+    return bytes(size)
+
+
+def make_text_table_corpus(size: int, seed: int = 0) -> bytes:
+    """ Key/value text lines, shaped like PRM dumps and BMG string tables """
+    rng = random.Random(seed)
+    words = [
+        "Mario", "Shine", "Nozzle", "Hover", "Rocket", "Turbo", "Pianta", "Noki",
+        "Delfino", "Sirena", "Ricco", "Gelato", "Pinna", "Bianco", "Noki", "Pianta",
+        "Coin", "Blue", "Red", "Goop", "Boss", "Manta", "Petey", "Gooper",
+    ]
+    data = bytearray()
+    while len(data) < size:
+        key = "".join(rng.choice(words) for _ in range(rng.randint(1, 3)))
+        value = rng.choice(
+            [
+                str(rng.randint(0, 1000)),
+                f"{rng.uniform(-1000, 1000):.4f}",
+                " ".join(rng.choice(words) for _ in range(rng.randint(2, 8))),
+            ]
+        )
+        data += f"{key} = {value}\n".encode("shift-jis")
+    return bytes(data[:size])
+
+
+def make_bmd_corpus(size: int, seed: int = 0) -> bytes:
+    """ J3D model shaped data: section headers, float vertex arrays, index lists and padding """
+    rng = random.Random(seed)
+    data = bytearray(b"J3D2bmd3" + struct.pack(">II", size, 8) + b"SVR3" + b"\xFF" * 12)
+    sections = [b"INF1", b"VTX1", b"EVP1", b"DRW1", b"JNT1", b"SHP1", b"MAT3", b"TEX1"]
+    while len(data) < size:
+        magic = sections[rng.randrange(len(sections))]
+        section = bytearray(magic + struct.pack(">I", 0))
+        if magic == b"VTX1":
+            x = y = z = 0.0
+            for _ in range(rng.randint(64, 512)):
+                x += rng.uniform(-4, 4)
+                y += rng.uniform(-4, 4)
+                z += rng.uniform(-4, 4)
+                section += struct.pack(">fff", x, y, z)
+        elif magic == b"SHP1":
+            count = rng.randint(64, 512)
+            section += struct.pack(">BH", 0x98, count)
+            for i in range(count):
+                section += struct.pack(">HHH", i, i, rng.randrange(count))
+        elif magic == b"TEX1":
+            section += rng.randbytes(rng.randint(256, 2048))
+        else:
+            for _ in range(rng.randint(16, 128)):
+                section += struct.pack(">HHI", rng.randrange(16), 0xFFFF, rng.randrange(0x100))
+        _pad_jsystem(section)
+        struct.pack_into(">I", section, 4, len(section))
+        data += section
+    return bytes(data[:size])
+
+
+def make_rarc_corpus(size: int, seed: int = 0) -> bytes:
+    """ Resource archive shaped data: node tables, a string table and a mix of payloads """
+    rng = random.Random(seed)
+    payloads: list[bytes] = []
+    total = 0
+    while total < size:
+        kind = rng.randrange(3)
+        payloadSize = rng.randint(0x200, 0x4000)
+        if kind == 0:
+            payload = make_bmd_corpus(payloadSize, rng.randrange(1 << 16))
+        elif kind == 1:
+            payload = make_text_table_corpus(payloadSize, rng.randrange(1 << 16))
+        else:
+            payload = bytes(payloadSize // 2) + rng.randbytes(payloadSize // 2)
+        payloads.append(payload)
+        total += payloadSize
+
+    names = [f"file_{i:04}.{rng.choice(['bmd', 'bck', 'prm', 'bmg', 'col'])}" for i in range(len(payloads))]
+    strings = bytearray(b"scene\x00.\x00..\x00")
+    nameOffsets = []
+    for name in names:
+        nameOffsets.append(len(strings))
+        strings += name.encode("ascii") + b"\x00"
+
+    tables = bytearray(struct.pack(">4sIHHI", b"ROOT", 0, 0, len(names), 0))
+    tables += bytes(-len(tables) % 0x20)
+    dataOffset = 0
+    for i, payload in enumerate(payloads):
+        tables += struct.pack(">HHIIII", i, rng.randrange(0x10000), 0x11000000 | nameOffsets[i], dataOffset, len(payload), 0)
+        dataOffset += (len(payload) + 0x1F) & ~0x1F
+    tables += bytes(-len(tables) % 0x20)
+    strings += bytes(-len(strings) % 0x20)
+
+    data = bytearray(b"RARC" + bytes(0x3C))
+    data += tables + strings
+    for payload in payloads:
+        data += payload + bytes(-len(payload) % 0x20)
+    return bytes(data[:size])
+
+
+SYNTHETIC_CORPORA: dict[str, Callable[[int, int], bytes]] = {
+    "random": make_random_corpus,
+    "zeros": make_zero_corpus,
+    "text": make_text_table_corpus,
+    "bmd": make_bmd_corpus,
+    "rarc": make_rarc_corpus,
+}
+
+
+def _best_time(f: Callable[[], _T], repeats: int) -> tuple[float, _T]:
+    # Always runs at least once, so there is a result to return
+    start = time.perf_counter()
+    result = f()
+    best = time.perf_counter() - start
+    for _ in range(repeats - 1):
+        start = time.perf_counter()
+        result = f()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def benchmark_yaz0_backend(
+    backend: A_Yaz0Backend,
+    corpus: str,
+    data: bytes,
+    *,
+    searchDepth: int = Yaz0.DEFAULT_SEARCH_DEPTH,
+    repeats: int = 3,
+) -> Yaz0BenchmarkResult:
+    """
+    Times one backend on one corpus, keeping the best of `repeats` runs
+
+    :param backend: Backend to measure
+    :param corpus: Name of the corpus, for reporting
+    :param data: Uncompressed data
+    :param searchDepth: Search depth used to compress
+    :param repeats: Number of runs of each operation
+    :return: Timings and compression ratio
+    """
+    compressTime, compressed = _best_time(lambda: backend.compress(data, searchDepth), repeats)
+    decompressTime, decompressed = _best_time(lambda: backend.decompress(compressed), repeats)
+    if decompressed != data:
+        raise ValueError(f"Backend \"{backend.name}\" failed to round trip corpus \"{corpus}\"")
+    return Yaz0BenchmarkResult(
+        backend.name, corpus, len(data), len(compressed), compressTime, decompressTime
+    )
+
+
+def run_yaz0_benchmark(
+    corpora: dict[str, bytes],
+    backends: Optional[list[A_Yaz0Backend]] = None,
+    *,
+    searchDepth: int = Yaz0.DEFAULT_SEARCH_DEPTH,
+    repeats: int = 3,
+) -> list[Yaz0BenchmarkResult]:
+    """
+    Times every backend that supports `searchDepth` on every corpus
+
+    :param corpora: Map of corpus names to uncompressed data
+    :param backends: Backends to measure, defaults to all available ones
+    :param searchDepth: Search depth used to compress
+    :param repeats: Number of runs of each operation
+    :return: One result per backend and corpus
+    """
+    if backends is None:
+        backends = get_yaz0_backends()
+
+    results: list[Yaz0BenchmarkResult] = []
+    for backend in backends:
+        if not backend.supports_search_depth(searchDepth):
+            continue
+        for name, data in corpora.items():
+            results.append(
+                benchmark_yaz0_backend(backend, name, data, searchDepth=searchDepth, repeats=repeats)
+            )
+    return results
+
+
+def run_yaz0_level_benchmark(
+    corpora: dict[str, bytes],
+    *,
+    repeats: int = 3,
+) -> list[Yaz0BenchmarkResult]:
+    """
+    Times every compression level on every corpus, using the backend each level would pick
+
+    :param corpora: Map of corpus names to uncompressed data
+    :param repeats: Number of runs of each operation
+    :return: One result per level and corpus, with the level in the backend column
+    """
+    results: list[Yaz0BenchmarkResult] = []
+    for i in range(len(YAZ0_LEVELS)):
+        backend = get_yaz0_backend(level=i)
+        for name, data in corpora.items():
+            compressTime, compressed = _best_time(
+                lambda: backend.compress_level(data, i), repeats)
+            decompressTime, _ = _best_time(lambda: backend.decompress(compressed), repeats)
+            results.append(
+                Yaz0BenchmarkResult(
+                    f"{i}:{backend.name}", name, len(data), len(compressed), compressTime, decompressTime
+                )
+            )
+    return results
+
+
+def format_yaz0_benchmark(results: list[Yaz0BenchmarkResult]) -> str:
+    lines = [
+        f"{'Backend':<12} {'Corpus':<24} {'Size':>10} {'Ratio':>7} {'Comp MiB/s':>11} {'Decomp MiB/s':>13}"
+    ]
+    for r in results:
+        lines.append(
+            f"{r.backend:<12} {r.corpus[:24]:<24} {r.size:>10} {r.ratio:>7.3f} "
+            f"{r.compressThroughput:>11.2f} {r.decompressThroughput:>13.2f}"
+        )
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog='Yaz0 backend benchmark',
+                                     description='Compare the speed and ratio of each available Yaz0 backend',
+                                     allow_abbrev=False)
+
+    parser.add_argument('files', nargs='*',
+                        help='Real files to add to the synthetic corpora (e.g. .arc, .bmd, .bmg)')
+    parser.add_argument('--size',
+                        help='Size of each synthetic corpus in bytes',
+                        type=int,
+                        default=0x40000)
+    parser.add_argument('--repeats',
+                        help='Runs of each operation, the best is kept',
+                        type=int,
+                        default=3)
+    parser.add_argument('--depth',
+                        help='How far back to search for matches (1-4096)',
+                        type=int,
+                        default=Yaz0.DEFAULT_SEARCH_DEPTH)
+    parser.add_argument('--backend', action='append',
+                        help='Only measure this backend, may be given more than once')
+    parser.add_argument('--levels',
+                        help='Profile each compression level instead of each backend',
+                        action='store_true')
+    parser.add_argument('--no-synthetic',
+                        help='Only measure the given files',
+                        action='store_true')
+
+    args = parser.parse_args()
+
+    corpora: dict[str, bytes] = {}
+    if not args.no_synthetic:
+        for name, factory in SYNTHETIC_CORPORA.items():
+            corpora[name] = factory(args.size, 0)
+    for file in args.files:
+        path = Path(file)
+        corpora[path.name] = path.read_bytes()
+
+    backends = None
+    if args.backend:
+        backends = [get_yaz0_backend(name) for name in args.backend]
+
+    print(f"[YAZ0-BENCH] Available backends: {', '.join(b.name for b in get_yaz0_backends())}")
+    print(f"[YAZ0-BENCH] Active backend: {get_yaz0_backend(search_depth=args.depth).name} "
+          f"(pin with {YAZ0_BACKEND_ENV}=<name>)")
+    if args.levels:
+        print(format_yaz0_benchmark(run_yaz0_level_benchmark(corpora, repeats=args.repeats)))
+    else:
+        print(format_yaz0_benchmark(run_yaz0_benchmark(
+            corpora, backends, searchDepth=args.depth, repeats=args.repeats)))